@@ -1,17 +1,19 @@
-const limitedHight = 80; // 実際に制限する高さ（px）
-
 $(function () {
-  // 画面表示時に実行する
-  limitNumberOfWordsShownIfOverFlow();
-
   /**
-   * 単語バッジを押したとき、Spotifyプレイヤーに開始時間を設定する
-   * 開始時間またはSpotifyプレイヤーがない時は何もしない
+   * 単語バッジを押したとき、Spotifyプレイヤーに開始時間を設定し、前後に話された単語を表示する
+   * 開始時間がない時は何もしない（Spotifyプレイヤーがない時は前後の単語のみ表示する）
+   * （後から取得したバッジにも適用するため、documentで受け取る）
    */
-  $('.word-badge').click(function () {
+  $(document).on('click', '.word-badge', function () {
     const startTime = $(this).find('.start-time').text();
-    const $spotifyPlayer = $(this).parents('.words-wrap').prevAll('.radio-info').find('.spotify-player');
-    if (!startTime || !$spotifyPlayer) {
+    if (!startTime) {
+      return;
+    }
+    const $wordsWrap = $(this).parents('.words-wrap');
+    showContext($wordsWrap, $(this).data('start-ms'));
+
+    const $spotifyPlayer = $wordsWrap.prevAll('.radio-info').find('.spotify-player');
+    if (!$spotifyPlayer.length) {
       return;
     }
     const src = $spotifyPlayer.attr('src');
@@ -22,28 +24,54 @@ $(function () {
   })
 
   /**
-   * もっと見る・閉じるボタンを押したとき
-   * 単語の全表示・一部非表示を切り替える
+   * 残りを見るボタンを押したとき、表示していない一致箇所を取得してバッジを追加する
    */
-  $('input[id^=switch]').change(function () {
-    if ($(this).prop('checked')) { // もっと見る
-      $(this).nextAll('.words').height('auto');
-    } else { // 閉じる
-      $(this).nextAll('.words').height(limitedHight);
-    }
+  $('.more-hits').click(function () {
+    const $button = $(this);
+    const $words = $button.prevAll('.words');
+    $button.prop('disabled', true);
+    $.getJSON($button.data('url'), function (data) {
+      data.hits.forEach(function (hit) {
+        $words.append(createWordBadge(hit));
+      });
+      $button.remove();
+    }).fail(function () {
+      $button.prop('disabled', false);
+    });
   })
 })
 
 /**
- * 単語が溢れているとき表示している単語数を制限する
+ * 一致箇所の前後に話された単語を取得して表示する
+ * @param {jQuery} $wordsWrap 回の一致箇所の要素
+ * @param {number} startMs 一致箇所の開始時間（ミリ秒）
  */
-function limitNumberOfWordsShownIfOverFlow() {
-  const maxHeight = 120; // 単語が溢れている場合に制限するように、実際に制限する高さより余分のある高さにしている
-  $('.words').each(function () {
-    if ($(this).height() >= maxHeight) {
-      // styleを指定すると既存のcssが無効になるのでtailwindのclass名を付与している
-      $(this).height(limitedHight);
-      $(this).nextAll('.view-more-btn').css('display', 'block');
+function showContext($wordsWrap, startMs) {
+  const $context = $wordsWrap.find('.hit-context');
+  $.getJSON($wordsWrap.data('context-url') + '&start_ms=' + startMs, function (data) {
+    if (!data.words.length) {
+      return;
     }
+    const text = data.words.map(function (word) {
+      return word.original_form;
+    }).join('');
+    $context.text(data.words[0].start_time_minutes + ' ' + text).removeClass('hidden');
   });
 }
+
+/**
+ * 一致箇所の単語バッジを作成する（search.htmlのバッジと同じ構造）
+ * @param {Object} hit 一致箇所（原形・開始時間）
+ * @returns {jQuery} 単語バッジ
+ */
+function createWordBadge(hit) {
+  const $badge = $('<span>')
+    .addClass('word-badge inline-block bg-gray-400 px-2 py-1 rounded-xl text-white mb-1 cursor-pointer')
+    .text(hit.original_form);
+  if (hit.start_ms !== null) {
+    $badge.attr('data-start-ms', hit.start_ms);
+    $badge.append('：', $('<span>').text(hit.start_time_minutes));
+    $badge.append($('<span>').addClass('start-time hidden').text(hit.start_seconds));
+  }
+  return $badge.add(document.createTextNode(' '));
+}
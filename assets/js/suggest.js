@@ -0,0 +1,29 @@
+const suggestDelay = 150; // 入力が止まってから候補を取得するまでの時間（ms）
+
+$(function () {
+  let timer = null;
+  let lastQuery = '';
+
+  /**
+   * キーワードを入力したとき、前方一致する単語の候補を取得して表示する
+   * 前回と同じ入力のときは取得しない
+   */
+  $('input[data-suggest-url]').on('input', function () {
+    const $input = $(this);
+    const $datalist = $('#' + $input.attr('list'));
+    const query = $input.val().trim();
+    clearTimeout(timer);
+    if (!query || query === lastQuery) {
+      return;
+    }
+    timer = setTimeout(function () {
+      lastQuery = query;
+      $.getJSON($input.data('suggest-url'), { q: query }, function (data) {
+        $datalist.empty();
+        data.suggestions.forEach(function (suggestion) {
+          $('<option>').val(suggestion.original_form).appendTo($datalist);
+        });
+      });
+    }, suggestDelay);
+  })
+})
@@ -1,22 +1,54 @@
 from django.contrib import admin
-from django.db.models import Q
 from django.contrib import messages
-from .models import Radio, Episode, Word
-from .service.util import parse, now_datetime, is_hiragana
-from .service.google import transcribe_gcs, get_gcs_uri, get_transcript_result
-from google.api_core.exceptions import NotFound
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from .models import Radio, Episode, Word, IngestionJob
+from .service.index import search_term_ids
+from .service.jobs import enqueue_ingestion, start_transcription
+from .service.normalize import normalize
 
 from django.core.handlers.wsgi import WSGIRequest
 from django.db.models.query import QuerySet
-from typing import List, Dict
+from typing import Tuple
+
+
+class EstimatedCountPaginator(Paginator):
+    """絞り込みのない一覧では、件数にPostgreSQLの統計情報の推定行数を使うページネーター
+
+    数千万行のテーブルでCOUNT(*)による全件走査を行わないようにする。
+    絞り込みがある場合と、PostgreSQL以外のDBでは正確な件数を数える。
+    """
+
+    @cached_property
+    def count(self) -> int:
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s',
+                               [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            # 一度もANALYZEされていないテーブルは-1（または0）になるため数える
+            if row and row[0] > 0:
+                return int(row[0])
+        return super().count
 
-import environ
-env = environ.Env()
-env.read_env('.env')
 
 class EpisodeAdmin(admin.ModelAdmin):
-    actions = ['store_words_action', 'store_words_again_action']
-    readonly_fields = ['word_stored']
+    list_display = ['__str__', 'air_date', 'word_stored', 'word_count', 'active_generation', 'updated_at']
+    list_filter = ['radio_id', 'word_stored']
+    list_select_related = ['radio_id']
+    # (number, id)のインデックスの順
+    ordering = ['-number', '-id']
+    search_fields = ['radio_id__title']
+    search_help_text = '回の番号（数字のみ）またはラジオのタイトル'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['store_words_action', 'store_words_again_action', 'store_words_parallel_action']
+    readonly_fields = ['word_stored', 'word_count', 'active_generation', 'last_generation',
+                       'transcript_hash', 'word_hash', 'parser_version', 'alignment_version', 'block_offsets',
+                       'operation_name', 'operation_poll_count', 'operation_next_poll_at']
 
     def save_model(self, request: WSGIRequest, obj: Episode, form, change: bool) -> None:
         """管理画面でエピソードを保存する。
@@ -43,15 +75,10 @@ class EpisodeAdmin(admin.ModelAdmin):
 
         super().save_model(request, obj, form, change)
 
-        if is_edit:
-            # 単語保存フラグをリセット
-            set_word_stored(episode[0], False)
-            # 単語をリセット
-            Word.objects.filter(episode_id=episode[0].id).delete()
-
         # 文字起こし実行
+        # 音声を変更した場合、既存の単語は新しい音声の単語の世代に切り替わるまで検索に表示する
         if is_store or is_edit:
-            start_transcript_job(obj)
+            start_transcription(obj)
 
 
     def store_words_action(self, request: WSGIRequest, queryset: QuerySet) -> None:
@@ -66,10 +93,10 @@ class EpisodeAdmin(admin.ModelAdmin):
             if episode.word_stored:
                 messages.warning(request, '単語保存済みのエピソードがあります。')
                 return
-        # 単語保存
+        # 単語保存ジョブを登録
         for episode in queryset:
-            if transcribe(episode, request):
-                messages.success(request, '単語の保存が完了しました')
+            enqueue_ingestion(episode)
+        messages.success(request, '単語保存ジョブを登録しました。ジョブ一覧で進捗を確認できます')
 
     def store_words_again_action(self, request: WSGIRequest, queryset: QuerySet) -> None:
         """単語を再保存する
@@ -83,157 +110,112 @@ class EpisodeAdmin(admin.ModelAdmin):
             if not episode.word_stored:
                 messages.warning(request, '単語未保存のエピソードがあります。')
                 return
+        # 既存の単語の削除と単語保存はジョブで行う
         for episode in queryset:
-            # 既存の単語を削除
-            Word.objects.filter(episode_id=episode.id).delete()
-            # 単語保存
-            if transcribe(episode, request):
-                messages.success(request, '単語の再保存が完了しました')
+            enqueue_ingestion(episode, reset_words=True)
+        messages.success(request, '単語再保存ジョブを登録しました。ジョブ一覧で進捗を確認できます')
 
 
-    store_words_action.short_description = '初回単語保存'
-    store_words_again_action.short_description = '再単語保存'
+    def store_words_parallel_action(self, request: WSGIRequest, queryset: QuerySet) -> None:
+        """複数のエピソードの単語保存ジョブをまとめて登録する
 
+        単語保存済みのエピソードは前回の保存から変わった処理のみやり直す。ジョブはワーカー（run_ingestion_worker）が複数プロセスで並列に実行するため、
+        リクエストは登録だけで返す。
 
-def set_word_stored(episode: Episode, stored: bool) -> None:
-    """エピソードの単語保存ステータスを変更する
+        Args:
+            request (WSGIRequest): Djangoリクエスト
+            queryset (QuerySet): Episodeオブジェクト
+        """
+        count = 0
+        for episode in queryset:
+            enqueue_ingestion(episode)
+            count += 1
+        messages.success(request, f'{count}件の単語保存ジョブを登録しました。ジョブ一覧で進捗を確認できます')
 
-    Args:
-        episode (Episode): Episodeモデル
-        stored (bool): 保存済み: True, 未保存: False
-    """
-    episode.word_stored = stored
-    episode.save()
+    def get_search_results(self, request: WSGIRequest, queryset: QuerySet,
+                           search_term: str) -> Tuple[QuerySet, bool]:
+        """数字のみの場合は回の番号で検索する
+
+        Args:
+            request (WSGIRequest): Djangoリクエスト
+            queryset (QuerySet): Episodeオブジェクト
+            search_term (str): 検索語
 
+        Returns:
+            Tuple[QuerySet, bool]: 検索結果と、重複を含む可能性があるかどうか
+        """
+        if search_term.strip().isdigit():
+            return queryset.filter(number=int(search_term)), False
+        return super().get_search_results(request, queryset, search_term)
 
-def start_transcript_job(episode: Episode) -> None:
-    """非同期で文字起こし処理を開始する
+    store_words_action.short_description = '初回単語保存'
+    store_words_again_action.short_description = '再単語保存'
+    store_words_parallel_action.short_description = '並列単語保存'
 
-    Args:
-        episode (Episode): Episodeモデル
-    """
-    audio_gcs_uri = get_gcs_uri(episode.audio_file)
-    file_path = get_transcript_file_path(episode)
-    transcribe_gcs(audio_gcs_uri, file_path)
-    # ジョブ名を保存
-    store_job_name(episode.id, file_path)
 
+class EpisodeListFilter(admin.RelatedFieldListFilter):
+    """回で絞り込むフィルター（選択肢の表示でラジオを回ごとに取得しない）"""
 
-def get_transcript_file_path(episode: Episode) -> str:
-    """GCSバケットルートからの文字起こしファイルパスを取得する
+    def field_choices(self, field, request: WSGIRequest, model_admin: admin.ModelAdmin) -> list:
+        return [(episode.id, str(episode)) for episode in
+                Episode.objects.select_related('radio_id').order_by('-number', '-id')]
 
-    Args:
-        episode (Episode): Episodeモデル
 
-    Returns:
-        str: 文字起こしファイルパス
-    """
-    file_name = str(episode.number) + '_' + now_datetime() + '.json'
-    sub_folder_name = episode.radio_id.english_title
-    transcript_folder_name = 'transcript_file/' + sub_folder_name
-    file_path = transcript_folder_name + '/' + file_name
-    return file_path
+class WordAdmin(admin.ModelAdmin):
+    list_display = ['id', 'episode_id', 'term_id', 'position', 'start_time', 'generation']
+    # 回・ラジオ・語彙の表示で行ごとにクエリを発行しない
+    list_select_related = ['episode_id__radio_id', 'term_id']
+    # 絞り込みは(episode_id, generation, start_ms)のインデックス、並び順は主キーのインデックスを使う
+    list_filter = ['episode_id__radio_id', ('episode_id', EpisodeListFilter)]
+    ordering = ['-id']
+    # 検索は語彙の転置インデックスで行う（get_search_results）
+    search_fields = ['term_id__search_key']
+    search_help_text = '原形・読みの部分一致'
+    raw_id_fields = ['episode_id', 'term_id']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
+    def get_search_results(self, request: WSGIRequest, queryset: QuerySet,
+                           search_term: str) -> Tuple[QuerySet, bool]:
+        """検索語に部分一致する語彙の単語を、語彙の転置インデックスから検索する
 
-def store_job_name(episodeId: int, job_name: str) -> None:
-    """対象エピソードに文字起こしジョブ名を保存する
+        Args:
+            request (WSGIRequest): Djangoリクエスト
+            queryset (QuerySet): Wordオブジェクト
+            search_term (str): 検索語
 
-    Args:
-        episodeId (int): エピソードID
-        job_name (str): transcribeジョブ名
-    """
-    episode = Episode.objects.get(id=episodeId)
-    episode.job_name = job_name
-    episode.save()
+        Returns:
+            Tuple[QuerySet, bool]: 検索結果と、重複を含む可能性があるかどうか
+        """
+        search_word = normalize(search_term)
+        if not search_word:
+            return queryset, False
+        return queryset.filter(term_id__in=search_term_ids(search_word)), False
 
+    def start_time(self, obj: Word) -> str:
+        """開始時間（00:00形式）
 
-def transcribe(episode: Episode, request: WSGIRequest) -> bool:
-    """Google speech-to-textで文字起こししたファイルをmecabで解析し単語として保存する
+        Args:
+            obj (Word): Wordモデル
 
-    Args:
-        episode (Episode): Episodeモデル
-        request (WSGIRequest): Djangoリクエスト
-    Returns:
-        bool: 成功かどうか
-    """
-    episode = Episode.objects.get(id=episode.id)
-
-    # GSからjsonファイルを取得
-    try:
-        transcript_json = get_transcript_result(episode.job_name)
-    except NotFound:
-        messages.warning(request, '文字起こしが未完了です。時間を置いてから再度実行してください')
-        return False
-    except Exception:
-        messages.warning(request, '文字起こしでエラーが発生しました')
-        return False
-    # 文字起こし本文と単語の開始時間リストを取得
-    alternative = transcript_json['results'][0]['alternatives'][0]
-    transcript = alternative['transcript']
-    items = alternative['words']
-
-    # 文字起こし文を形態素解析し、単語として保存する
-    words = parse(transcript)
-    store_words(words, episode)
-    # 単語に開始時間を設定
-    store_start_time(items, episode.id)
-
-    # エピソードを「単語保存済み」にする
-    set_word_stored(episode , True)
-    return True
-
-def store_words(words: List[Dict[str, str]], episode: Episode) -> None:
-    """エピソードに単語を保存する
-
-    Args:
-        words (List[Dict[str, str]]): 形態素解析で取得した単語リスト
-        episode (Episode): Episodeモデル
-    """
-    for word in words:
-        Word.objects.create(
-            episode_id=episode,
-            original_form=word['original_form'],
-            pronunciation=word['pronunciation'],
-        )
+        Returns:
+            str: 開始時間（未設定の場合は空文字）
+        """
+        return obj.start_time_minutes or ''
 
+    start_time.short_description = '開始時間'
+    start_time.admin_order_field = 'start_ms'
 
-def store_start_time(items: List[Dict[str, str]], episode_id: int) -> None:
-    """単語に開始時間を保存する
 
-    Args:
-        items (List[Dict[str, str]]): 単語のjsonファイル
-        episode_id (int): エピソードID
-    """
-    for item in items:
-        # start_timeのキーがなければスキップ
-        if 'startTime' not in item:
-            continue
-
-        # 単語を取得
-        word_split = item['word'].split('|')
-        original_word = word_split[0]
-        # 発音はない可能性あり
-        pronunciation = word_split[1] if len(word_split) == 2 else original_word
-
-        # 2文字以下の「ひらがな」はスキップ
-        if (len(original_word) <= 2 and is_hiragana(original_word)):
-            continue
-
-        # 原型または読みに部分一致
-        words = Word.objects.order_by('id').filter(
-            episode_id=episode_id,
-            start_time__isnull=True
-        ).filter(
-            Q(original_form__contains=original_word) |
-            Q(pronunciation__contains=pronunciation)
-        )
-        # 一致する最初の単語に開始時間を設定する
-        if len(words):
-            # 開始時間からsを除去（例: 0s -> 0）
-            words[0].start_time = item['startTime'].replace('s', '')
-            words[0].save()
+class IngestionJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'episode_id', 'reset_words', 'status', 'progress',
+                    'attempts', 'started_at', 'finished_at']
+    list_filter = ['status']
+    list_select_related = ['episode_id__radio_id']
+    readonly_fields = ['status', 'progress', 'error', 'attempts', 'started_at', 'finished_at']
 
 
 admin.site.register(Radio)
 admin.site.register(Episode, EpisodeAdmin)
-admin.site.register(Word)
+admin.site.register(Word, WordAdmin)
+admin.site.register(IngestionJob, IngestionJobAdmin)
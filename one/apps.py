@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class OneConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'one'
+
+    def ready(self):
+        # mecabの辞書を起動時に読み込む
+        if settings.MECAB_WARM_UP:
+            from .service.util import warm_up
+            warm_up()
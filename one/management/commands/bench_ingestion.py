@@ -0,0 +1,83 @@
+import datetime
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.test.utils import override_settings
+from one.models import Radio, Episode, IngestionJob, Word
+from one.service.ingestion import start_transcript_job
+from one.service.operations import poll_operations
+from one.service.jobs import work
+from one.management.commands.bench_transcript import write_transcript
+
+
+class Command(BaseCommand):
+    help = 'ローカルのストレージと音声認識で単語保存全体のスループットを計測する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--episodes', type=int, default=10,
+                            help='作成する回の数')
+        parser.add_argument('--fixture', help='再生する文字起こしファイル（省略時は生成する）')
+        parser.add_argument('--words', type=int, default=5000,
+                            help='生成する文字起こしファイルの単語数')
+
+    def handle(self, *args, **options):
+        work_dir = tempfile.mkdtemp()
+        fixtures = os.path.join(work_dir, 'fixtures')
+        os.makedirs(fixtures)
+        if options['fixture']:
+            shutil.copy(options['fixture'], os.path.join(fixtures, 'default.json'))
+        else:
+            shutil.move(write_transcript(options['words'], 1), os.path.join(fixtures, 'default.json'))
+
+        try:
+            with override_settings(
+                OBJECT_STORAGE_BACKEND='one.service.local.LocalObjectStorage',
+                SPEECH_RECOGNIZER_BACKEND='one.service.local.FakeSpeechRecognizer',
+                LOCAL_STORAGE_ROOT=os.path.join(work_dir, 'storage'),
+                LOCAL_TRANSCRIPT_FIXTURES=fixtures,
+                OPERATION_POLL_INTERVAL=0,
+            ):
+                self.run(options['episodes'])
+        finally:
+            shutil.rmtree(work_dir)
+
+    def run(self, episode_count: int) -> None:
+        """回を作成し、文字起こしの開始から単語保存までを計測する
+
+        Args:
+            episode_count (int): 回の数
+        """
+        radio, _ = Radio.objects.get_or_create(
+            title='ベンチマーク', english_title='benchmark', defaults={'image': 'benchmark.png'})
+        start_number = (Episode.objects.filter(radio_id=radio).order_by('-number')
+                        .values_list('number', flat=True).first() or 0) + 1
+        episodes = [Episode.objects.create(
+            radio_id=radio, number=number, audio_file='benchmark.flac',
+            air_date=datetime.date(2020, 1, 1), spotify_id='benchmark'
+        ) for number in range(start_number, start_number + episode_count)]
+
+        start = time.perf_counter()
+        for episode in episodes:
+            start_transcript_job(episode)
+        started = time.perf_counter()
+        while Episode.objects.filter(id__in=[episode.id for episode in episodes],
+                                     operation_name__isnull=False).exists():
+            poll_operations(limit=episode_count)
+        polled = time.perf_counter()
+        work(once=True)
+        finished = time.perf_counter()
+
+        jobs = IngestionJob.objects.filter(episode_id__in=episodes).values('status').annotate(
+            count=Count('id'))
+        word_count = Word.objects.filter(episode_id__in=episodes).count()
+        elapsed = finished - start
+        self.stdout.write(
+            f'start={started - start:.2f}s poll={polled - started:.2f}s ingest={finished - polled:.2f}s')
+        self.stdout.write(f"jobs={ {job['status']: job['count'] for job in jobs} }")
+        self.stdout.write(
+            f'{episode_count / elapsed:.2f} episodes/s {word_count / elapsed:.0f} words/s '
+            f'({word_count} words)')
@@ -0,0 +1,51 @@
+import time
+
+import MeCab
+from django.core.management.base import BaseCommand
+from one.service.util import env, get_tagger, parse, parse_many, parse_with_tagger
+
+# 計測用の文章
+SAMPLE_TEXT = '内山昂輝の1クール！文化放送でお送りしているラジオ番組です。今週もメールを紹介していきます。'
+
+
+class Command(BaseCommand):
+    help = '形態素解析の処理速度を計測する（Taggerを毎回生成する場合との比較）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='計測に使用する文章のファイル（1行1文章）')
+        parser.add_argument('--count', type=int, default=100,
+                            help='解析する文章の数')
+
+    def handle(self, *args, **options):
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as f:
+                texts = [line.strip() for line in f if line.strip()]
+        else:
+            texts = [SAMPLE_TEXT] * options['count']
+        total_chars = sum(len(text) for text in texts)
+
+        self.measure('new tagger per parse', lambda: [
+            parse_with_tagger(MeCab.Tagger(env.str('MECAB_DIC_PATH')), text) for text in texts
+        ], len(texts), total_chars)
+        # 辞書の読み込みを計測から除外する
+        get_tagger()
+        self.measure('shared tagger parse', lambda: [parse(text) for text in texts],
+                     len(texts), total_chars)
+        self.measure('shared tagger parse_many', lambda: parse_many(texts),
+                     len(texts), total_chars)
+
+    def measure(self, label: str, func, text_count: int, total_chars: int) -> None:
+        """処理時間とスループットを出力する
+
+        Args:
+            label (str): 出力するラベル
+            func (Callable): 計測する処理
+            text_count (int): 文章の数
+            total_chars (int): 文字数の合計
+        """
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{label}: {elapsed * 1000:.1f}ms '
+            f'{text_count / elapsed:.1f} texts/s {total_chars / elapsed:.0f} chars/s')
@@ -0,0 +1,139 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q, Prefetch
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from one.models import Radio, Episode, Term, Word
+from one.service.vocabulary import resolve_terms
+from one.service.generation import activate_generation
+from one.service.cache import invalidate_search_cache
+from one.views import search
+
+# 疑似単語の生成に使用するカタカナ
+KATAKANA = [chr(c) for c in range(ord('ァ'), ord('ヶ') + 1)]
+
+
+class Command(BaseCommand):
+    help = '検索ページのクエリ数と実行時間を計測する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('keywords', nargs='*', default=['ウチヤマ', 'ラジオ', 'ブン'],
+                            help='計測するキーワード')
+        parser.add_argument('--seed', action='store_true',
+                            help='計測用のデータを作成する')
+        parser.add_argument('--episodes', type=int, default=1000,
+                            help='作成する回の数')
+        parser.add_argument('--words-per-episode', type=int, default=5000,
+                            help='1回あたりに作成する単語数')
+        parser.add_argument('--vocabulary', type=int, default=20000,
+                            help='作成する単語の語彙数')
+        parser.add_argument('--page', type=int, default=1,
+                            help='計測するページ番号')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='計測の繰り返し回数')
+        parser.add_argument('--legacy', action='store_true',
+                            help='改修前の検索処理も計測する')
+        parser.add_argument('--cached', action='store_true',
+                            help='検索結果キャッシュを有効にして計測する')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['episodes'], options['words_per_episode'], options['vocabulary'])
+
+        factory = RequestFactory()
+        for keyword in options['keywords']:
+            request = factory.get('/search', {'keyword': keyword, 'page': options['page']})
+            self.measure(f'search   {keyword}', lambda: search(request), options['repeat'],
+                         clear_cache=not options['cached'])
+            if options['legacy']:
+                self.measure(f'legacy   {keyword}',
+                             lambda: legacy_search(keyword, options['page']), options['repeat'])
+
+    def measure(self, label: str, func, repeat: int, clear_cache: bool = False) -> None:
+        """処理のクエリ数と実行時間を出力する
+
+        Args:
+            label (str): 出力するラベル
+            func (Callable): 計測する処理
+            repeat (int): 繰り返し回数
+            clear_cache (bool): 計測ごとに検索結果キャッシュを無効にするかどうか
+        """
+        timings = []
+        for _ in range(repeat):
+            if clear_cache:
+                invalidate_search_cache()
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - start)
+        self.stdout.write(
+            f'{label}: queries={len(context.captured_queries)} '
+            f'best={min(timings) * 1000:.1f}ms avg={sum(timings) / len(timings) * 1000:.1f}ms')
+
+    def seed(self, episode_count: int, words_per_episode: int, vocabulary_size: int) -> None:
+        """計測用のラジオ・回・単語を作成する
+
+        Args:
+            episode_count (int): 回の数
+            words_per_episode (int): 1回あたりの単語数
+            vocabulary_size (int): 語彙数
+        """
+        rand = random.Random(0)
+        vocabulary = [''.join(rand.choices(KATAKANA, k=rand.randint(2, 6)))
+                      for _ in range(vocabulary_size)]
+        vocabulary[:3] = ['ウチヤマ', 'ラジオ', 'ブンカホウソウ']
+
+        radio, _ = Radio.objects.get_or_create(
+            title='ベンチマーク', english_title='benchmark', defaults={'image': 'benchmark.png'})
+        start_number = (Episode.objects.filter(radio_id=radio).order_by('-number')
+                        .values_list('number', flat=True).first() or 0) + 1
+        for number in range(start_number, start_number + episode_count):
+            with transaction.atomic():
+                episode = Episode.objects.create(
+                    radio_id=radio, number=number, audio_file='benchmark.flac',
+                    air_date=datetime.date(2020, 1, 1), spotify_id='benchmark')
+                words = []
+                for position in range(words_per_episode):
+                    # paretovariateは1以上を返すため、1を引いて先頭の語彙を最頻出にする
+                    term = vocabulary[(int(rand.paretovariate(1.2)) - 1) % vocabulary_size]
+                    words.append(Word(episode_id=episode,
+                                      term_id=Term(original_form=term, pronunciation=term),
+                                      position=position, start_ms=position * 500,
+                                      end_ms=position * 500 + 400))
+                resolve_terms(words, batch_size=5000)
+                Word.objects.bulk_create(words, batch_size=5000)
+                # 取り込みと同じく単語統計と単語数を作り、単語保存済みにする
+                activate_generation(episode.id, 0, words)
+            self.stdout.write(f'seeded #{number}')
+
+
+def legacy_search(search_word: str, page_num: int):
+    """改修前の検索処理（比較用）
+
+    Args:
+        search_word (str): 検索キーワード
+        page_num (int): ページ番号
+
+    Returns:
+        str: 検索結果のhtml
+    """
+    episodes = Episode.objects.order_by('number').reverse().prefetch_related(
+        Prefetch('word_set', queryset=Word.objects.select_related('term_id').order_by(
+            'start_ms').filter(
+                Q(term_id__original_form__contains=search_word) |
+                Q(term_id__pronunciation__contains=search_word)
+            ))).filter(
+                Q(word__term_id__original_form__contains=search_word) |
+                Q(word__term_id__pronunciation__contains=search_word)
+            ).distinct()
+    for episode in episodes:
+        for word in episode.word_set.all():
+            word.start_time_minutes
+    page = Paginator(episodes, 5).page(page_num)
+    return render_to_string('search.html', {'episodes': page, 'keyword': search_word})
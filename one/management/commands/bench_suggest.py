@@ -0,0 +1,87 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from one.service.suggest import Suggestion, SuggestIndex, build_index
+
+# 疑似単語の生成に使用するカタカナ
+KATAKANA = [chr(c) for c in range(ord('ァ'), ord('ヶ') + 1)]
+
+
+class Command(BaseCommand):
+    help = '入力候補の索引の構築時間と検索のレイテンシを計測する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--terms', type=int, default=1000000,
+                            help='生成する単語の数（0の場合は単語統計から構築する）')
+        parser.add_argument('--queries', type=int, default=10000,
+                            help='計測する検索の回数')
+        parser.add_argument('--limit', type=int, default=10,
+                            help='返す候補の数')
+        parser.add_argument('--precompute-threshold', type=int, default=1000,
+                            help='上位の単語を事前に求める、前方一致の範囲の件数')
+
+    def handle(self, *args, **options):
+        rand = random.Random(0)
+        if options['terms']:
+            terms = generate_terms(rand, options['terms'])
+            start = time.perf_counter()
+            index = SuggestIndex(terms, options['limit'], options['precompute_threshold'])
+        else:
+            start = time.perf_counter()
+            index = build_index()
+            terms = index.terms
+        self.stdout.write(f'build: terms={len(terms)} time={time.perf_counter() - start:.2f}s')
+        if not terms:
+            return
+
+        # 既存の単語の先頭1〜4文字を検索する
+        prefixes = []
+        for _ in range(options['queries']):
+            term = rand.choice(terms)
+            key = term.pronunciation
+            prefixes.append(key[:rand.randint(1, 4)])
+
+        timings = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            index.lookup(prefix)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        self.stdout.write(
+            f'lookup: queries={len(timings)} '
+            f'p50={percentile(timings, 50) * 1000:.3f}ms '
+            f'p99={percentile(timings, 99) * 1000:.3f}ms '
+            f'max={timings[-1] * 1000:.3f}ms')
+
+
+def generate_terms(rand: random.Random, count: int) -> list:
+    """計測用の単語を生成する（出現回数は偏りのある分布）
+
+    Args:
+        rand (random.Random): 乱数生成器
+        count (int): 単語の数
+
+    Returns:
+        List[Suggestion]: 単語
+    """
+    terms = []
+    for _ in range(count):
+        pronunciation = ''.join(rand.choices(KATAKANA, k=rand.randint(2, 8)))
+        # 出現回数は単語統計と同じく1以上にするため、paretovariateの値（1以上）をそのまま使う
+        terms.append(Suggestion(pronunciation, pronunciation, f'{pronunciation}\t{pronunciation}',
+                                int(rand.paretovariate(1.2))))
+    return terms
+
+
+def percentile(sorted_values: list, percent: float) -> float:
+    """ソート済みの値のパーセンタイルを取得する
+
+    Args:
+        sorted_values (List[float]): ソート済みの値
+        percent (float): パーセント
+
+    Returns:
+        float: パーセンタイル
+    """
+    return sorted_values[min(int(len(sorted_values) * percent / 100), len(sorted_values) - 1)]
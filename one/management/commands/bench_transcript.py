@@ -0,0 +1,107 @@
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from one.models import Episode
+from one.service.ingestion import parse_records
+from one.service.transcript import iter_alternatives, iter_records
+
+# 計測用の単語
+SAMPLE_WORDS = ['内山|ウチヤマ', '文化放送|ブンカホウソウ', 'ラジオ|ラジオ', 'です|デス', '番組|バングミ']
+
+
+class Command(BaseCommand):
+    help = '文字起こしファイルの読み込みのピークメモリと実行時間を計測する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='計測する文字起こしファイル（省略時は生成する）')
+        parser.add_argument('--words', type=int, default=200000,
+                            help='生成する文字起こしファイルの単語数')
+        parser.add_argument('--results', type=int, default=1,
+                            help='生成する文字起こしファイルのresultの数')
+        parser.add_argument('--pipeline', action='store_true',
+                            help='全resultの形態素解析と開始時間の対応付けも計測する')
+
+    def handle(self, *args, **options):
+        file_path = options['file']
+        if not file_path:
+            file_path = write_transcript(options['words'], options['results'])
+        self.stdout.write(f'file={file_path} size={os.path.getsize(file_path) / 1024 / 1024:.1f}MB')
+
+        self.measure('json.loads', lambda: load_all(file_path))
+        self.measure('streaming ', lambda: load_streaming(file_path))
+        if options['pipeline']:
+            self.measure('pipeline  ', lambda: parse_and_align(file_path))
+
+        if not options['file']:
+            os.remove(file_path)
+
+    def measure(self, label: str, func) -> None:
+        """処理のピークメモリと実行時間を出力する
+
+        Args:
+            label (str): 出力するラベル
+            func (Callable): 計測する処理（読み込んだ単語数を返す）
+        """
+        tracemalloc.start()
+        start = time.perf_counter()
+        count = func()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f'{label}: words={count} peak={peak / 1024 / 1024:.1f}MB time={elapsed * 1000:.0f}ms')
+
+
+def write_transcript(word_count: int, result_count: int) -> str:
+    """計測用の文字起こしファイルを生成する
+
+    Args:
+        word_count (int): 単語数
+        result_count (int): resultの数
+
+    Returns:
+        str: 生成したファイルのパス
+    """
+    rand = random.Random(0)
+    results = []
+    per_result = word_count // result_count
+    for i in range(result_count):
+        words = [{
+            'startTime': f'{(i * per_result + j) * 0.3:.3f}s',
+            'endTime': f'{(i * per_result + j) * 0.3 + 0.2:.3f}s',
+            'word': rand.choice(SAMPLE_WORDS),
+        } for j in range(per_result)]
+        transcript = ''.join(word['word'].split('|')[0] for word in words)
+        results.append({'alternatives': [{'transcript': transcript, 'confidence': 0.9, 'words': words}]})
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as f:
+        json.dump({'results': results}, f, ensure_ascii=False)
+    return f.name
+
+
+def load_all(file_path: str) -> int:
+    """ファイル全体を読み込んでから単語を数える（改修前の方式）"""
+    with open(file_path, 'rb') as f:
+        transcript_json = json.loads(f.read())
+    return sum(len(result['alternatives'][0]['words']) for result in transcript_json['results'])
+
+
+def load_streaming(file_path: str) -> int:
+    """ファイルを少しずつ読み込みながら単語を数える"""
+    count = 0
+    with open(file_path, 'rb') as f:
+        for _, _, words in iter_alternatives(f):
+            for _ in words:
+                count += 1
+    return count
+
+
+def parse_and_align(file_path: str) -> int:
+    """全resultを1回の走査で形態素解析・開始時間の対応付けを行い、開始時間を設定した単語を数える"""
+    with open(file_path, 'rb') as f:
+        words, _ = parse_records(iter_records(f), Episode())
+    return sum(1 for word in words if word.start_ms is not None)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from one.models import Word
+from one.service.generation import collect_garbage
+
+
+class Command(BaseCommand):
+    help = '有効でない世代の単語を削除する（再保存の途中で失敗した場合の後片付け）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='1回に削除する単語数（省略時はWORD_GC_CHUNK_SIZE）')
+
+    def handle(self, *args, **options):
+        episode_ids = Word.objects.exclude(
+            generation=F('episode_id__active_generation')
+        ).values_list('episode_id', flat=True).distinct().order_by()
+        total = 0
+        for episode_id in list(episode_ids):
+            deleted = collect_garbage(episode_id, options['chunk_size'])
+            self.stdout.write(f'#{episode_id}: deleted={deleted}')
+            total += deleted
+        self.stdout.write(self.style.SUCCESS(f'{total}件の単語を削除しました'))
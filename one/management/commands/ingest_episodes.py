@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from one.models import Episode, IngestionJob
+from one.service.jobs import enqueue_ingestion
+from one.service.parallel import run_worker_processes, format_result
+
+
+class Command(BaseCommand):
+    help = '複数のエピソードの単語保存ジョブを登録し、ワーカープロセスで並列に実行する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('episode_ids', nargs='*', type=int,
+                            help='対象のエピソードID（省略時は単語未保存の全エピソード）')
+        parser.add_argument('--processes', type=int, default=settings.INGESTION_PROCESSES,
+                            help='プロセス数')
+        parser.add_argument('--reset', action='store_true',
+                            help='単語保存済みのエピソードも変更の有無にかかわらず再保存する')
+
+    def handle(self, *args, **options):
+        episodes = Episode.objects.exclude(job_name__isnull=True).order_by('id')
+        if options['episode_ids']:
+            episodes = episodes.filter(id__in=options['episode_ids'])
+        elif not options['reset']:
+            episodes = episodes.filter(word_stored=False)
+        # ワーカー（run_ingestion_worker）と同じジョブを使い、同じ回を同時に保存しない
+        job_ids = [enqueue_ingestion(episode, reset_words=options['reset']).id for episode in episodes]
+        if not job_ids:
+            raise CommandError('対象のエピソードがありません')
+
+        start = time.perf_counter()
+        run_worker_processes(options['processes'], once=True)
+        elapsed = time.perf_counter() - start
+
+        failed = 0
+        for job in IngestionJob.objects.filter(id__in=job_ids).order_by('id'):
+            self.stdout.write(format_result(job))
+            if job.status == IngestionJob.Status.FAILED:
+                failed += 1
+                self.stderr.write(job.error)
+        self.stdout.write(
+            f'{len(job_ids)}件（失敗{failed}件）を{options["processes"]}プロセスで'
+            f'{elapsed:.2f}秒で処理しました')
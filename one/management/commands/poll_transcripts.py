@@ -0,0 +1,34 @@
+import time
+import traceback
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from one.service.operations import poll_operations
+
+
+class Command(BaseCommand):
+    help = '文字起こしのオペレーションを確認し、完了したエピソードの単語保存ジョブを登録する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=30.0,
+                            help='確認処理を実行する間隔（秒）')
+        parser.add_argument('--limit', type=int, default=100,
+                            help='一度に確認するエピソードの最大数')
+        parser.add_argument('--once', action='store_true',
+                            help='1回だけ確認して終了する')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            try:
+                summary = poll_operations(options['limit'])
+            except Exception:
+                # DBの一時的なエラーなどで確認を止めず、次の間隔で再実行する
+                self.stderr.write(traceback.format_exc())
+            else:
+                if any(summary.values()):
+                    self.stdout.write(
+                        f"done={summary['done']} failed={summary['failed']} pending={summary['pending']}")
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from one.models import Term, TermNgram
+from one.service.index import index_terms
+
+
+class Command(BaseCommand):
+    help = '単語検索用の転置インデックス（語彙のN-gram）を再構築する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='一度に登録する語彙数')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        with transaction.atomic():
+            TermNgram.objects.all().delete()
+            terms = Term.objects.order_by('id').only(
+                'id', 'search_key')
+            chunk = []
+            for term in terms.iterator(chunk_size=chunk_size):
+                chunk.append(term)
+                if len(chunk) >= chunk_size:
+                    index_terms(chunk)
+                    chunk = []
+            index_terms(chunk)
+        self.stdout.write(self.style.SUCCESS('転置インデックスを再構築しました'))
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from one.service.parallel import run_worker_processes
+
+
+class Command(BaseCommand):
+    help = '単語保存ジョブを実行するワーカープロセスを起動する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.INGESTION_PROCESSES,
+                            help='ワーカープロセスの数（形態素解析はプロセスごとに並列に実行される）')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='プロセスごとに同時に実行するジョブの数')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='待機中のジョブがないときに待つ秒数')
+        parser.add_argument('--once', action='store_true',
+                            help='待機中のジョブがなくなったら終了する')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"ワーカーを{options['processes']}プロセス×{options['concurrency']}件起動しました")
+        try:
+            run_worker_processes(options['processes'], options['concurrency'],
+                                 options['once'], options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('実行中のジョブを終えて終了しました')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from one.service.cache import get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = '検索結果キャッシュのヒット数・ミス数を表示する'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='表示後にヒット数・ミス数をリセットする')
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        total = stats['hits'] + stats['misses']
+        hit_rate = stats['hits'] / total * 100 if total else 0
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} "
+            f"hit_rate={hit_rate:.1f}% generation={stats['generation']}")
+        if options['reset']:
+            reset_stats()
@@ -0,0 +1,30 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0008_alter_word_start_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WordNgram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=2, verbose_name='N-gram')),
+                ('word_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='one.word', verbose_name='単語ID')),
+            ],
+            options={
+                'verbose_name': '単語N-gram',
+                'verbose_name_plural': '単語N-gram',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='wordngram',
+            index=models.Index(fields=['gram', 'word_id'], name='word_ngram_gram_word_idx'),
+        ),
+    ]
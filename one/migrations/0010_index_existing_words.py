@@ -0,0 +1,37 @@
+from django.db import migrations
+
+# 以下はマイグレーション作成時点の one.service.index の複製
+# （アプリのコードが変わっても、このマイグレーションの結果が変わらないようにする）
+NGRAM_SIZE = 2
+
+
+def ngrams(text, n=NGRAM_SIZE):
+    """文字列をN-gramに分割する"""
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def index_existing_words(apps, schema_editor):
+    """保存済みの単語を転置インデックスに登録する"""
+    Word = apps.get_model('one', 'Word')
+    WordNgram = apps.get_model('one', 'WordNgram')
+    word_ngrams = []
+    words = Word.objects.order_by('id').only('id', 'original_form', 'pronunciation')
+    for word in words.iterator(chunk_size=10000):
+        grams = ngrams(word.original_form) | ngrams(word.pronunciation)
+        for gram in grams:
+            word_ngrams.append(WordNgram(word_id_id=word.id, gram=gram))
+        if len(word_ngrams) >= 10000:
+            WordNgram.objects.bulk_create(word_ngrams)
+            word_ngrams = []
+    WordNgram.objects.bulk_create(word_ngrams)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0009_wordngram'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_existing_words, migrations.RunPython.noop),
+    ]
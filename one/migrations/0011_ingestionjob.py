@@ -0,0 +1,38 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0010_index_existing_words'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reset_words', models.BooleanField(default=False, verbose_name='単語を再保存')),
+                ('status', models.CharField(choices=[('pending', '待機中'), ('running', '実行中'), ('succeeded', '完了'), ('failed', '失敗')], default='pending', max_length=16, verbose_name='ステータス')),
+                ('progress', models.PositiveSmallIntegerField(default=0, verbose_name='進捗率')),
+                ('error', models.TextField(blank=True, verbose_name='エラー')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='実行回数')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='開始日時')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='終了日時')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='作成日時')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+                ('episode_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='one.episode', verbose_name='エピソードID')),
+            ],
+            options={
+                'verbose_name': '単語保存ジョブ',
+                'verbose_name_plural': '単語保存ジョブ',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ingestionjob',
+            index=models.Index(fields=['status', 'id'], name='ingestion_job_status_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0011_ingestionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='episode',
+            name='operation_name',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='文字起こしオペレーション名'),
+        ),
+        migrations.AddField(
+            model_name='episode',
+            name='operation_next_poll_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='次回オペレーション確認日時'),
+        ),
+        migrations.AddField(
+            model_name='episode',
+            name='operation_poll_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='オペレーション確認回数'),
+        ),
+        migrations.AddIndex(
+            model_name='episode',
+            index=models.Index(fields=['operation_next_poll_at'], name='episode_next_poll_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0012_episode_operation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='transcribe_audio',
+            field=models.BooleanField(default=False, verbose_name='分割して文字起こし'),
+        ),
+    ]
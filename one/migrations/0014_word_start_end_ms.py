@@ -0,0 +1,53 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:53
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_start_time(apps, schema_editor):
+    """秒単位の開始時間をミリ秒単位に変換する"""
+    Word = apps.get_model('one', 'Word')
+    words = Word.objects.filter(start_time__isnull=False).only('id', 'start_time')
+    batch = []
+    for word in words.iterator(chunk_size=10000):
+        word.start_ms = round(word.start_time * 1000)
+        batch.append(word)
+        if len(batch) >= 10000:
+            Word.objects.bulk_update(batch, ['start_ms'])
+            batch = []
+    Word.objects.bulk_update(batch, ['start_ms'])
+
+
+def copy_start_ms(apps, schema_editor):
+    """ミリ秒単位の開始時間を秒単位に戻す"""
+    Word = apps.get_model('one', 'Word')
+    Word.objects.filter(start_ms__isnull=False).update(start_time=F('start_ms') / 1000.0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0013_ingestionjob_transcribe_audio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word',
+            name='end_ms',
+            field=models.IntegerField(blank=True, null=True, verbose_name='終了時間（ミリ秒）'),
+        ),
+        migrations.AddField(
+            model_name='word',
+            name='start_ms',
+            field=models.IntegerField(blank=True, null=True, verbose_name='開始時間（ミリ秒）'),
+        ),
+        migrations.RunPython(copy_start_time, copy_start_ms),
+        migrations.RemoveField(
+            model_name='word',
+            name='start_time',
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['episode_id', 'start_ms'], name='word_episode_start_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:55
+
+from django.db import migrations, models
+
+
+def number_existing_words(apps, schema_editor):
+    """保存済みの単語に回ごとの位置（保存順）を設定する"""
+    Episode = apps.get_model('one', 'Episode')
+    Word = apps.get_model('one', 'Word')
+    for episode_id in Episode.objects.values_list('id', flat=True).iterator():
+        words = list(Word.objects.filter(episode_id=episode_id).order_by('id').only('id'))
+        for position, word in enumerate(words):
+            word.position = position
+        Word.objects.bulk_update(words, ['position'], batch_size=10000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0014_word_start_end_ms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word',
+            name='position',
+            field=models.PositiveIntegerField(default=0, verbose_name='位置'),
+        ),
+        migrations.RunPython(number_existing_words, migrations.RunPython.noop),
+    ]
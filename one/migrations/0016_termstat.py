@@ -0,0 +1,55 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def count_existing_words(apps, schema_editor):
+    """保存済みの単語から回ごとの単語数と単語統計を集計する"""
+    Episode = apps.get_model('one', 'Episode')
+    Word = apps.get_model('one', 'Word')
+    TermStat = apps.get_model('one', 'TermStat')
+    for episode in Episode.objects.only('id').iterator():
+        rows = Word.objects.filter(episode_id=episode.id).values(
+            'original_form', 'pronunciation').annotate(count=models.Count('id')).order_by()
+        TermStat.objects.bulk_create([
+            TermStat(episode_id_id=episode.id, original_form=row['original_form'],
+                     pronunciation=row['pronunciation'], count=row['count'])
+            for row in rows
+        ], batch_size=10000)
+        episode.word_count = sum(row['count'] for row in rows)
+        episode.save(update_fields=['word_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0015_word_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='episode',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='単語数'),
+        ),
+        migrations.CreateModel(
+            name='TermStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_form', models.CharField(max_length=255, verbose_name='原形')),
+                ('pronunciation', models.CharField(max_length=255, verbose_name='読み')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='出現回数')),
+                ('episode_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='one.episode', verbose_name='エピソードID')),
+            ],
+            options={
+                'verbose_name': '単語統計',
+                'verbose_name_plural': '単語統計',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='termstat',
+            constraint=models.UniqueConstraint(fields=('episode_id', 'original_form', 'pronunciation'), name='term_stat_episode_term_unique'),
+        ),
+        migrations.RunPython(count_existing_words, migrations.RunPython.noop),
+    ]
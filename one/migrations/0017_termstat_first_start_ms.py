@@ -0,0 +1,37 @@
+# Generated by Django 4.1.2 on 2026-10-18 08:58
+
+from django.db import migrations, models
+
+
+def set_first_start_ms(apps, schema_editor):
+    """保存済みの単語から単語統計の最初の開始時間を集計する"""
+    Episode = apps.get_model('one', 'Episode')
+    Word = apps.get_model('one', 'Word')
+    TermStat = apps.get_model('one', 'TermStat')
+    for episode_id in Episode.objects.values_list('id', flat=True).iterator():
+        first_starts = {
+            (row['original_form'], row['pronunciation']): row['first_start_ms']
+            for row in Word.objects.filter(episode_id=episode_id, start_ms__isnull=False).values(
+                'original_form', 'pronunciation').annotate(
+                    first_start_ms=models.Min('start_ms')).order_by()
+        }
+        stats = list(TermStat.objects.filter(episode_id=episode_id))
+        for stat in stats:
+            stat.first_start_ms = first_starts.get((stat.original_form, stat.pronunciation))
+        TermStat.objects.bulk_update(stats, ['first_start_ms'], batch_size=10000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0016_termstat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='termstat',
+            name='first_start_ms',
+            field=models.IntegerField(blank=True, null=True, verbose_name='最初の開始時間（ミリ秒）'),
+        ),
+        migrations.RunPython(set_first_start_ms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 4.1.2 on 2026-10-18 09:02
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# 以下はマイグレーション作成時点の one.service.normalize・one.service.index の複製
+# （アプリのコードが変わっても、このマイグレーションの結果が変わらないようにする）
+HIRAGANA_TO_KATAKANA = str.maketrans(
+    {chr(code): chr(code + 0x60) for code in [*range(0x3041, 0x3097), 0x309D, 0x309E]})
+LONG_VOWEL_PATTERN = re.compile('(?<=[ァ-ヺー])[‐-―−〜～~-]')
+LONG_VOWEL_REPEAT_PATTERN = re.compile('ー{2,}')
+SPACE_PATTERN = re.compile(r'\s+')
+KEY_SEPARATOR = '\t'
+NGRAM_SIZE = 2
+
+
+def normalize(text):
+    """検索用に文字列を正規化する"""
+    text = unicodedata.normalize('NFKC', text).lower().translate(HIRAGANA_TO_KATAKANA)
+    text = LONG_VOWEL_PATTERN.sub('ー', text)
+    text = LONG_VOWEL_REPEAT_PATTERN.sub('ー', text)
+    return SPACE_PATTERN.sub('', text)
+
+
+def build_search_key(original_form, pronunciation):
+    """単語の原形と読みから検索キーを作る"""
+    return f'{normalize(original_form)}{KEY_SEPARATOR}{normalize(pronunciation)}'
+
+
+def key_ngrams(search_key, n=NGRAM_SIZE):
+    """検索キーの原形・読みそれぞれのN-gramを取得する"""
+    grams = set()
+    for part in search_key.split(KEY_SEPARATOR):
+        grams |= {part[i:i + n] for i in range(len(part) - n + 1)}
+    return grams
+
+
+def set_search_key(apps, schema_editor):
+    """保存済みの単語・単語統計に検索キーを設定し、転置インデックスを検索キーから作り直す"""
+    Word = apps.get_model('one', 'Word')
+    WordNgram = apps.get_model('one', 'WordNgram')
+    TermStat = apps.get_model('one', 'TermStat')
+
+    for model in (Word, TermStat):
+        batch = []
+        for row in model.objects.order_by('id').only(
+                'id', 'original_form', 'pronunciation').iterator(chunk_size=10000):
+            row.search_key = build_search_key(row.original_form, row.pronunciation)
+            batch.append(row)
+            if len(batch) >= 10000:
+                model.objects.bulk_update(batch, ['search_key'])
+                batch = []
+        model.objects.bulk_update(batch, ['search_key'])
+
+    WordNgram.objects.all().delete()
+    word_ngrams = []
+    for word in Word.objects.order_by('id').only('id', 'search_key').iterator(chunk_size=10000):
+        for gram in key_ngrams(word.search_key):
+            word_ngrams.append(WordNgram(word_id_id=word.id, gram=gram))
+        if len(word_ngrams) >= 10000:
+            WordNgram.objects.bulk_create(word_ngrams)
+            word_ngrams = []
+    WordNgram.objects.bulk_create(word_ngrams)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0017_termstat_first_start_ms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='termstat',
+            name='search_key',
+            field=models.CharField(default='', max_length=511, verbose_name='検索キー'),
+        ),
+        migrations.AddField(
+            model_name='word',
+            name='search_key',
+            field=models.CharField(default='', max_length=511, verbose_name='検索キー'),
+        ),
+        migrations.RunPython(set_search_key, migrations.RunPython.noop),
+    ]
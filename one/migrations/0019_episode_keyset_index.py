@@ -0,0 +1,21 @@
+# Generated by Django 4.1.2 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0018_search_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='episode',
+            index=models.Index(fields=['-number', '-id'], name='episode_number_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='episode',
+            index=models.Index(fields=['updated_at'], name='episode_updated_idx'),
+        ),
+    ]
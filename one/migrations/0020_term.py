@@ -0,0 +1,118 @@
+# Generated by Django 4.1.2 on 2026-10-18 10:12
+
+from importlib import import_module
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# 検索キーの作成とN-gramは 0018_search_key に固定した複製を使う
+# （アプリのコードが変わっても、このマイグレーションの結果が変わらないようにする）
+search_key_migration = import_module('one.migrations.0018_search_key')
+build_search_key = search_key_migration.build_search_key
+key_ngrams = search_key_migration.key_ngrams
+
+
+def create_terms(apps, schema_editor):
+    """保存済みの単語から語彙を作成し、単語に語彙IDを設定する"""
+    Word = apps.get_model('one', 'Word')
+    Term = apps.get_model('one', 'Term')
+    TermNgram = apps.get_model('one', 'TermNgram')
+
+    terms = []
+    for original_form, pronunciation in Word.objects.values_list(
+            'original_form', 'pronunciation').distinct().order_by().iterator(chunk_size=10000):
+        terms.append(Term(original_form=original_form, pronunciation=pronunciation,
+                          search_key=build_search_key(original_form, pronunciation)))
+        if len(terms) >= 10000:
+            Term.objects.bulk_create(terms)
+            terms = []
+    Term.objects.bulk_create(terms)
+
+    # 語彙の転置インデックスを作成
+    term_ngrams = []
+    for term in Term.objects.order_by('id').only('id', 'search_key').iterator(chunk_size=10000):
+        for gram in key_ngrams(term.search_key):
+            term_ngrams.append(TermNgram(term_id_id=term.id, gram=gram))
+        if len(term_ngrams) >= 10000:
+            TermNgram.objects.bulk_create(term_ngrams)
+            term_ngrams = []
+    TermNgram.objects.bulk_create(term_ngrams)
+
+    # 原形と読みが一致する語彙のIDを1つのUPDATEで設定する
+    Word.objects.update(term_id=models.Subquery(Term.objects.filter(
+        original_form=models.OuterRef('original_form'),
+        pronunciation=models.OuterRef('pronunciation'),
+    ).values('id')[:1]))
+
+
+def restore_word_strings(apps, schema_editor):
+    """単語に語彙の原形・読み・検索キーを戻し、単語の転置インデックスを作り直す"""
+    Word = apps.get_model('one', 'Word')
+    WordNgram = apps.get_model('one', 'WordNgram')
+    Term = apps.get_model('one', 'Term')
+
+    terms = Term.objects.filter(id=models.OuterRef('term_id'))
+    Word.objects.update(
+        original_form=models.Subquery(terms.values('original_form')[:1]),
+        pronunciation=models.Subquery(terms.values('pronunciation')[:1]),
+        search_key=models.Subquery(terms.values('search_key')[:1]),
+    )
+
+    WordNgram.objects.all().delete()
+    word_ngrams = []
+    for word in Word.objects.order_by('id').only('id', 'search_key').iterator(chunk_size=10000):
+        for gram in key_ngrams(word.search_key):
+            word_ngrams.append(WordNgram(word_id_id=word.id, gram=gram))
+        if len(word_ngrams) >= 10000:
+            WordNgram.objects.bulk_create(word_ngrams)
+            word_ngrams = []
+    WordNgram.objects.bulk_create(word_ngrams)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0019_episode_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Term',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_form', models.CharField(max_length=255, verbose_name='原形')),
+                ('pronunciation', models.CharField(max_length=255, verbose_name='読み')),
+                ('search_key', models.CharField(default='', max_length=511, verbose_name='検索キー')),
+            ],
+            options={
+                'verbose_name': '語彙',
+                'verbose_name_plural': '語彙',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='term',
+            constraint=models.UniqueConstraint(fields=('original_form', 'pronunciation'), name='term_unique'),
+        ),
+        migrations.CreateModel(
+            name='TermNgram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=2, verbose_name='N-gram')),
+                ('term_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='one.term', verbose_name='語彙ID')),
+            ],
+            options={
+                'verbose_name': '語彙N-gram',
+                'verbose_name_plural': '語彙N-gram',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='termngram',
+            constraint=models.UniqueConstraint(fields=('gram', 'term_id'), name='term_ngram_unique'),
+        ),
+        migrations.AddField(
+            model_name='word',
+            name='term_id',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='one.term', verbose_name='語彙ID'),
+        ),
+        migrations.RunPython(create_terms, restore_word_strings),
+    ]
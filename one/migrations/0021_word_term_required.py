@@ -0,0 +1,57 @@
+# Generated by Django 4.1.2 on 2026-10-18 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0020_term'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='word',
+            name='term_id',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='one.term', verbose_name='語彙ID'),
+        ),
+        # 戻す場合に既存の行へ追加できるよう、削除前に既定値を設定する
+        migrations.AlterField(
+            model_name='word',
+            name='original_form',
+            field=models.CharField(default='', max_length=255, verbose_name='原形'),
+        ),
+        migrations.AlterField(
+            model_name='word',
+            name='pronunciation',
+            field=models.CharField(default='', max_length=255, verbose_name='読み'),
+        ),
+        migrations.RemoveField(
+            model_name='word',
+            name='original_form',
+        ),
+        migrations.RemoveField(
+            model_name='word',
+            name='pronunciation',
+        ),
+        migrations.RemoveField(
+            model_name='word',
+            name='search_key',
+        ),
+        migrations.RemoveField(
+            model_name='word',
+            name='created_at',
+        ),
+        migrations.RemoveField(
+            model_name='word',
+            name='updated_at',
+        ),
+        migrations.DeleteModel(
+            name='WordNgram',
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['term_id', 'episode_id'], name='word_term_episode_idx'),
+        ),
+    ]
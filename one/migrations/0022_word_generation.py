@@ -0,0 +1,44 @@
+# Generated by Django 4.1.2 on 2026-10-18 09:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0021_word_term_required'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='word',
+            name='word_episode_start_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='word',
+            name='word_term_episode_idx',
+        ),
+        migrations.AddField(
+            model_name='episode',
+            name='active_generation',
+            field=models.PositiveIntegerField(default=0, verbose_name='有効な単語の世代'),
+        ),
+        migrations.AddField(
+            model_name='episode',
+            name='last_generation',
+            field=models.PositiveIntegerField(default=0, verbose_name='最新の単語の世代'),
+        ),
+        migrations.AddField(
+            model_name='word',
+            name='generation',
+            field=models.PositiveIntegerField(default=0, verbose_name='世代'),
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['episode_id', 'generation', 'start_ms'], name='word_episode_gen_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['term_id', 'episode_id', 'generation'], name='word_term_episode_gen_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.2 on 2026-10-18 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0022_word_generation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='episode',
+            name='alignment_version',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='開始時間の対応付けのバージョン'),
+        ),
+        migrations.AddField(
+            model_name='episode',
+            name='parser_version',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='形態素解析のバージョン'),
+        ),
+        migrations.AddField(
+            model_name='episode',
+            name='transcript_hash',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='文字起こしファイルのハッシュ値'),
+        ),
+        migrations.AddField(
+            model_name='episode',
+            name='word_hash',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='単語のハッシュ値'),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 4.1.2 on 2026-10-18 11:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def rebuild_term_stats(apps, schema_editor):
+    """単語統計を有効な世代の単語から語彙IDごとに作り直す"""
+    Episode = apps.get_model('one', 'Episode')
+    Word = apps.get_model('one', 'Word')
+    TermStat = apps.get_model('one', 'TermStat')
+
+    TermStat.objects.all().delete()
+    stats = []
+    rows = Word.objects.filter(
+        generation=models.F('episode_id__active_generation')
+    ).values('episode_id', 'term_id').annotate(
+        count=models.Count('id'), first_start_ms=models.Min('start_ms')
+    ).order_by()
+    for row in rows.iterator(chunk_size=10000):
+        stats.append(TermStat(
+            episode_id_id=row['episode_id'], term_id_id=row['term_id'],
+            count=row['count'], first_start_ms=row['first_start_ms']))
+        if len(stats) >= 10000:
+            TermStat.objects.bulk_create(stats)
+            stats = []
+    TermStat.objects.bulk_create(stats)
+
+    # 単語数も単語統計と揃える
+    Episode.objects.update(word_count=models.functions.Coalesce(models.Subquery(
+        TermStat.objects.filter(episode_id=models.OuterRef('id')).values(
+            'episode_id').annotate(total=models.Sum('count')).values('total')[:1]
+    ), 0))
+
+
+def restore_term_strings(apps, schema_editor):
+    """単語統計に語彙の原形・読み・検索キーを戻す"""
+    TermStat = apps.get_model('one', 'TermStat')
+    Term = apps.get_model('one', 'Term')
+
+    terms = Term.objects.filter(id=models.OuterRef('term_id'))
+    TermStat.objects.update(
+        original_form=models.Subquery(terms.values('original_form')[:1]),
+        pronunciation=models.Subquery(terms.values('pronunciation')[:1]),
+        search_key=models.Subquery(terms.values('search_key')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0023_episode_fingerprint'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='termstat',
+            name='term_stat_episode_term_unique',
+        ),
+        migrations.AddField(
+            model_name='termstat',
+            name='term_id',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='one.term', verbose_name='語彙ID'),
+        ),
+        migrations.RunPython(rebuild_term_stats, restore_term_strings),
+        # 戻すときに既存の行へ列を追加できるよう、削除前に既定値を設定する
+        migrations.AlterField(
+            model_name='termstat',
+            name='original_form',
+            field=models.CharField(default='', max_length=255, verbose_name='原形'),
+        ),
+        migrations.AlterField(
+            model_name='termstat',
+            name='pronunciation',
+            field=models.CharField(default='', max_length=255, verbose_name='読み'),
+        ),
+        migrations.RemoveField(
+            model_name='termstat',
+            name='original_form',
+        ),
+        migrations.RemoveField(
+            model_name='termstat',
+            name='pronunciation',
+        ),
+        migrations.RemoveField(
+            model_name='termstat',
+            name='search_key',
+        ),
+        migrations.AlterField(
+            model_name='termstat',
+            name='term_id',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='one.term', verbose_name='語彙ID'),
+        ),
+        migrations.AddConstraint(
+            model_name='termstat',
+            constraint=models.UniqueConstraint(fields=('episode_id', 'term_id'), name='term_stat_episode_term_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='termstat',
+            index=models.Index(fields=['term_id', 'episode_id'], name='term_stat_term_episode_idx'),
+        ),
+    ]
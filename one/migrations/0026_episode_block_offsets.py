@@ -0,0 +1,18 @@
+# Generated by Django 4.1.2 on 2026-10-18 09:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('one', '0025_search_generation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='episode',
+            name='block_offsets',
+            field=models.JSONField(blank=True, default=list, verbose_name='resultごとの最初の単語の位置'),
+        ),
+    ]
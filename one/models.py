@@ -1,5 +1,21 @@
 from django.db import models
 
+from typing import Optional
+
+
+def format_start_time(start_ms: Optional[int]) -> Optional[str]:
+    """開始時間を分単位（00:00形式）の文字列にする
+
+    Args:
+        start_ms (Optional[int]): 開始時間（ミリ秒）
+
+    Returns:
+        Optional[str]: 開始時間（開始時間が未設定の場合はNone）
+    """
+    if start_ms is None:
+        return None
+    return f'{str(start_ms // 60000).zfill(2)}:{str(start_ms // 1000 % 60).zfill(2)}'
+
 
 class Radio(models.Model):
     title = models.CharField(verbose_name="タイトル", max_length=255, unique=True)
@@ -25,6 +41,24 @@ class Episode(models.Model):
     spotify_id  = models.CharField(verbose_name="SpotifyID", max_length=255, null=True, blank=True)
     job_name    = models.CharField(verbose_name="ジョブ名", max_length=255, null=True, blank=True)
     word_stored = models.BooleanField(verbose_name="単語保存済み", default=False)
+    word_count  = models.PositiveIntegerField(verbose_name="単語数", default=0)
+    active_generation = models.PositiveIntegerField(verbose_name="有効な単語の世代", default=0)
+    last_generation = models.PositiveIntegerField(verbose_name="最新の単語の世代", default=0)
+    transcript_hash = models.CharField(
+        verbose_name="文字起こしファイルのハッシュ値", max_length=255, blank=True, default='')
+    word_hash = models.CharField(verbose_name="単語のハッシュ値", max_length=255, blank=True, default='')
+    parser_version = models.CharField(
+        verbose_name="形態素解析のバージョン", max_length=255, blank=True, default='')
+    alignment_version = models.CharField(
+        verbose_name="開始時間の対応付けのバージョン", max_length=255, blank=True, default='')
+    # 対応付けのみやり直すときに、形態素解析せずに保存済みの単語をresultごとに分けるため記録する
+    block_offsets = models.JSONField(verbose_name="resultごとの最初の単語の位置", blank=True, default=list)
+    operation_name = models.CharField(
+        verbose_name="文字起こしオペレーション名", max_length=255, null=True, blank=True)
+    operation_poll_count = models.PositiveIntegerField(
+        verbose_name="オペレーション確認回数", default=0)
+    operation_next_poll_at = models.DateTimeField(
+        verbose_name="次回オペレーション確認日時", null=True, blank=True)
     created_at  = models.DateTimeField(verbose_name="作成日時", auto_now_add=True)
     updated_at  = models.DateTimeField(verbose_name="更新日時", auto_now=True)
 
@@ -37,27 +71,187 @@ class Episode(models.Model):
                 name="radio_id_number_unique"
             )
         ]
+        indexes = [
+            models.Index(fields=["operation_next_poll_at"], name="episode_next_poll_idx"),
+            # 検索APIのキーセットページネーション（新しい回順）とETagの基準日時
+            models.Index(fields=["-number", "-id"], name="episode_number_id_idx"),
+            models.Index(fields=["updated_at"], name="episode_updated_idx"),
+        ]
 
     def __str__(self):
         word_stored_str = '保存済み' if self.word_stored else '未保存'
         return f'{str(self.radio_id.title)}#{str(self.number)} 単語：{word_stored_str}'
 
 
+class Term(models.Model):
+    original_form = models.CharField(verbose_name="原形", max_length=255)
+    pronunciation = models.CharField(verbose_name="読み", max_length=255)
+    search_key = models.CharField(verbose_name="検索キー", max_length=511, default='')
+
+    class Meta:
+        verbose_name = "語彙"
+        verbose_name_plural = "語彙"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["original_form", "pronunciation"],
+                name="term_unique"
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.original_form}（{self.pronunciation}）'
+
+
 class Word(models.Model):
     episode_id = models.ForeignKey(
         Episode, verbose_name="エピソードID", on_delete=models.CASCADE)
-    original_form = models.CharField(verbose_name="原形", max_length=255)
-    pronunciation = models.CharField(verbose_name="読み", max_length=255)
-    start_time = models.FloatField(
-        verbose_name="開始時間", max_length=255, null=True, blank=True)
-    created_at = models.DateTimeField(verbose_name="作成日時", auto_now_add=True)
-    updated_at = models.DateTimeField(verbose_name="更新日時", auto_now=True)
+    term_id = models.ForeignKey(
+        Term, verbose_name="語彙ID", on_delete=models.PROTECT)
+    generation = models.PositiveIntegerField(verbose_name="世代", default=0)
+    position = models.PositiveIntegerField(verbose_name="位置", default=0)
+    start_ms = models.IntegerField(verbose_name="開始時間（ミリ秒）", null=True, blank=True)
+    end_ms = models.IntegerField(verbose_name="終了時間（ミリ秒）", null=True, blank=True)
 
     class Meta:
         verbose_name = "単語"
         verbose_name_plural = "単語"
+        indexes = [
+            models.Index(fields=["episode_id", "generation", "start_ms"],
+                         name="word_episode_gen_start_idx"),
+            models.Index(fields=["term_id", "episode_id", "generation"],
+                         name="word_term_episode_gen_idx"),
+        ]
 
     def __str__(self):
         episode = self.episode_id
         radio = episode.radio_id
         return f'{radio.title}#{str(episode.number)}：{self.original_form}'
+
+    @property
+    def original_form(self) -> str:
+        """語彙の原形
+
+        Returns:
+            str: 原形
+        """
+        return self.term_id.original_form
+
+    @property
+    def pronunciation(self) -> str:
+        """語彙の読み
+
+        Returns:
+            str: 読み
+        """
+        return self.term_id.pronunciation
+
+    @property
+    def start_seconds(self) -> Optional[float]:
+        """秒単位の開始時間
+
+        Returns:
+            Optional[float]: 開始時間（開始時間が未設定の場合はNone）
+        """
+        if self.start_ms is None:
+            return None
+        return self.start_ms / 1000
+
+    @property
+    def start_time_minutes(self) -> Optional[str]:
+        """分単位の開始時間（00:00形式）
+
+        Returns:
+            Optional[str]: 開始時間（開始時間が未設定の場合はNone）
+        """
+        return format_start_time(self.start_ms)
+
+
+class TermNgram(models.Model):
+    term_id = models.ForeignKey(
+        Term, verbose_name="語彙ID", on_delete=models.CASCADE)
+    gram = models.CharField(verbose_name="N-gram", max_length=2)
+
+    class Meta:
+        verbose_name = "語彙N-gram"
+        verbose_name_plural = "語彙N-gram"
+        constraints = [
+            # 並列の単語保存で同じ語彙を登録しても重複しないようにする
+            models.UniqueConstraint(
+                fields=["gram", "term_id"],
+                name="term_ngram_unique"
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.gram}：{self.term_id_id}'
+
+
+class TermStat(models.Model):
+    episode_id = models.ForeignKey(
+        Episode, verbose_name="エピソードID", on_delete=models.CASCADE)
+    term_id = models.ForeignKey(
+        Term, verbose_name="語彙ID", on_delete=models.PROTECT)
+    count = models.PositiveIntegerField(verbose_name="出現回数", default=0)
+    first_start_ms = models.IntegerField(verbose_name="最初の開始時間（ミリ秒）", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "単語統計"
+        verbose_name_plural = "単語統計"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["episode_id", "term_id"],
+                name="term_stat_episode_term_unique"
+            )
+        ]
+        indexes = [
+            # 語彙IDの一覧で回ごとの出現回数を集計する（ranking.term_frequencies）
+            models.Index(fields=["term_id", "episode_id"],
+                         name="term_stat_term_episode_idx"),
+        ]
+
+    def __str__(self):
+        return f'{self.term_id_id}：{self.episode_id_id}（{self.count}回）'
+
+
+class IngestionJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', '待機中'
+        RUNNING = 'running', '実行中'
+        SUCCEEDED = 'succeeded', '完了'
+        FAILED = 'failed', '失敗'
+
+    episode_id  = models.ForeignKey(Episode, verbose_name="エピソードID", on_delete=models.CASCADE)
+    reset_words = models.BooleanField(verbose_name="単語を再保存", default=False)
+    transcribe_audio = models.BooleanField(verbose_name="分割して文字起こし", default=False)
+    status      = models.CharField(
+        verbose_name="ステータス", max_length=16, choices=Status.choices, default=Status.PENDING)
+    progress    = models.PositiveSmallIntegerField(verbose_name="進捗率", default=0)
+    error       = models.TextField(verbose_name="エラー", blank=True)
+    attempts    = models.PositiveIntegerField(verbose_name="実行回数", default=0)
+    started_at  = models.DateTimeField(verbose_name="開始日時", null=True, blank=True)
+    finished_at = models.DateTimeField(verbose_name="終了日時", null=True, blank=True)
+    created_at  = models.DateTimeField(verbose_name="作成日時", auto_now_add=True)
+    updated_at  = models.DateTimeField(verbose_name="更新日時", auto_now=True)
+
+    class Meta:
+        verbose_name = "単語保存ジョブ"
+        verbose_name_plural = "単語保存ジョブ"
+        indexes = [
+            models.Index(fields=["status", "id"], name="ingestion_job_status_idx"),
+        ]
+
+    def __str__(self):
+        return f'#{self.id} エピソード{self.episode_id_id}：{self.get_status_display()}'
+
+
+class SearchGeneration(models.Model):
+    # 全てのプロセスで共有するため、検索結果キャッシュの世代番号はDBに1行だけ保存する
+    generation = models.PositiveBigIntegerField(verbose_name="世代番号", default=0)
+    updated_at = models.DateTimeField(verbose_name="更新日時", auto_now=True)
+
+    class Meta:
+        verbose_name = "検索結果キャッシュの世代"
+        verbose_name_plural = "検索結果キャッシュの世代"
+
+    def __str__(self):
+        return f'世代{self.generation}'
@@ -0,0 +1,149 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+from ..models import Word
+from .normalize import is_hiragana
+from .transcript import TranscriptRecord
+
+from typing import Iterable, List, Optional, Tuple
+
+
+class SubstringMatchStrategy:
+    """原形または読みへの部分一致で単語と文字起こし結果を対応付ける（既定の方式）"""
+
+    # 照合のバージョン（照合の処理を変更したら上げる）
+    version = 1
+
+    def extract(self, record: TranscriptRecord) -> Optional[Tuple[str, str]]:
+        """文字起こし結果の単語から照合に使う原形と読みを取り出す
+
+        Args:
+            record (TranscriptRecord): 文字起こし結果の単語
+
+        Returns:
+            Optional[Tuple[str, str]]: 原形と読み（照合しない単語の場合はNone）
+        """
+        # 開始時間がなければスキップ
+        if record.word is None or record.start_time is None:
+            return None
+
+        word_split = record.word.split('|')
+        original_word = word_split[0]
+        # 発音はない可能性あり
+        pronunciation = word_split[1] if len(word_split) == 2 else original_word
+
+        # 2文字以下の「ひらがな」はスキップ
+        if (len(original_word) <= 2 and is_hiragana(original_word)):
+            return None
+        return original_word, pronunciation
+
+    def matches(self, word: Word, original_word: str, pronunciation: str) -> bool:
+        """単語が文字起こし結果の単語に一致するか判定する
+
+        Args:
+            word (Word): Wordモデル
+            original_word (str): 文字起こし結果の原形
+            pronunciation (str): 文字起こし結果の読み
+
+        Returns:
+            bool: 一致: True, 不一致: False
+        """
+        # 語彙の参照は1回にする（照合は単語数×windowの回数行われる）
+        term = word.term_id
+        return original_word in term.original_form or pronunciation in term.pronunciation
+
+
+def get_strategy() -> SubstringMatchStrategy:
+    """設定された照合方式を取得する
+
+    Returns:
+        SubstringMatchStrategy: 照合方式（WORD_ALIGNMENT_STRATEGY）のインスタンス
+    """
+    return import_string(settings.WORD_ALIGNMENT_STRATEGY)()
+
+
+def alignment_version(strategy: Optional[SubstringMatchStrategy] = None) -> str:
+    """開始時間の対応付けのバージョンを取得する
+
+    照合方式・照合のバージョン・探索する単語数のいずれかを変更した場合に値が変わる。
+
+    Args:
+        strategy (Optional[SubstringMatchStrategy]): 照合方式（省略時は設定値）
+
+    Returns:
+        str: バージョン（例: 'one.service.alignment.SubstringMatchStrategy:1:50'）
+    """
+    if strategy is None:
+        strategy = get_strategy()
+    strategy_class = type(strategy)
+    return (f'{strategy_class.__module__}.{strategy_class.__qualname__}:'
+            f'{strategy.version}:{settings.WORD_ALIGNMENT_WINDOW}')
+
+
+def parse_seconds(time_str: str) -> float:
+    """文字起こし結果の時間を秒に変換する
+
+    Args:
+        time_str (str): 時間（例: '12.300s'）
+
+    Returns:
+        float: 秒
+    """
+    # 開始時間からsを除去（例: 0s -> 0）
+    return float(time_str.replace('s', ''))
+
+
+def parse_ms(time_str: Optional[str]) -> Optional[int]:
+    """文字起こし結果の時間をミリ秒に変換する
+
+    Args:
+        time_str (Optional[str]): 時間（例: '12.300s'）
+
+    Returns:
+        Optional[int]: ミリ秒（時間がない場合はNone）
+    """
+    if time_str is None:
+        return None
+    return round(parse_seconds(time_str) * 1000)
+
+
+def align(words: List[Word], records: Iterable[TranscriptRecord],
+          strategy: Optional[SubstringMatchStrategy] = None,
+          window: Optional[int] = None) -> List[Word]:
+    """文字起こし結果の単語を出現順に単語へ対応付け、開始・終了時間を設定する
+
+    単語・文字起こし結果ともに発話順に並んでいるため、前回一致した単語の次から
+    window件の範囲で最初に一致した単語に開始時間を設定する（貪欲法）。
+    一致しない文字起こし結果は読み飛ばす。
+
+    Args:
+        words (List[Word]): 開始時間が未設定の単語（保存順）
+        records (Iterable[TranscriptRecord]): 文字起こし結果の単語（発話順）
+        strategy (Optional[SubstringMatchStrategy]): 照合方式（省略時は設定値）
+        window (Optional[int]): 前回一致した単語から探索する単語数（省略時は設定値）
+
+    Returns:
+        List[Word]: 開始・終了時間を設定した単語のリスト
+    """
+    if strategy is None:
+        strategy = get_strategy()
+    if window is None:
+        window = settings.WORD_ALIGNMENT_WINDOW
+
+    aligned = []
+    cursor = 0
+    for record in records:
+        if cursor >= len(words):
+            break
+        key = strategy.extract(record)
+        if key is None:
+            continue
+        original_word, pronunciation = key
+        for i in range(cursor, min(cursor + window, len(words))):
+            word = words[i]
+            if strategy.matches(word, original_word, pronunciation):
+                word.start_ms = parse_ms(record.start_time)
+                word.end_ms = parse_ms(record.end_time)
+                aligned.append(word)
+                cursor = i + 1
+                break
+    return aligned
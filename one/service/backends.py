@@ -0,0 +1,127 @@
+from functools import lru_cache
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from typing import BinaryIO, ContextManager, Dict, List, NamedTuple, Optional
+
+
+class ObjectNotFoundError(Exception):
+    """オブジェクトストレージにファイルがない（文字起こしが未完了の）場合の例外"""
+
+
+class OperationState(NamedTuple):
+    """文字起こしのオペレーションの状態"""
+    # 完了したかどうか
+    done: bool
+    # 失敗した場合のエラー内容
+    error: Optional[str] = None
+
+
+class ObjectStorage:
+    """音声ファイル・文字起こしファイルを保存するオブジェクトストレージ"""
+
+    def get_uri(self, file_path: str) -> str:
+        """ファイルのURIを取得する
+
+        Args:
+            file_path (str): ストレージのルートからのファイルパス
+
+        Returns:
+            str: 音声認識に渡すファイルのURI
+        """
+        raise NotImplementedError
+
+    def open(self, file_path: str) -> ContextManager[BinaryIO]:
+        """ファイルを読み込み用に開く
+
+        Args:
+            file_path (str): ストレージのルートからのファイルパス
+
+        Returns:
+            ContextManager[BinaryIO]: ファイルオブジェクトを返すコンテキストマネージャー
+
+        Raises:
+            ObjectNotFoundError: ファイルがない場合
+        """
+        raise NotImplementedError
+
+    def checksum(self, file_path: str) -> str:
+        """ファイルの内容のハッシュ値を取得する（可能な場合はダウンロードせずに取得する）
+
+        Args:
+            file_path (str): ストレージのルートからのファイルパス
+
+        Returns:
+            str: ハッシュ値（内容が同じファイルは同じ値）
+
+        Raises:
+            ObjectNotFoundError: ファイルがない場合
+        """
+        raise NotImplementedError
+
+    def upload(self, file_path: str, file: BinaryIO) -> None:
+        """ファイルを保存する
+
+        Args:
+            file_path (str): ストレージのルートからのファイルパス
+            file (BinaryIO): 保存する内容
+        """
+        raise NotImplementedError
+
+
+class SpeechRecognizer:
+    """音声ファイルを非同期で文字起こしする音声認識"""
+
+    def start(self, audio_uri: str, output_file_path: str) -> str:
+        """文字起こしを開始する
+
+        Args:
+            audio_uri (str): 音声ファイルのURI
+            output_file_path (str): 文字起こしファイルを保存するストレージのパス
+
+        Returns:
+            str: 文字起こしのオペレーション名
+        """
+        raise NotImplementedError
+
+    def get_operations(self, operation_names: List[str]) -> Dict[str, OperationState]:
+        """文字起こしのオペレーションの状態をまとめて取得する
+
+        Args:
+            operation_names (List[str]): オペレーション名のリスト
+
+        Returns:
+            Dict[str, OperationState]: オペレーション名をキーにしたオペレーションの状態
+        """
+        raise NotImplementedError
+
+
+@lru_cache(maxsize=None)
+def load_backend(path: str):
+    """バックエンドを生成する（同じプロセスでは同じインスタンスを使い回す）
+
+    Args:
+        path (str): バックエンドのクラスのパス
+
+    Returns:
+        バックエンドのインスタンス
+    """
+    return import_string(path)()
+
+
+def get_storage() -> ObjectStorage:
+    """設定されたオブジェクトストレージ（OBJECT_STORAGE_BACKEND）を取得する
+
+    Returns:
+        ObjectStorage: オブジェクトストレージ
+    """
+    return load_backend(settings.OBJECT_STORAGE_BACKEND)
+
+
+def get_recognizer() -> SpeechRecognizer:
+    """設定された音声認識（SPEECH_RECOGNIZER_BACKEND）を取得する
+
+    Returns:
+        SpeechRecognizer: 音声認識
+    """
+    return load_backend(settings.SPEECH_RECOGNIZER_BACKEND)
@@ -0,0 +1,126 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from ..models import SearchGeneration
+
+from typing import Any, Dict, Optional
+
+# ヒット数・ミス数のキー
+HITS_KEY = 'search:hits'
+MISSES_KEY = 'search:misses'
+# 世代番号の行のID
+GENERATION_ID = 1
+
+
+def get_generation() -> int:
+    """検索結果キャッシュの現在の世代番号を取得する
+
+    世代番号はDBに保存するため、単語保存ジョブのワーカーで更新した世代番号を
+    全てのWebプロセスで参照できる（キャッシュのバックエンドがプロセスごとの場合も同じ）。
+
+    Returns:
+        int: 世代番号（1度も更新していない場合は0）
+    """
+    generation = SearchGeneration.objects.filter(id=GENERATION_ID).values_list(
+        'generation', flat=True).first()
+    return generation or 0
+
+
+def invalidate_search_cache() -> None:
+    """世代番号を更新し、全ての検索結果キャッシュを無効にする
+
+    単語を追加・更新・削除したときに呼び出す。
+    """
+    SearchGeneration.objects.get_or_create(id=GENERATION_ID)
+    # 同時に更新しても世代番号が戻らないよう、DB側で1増やす
+    SearchGeneration.objects.filter(id=GENERATION_ID).update(generation=F('generation') + 1)
+
+
+def make_search_key(search_word: str, page_num: Any, sort: str) -> str:
+    """検索結果キャッシュのキーを作成する
+
+    キーには現在の世代番号を含めるため、1回の検索で1度だけ作成し、取得と保存の両方に使う。
+
+    Args:
+        search_word (str): 正規化済みの検索キーワード
+        page_num (Any): ページ番号（不正な場合は1ページ目として扱う）
+        sort (str): 並び順
+
+    Returns:
+        str: キャッシュキー
+    """
+    digest = hashlib.md5(
+        f'{search_word}\t{normalize_page_num(page_num)}\t{sort}'.encode()).hexdigest()
+    return f'search:{get_generation()}:{digest}'
+
+
+def normalize_page_num(page_num: Any) -> int:
+    """ページ番号を整数にする（"01"や未指定も同じキーになるようにする）
+
+    Args:
+        page_num (Any): ページ番号
+
+    Returns:
+        int: ページ番号（不正な場合は1）
+    """
+    try:
+        return max(int(page_num), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def get_search_result(key: str) -> Optional[Dict]:
+    """キャッシュから検索結果を取得し、ヒット数・ミス数を記録する
+
+    Args:
+        key (str): キャッシュキー（make_search_key）
+
+    Returns:
+        Optional[Dict]: 検索結果（キャッシュがない場合はNone）
+    """
+    result = cache.get(key)
+    increment(HITS_KEY if result is not None else MISSES_KEY)
+    return result
+
+
+def set_search_result(key: str, result: Dict) -> None:
+    """検索結果をキャッシュに保存する
+
+    Args:
+        key (str): 検索前に作成したキャッシュキー（make_search_key）
+        result (Dict): 検索結果
+    """
+    cache.set(key, result, timeout=settings.SEARCH_CACHE_TIMEOUT)
+
+
+def increment(key: str) -> None:
+    """カウンターを1増やす
+
+    Args:
+        key (str): カウンターのキー
+    """
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # add と incr の間に追い出された場合
+            cache.set(key, 1, timeout=None)
+
+
+def get_stats() -> Dict[str, int]:
+    """検索結果キャッシュのヒット数・ミス数を取得する
+
+    Returns:
+        Dict[str, int]: ヒット数（hits）、ミス数（misses）、世代番号（generation）
+    """
+    return {
+        'hits': cache.get(HITS_KEY, 0),
+        'misses': cache.get(MISSES_KEY, 0),
+        'generation': get_generation(),
+    }
+
+
+def reset_stats() -> None:
+    """ヒット数・ミス数をリセットする"""
+    cache.delete_many([HITS_KEY, MISSES_KEY])
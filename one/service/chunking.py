@@ -0,0 +1,205 @@
+import io
+import json
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import soundfile
+from django.conf import settings
+from django.db import connection
+from ..models import Episode
+from .alignment import parse_seconds
+from .backends import get_recognizer, get_storage
+from .transcript import iter_alternatives
+
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+
+class AudioChunk(NamedTuple):
+    """音声ファイルを分割した区間"""
+    # 区間の番号
+    index: int
+    # 元の音声ファイルでの開始・終了位置（秒）
+    start: float
+    end: float
+    # 区間のFLACデータ（文字起こし後は不要なのでNone）
+    data: Optional[bytes] = None
+
+
+def split_audio(file_path: str, chunk_seconds: float, overlap_seconds: float) -> Iterator[AudioChunk]:
+    """音声ファイルを前後の区間と重なるように分割する
+
+    Args:
+        file_path (str): 音声ファイルのパス
+        chunk_seconds (float): 区間の長さ（秒）
+        overlap_seconds (float): 前後の区間と重なる長さ（秒）
+
+    Raises:
+        ValueError: 重なる長さが区間の長さ以上の場合（区間が先に進まない）
+
+    Yields:
+        AudioChunk: FLACに変換した区間
+    """
+    if chunk_seconds <= 0 or not 0 <= overlap_seconds < chunk_seconds:
+        raise ValueError(f'区間の長さ（{chunk_seconds}秒）は重なる長さ（{overlap_seconds}秒）より長くしてください')
+    with soundfile.SoundFile(file_path) as audio:
+        rate = audio.samplerate
+        size = int(chunk_seconds * rate)
+        step = int((chunk_seconds - overlap_seconds) * rate)
+        if step <= 0:
+            raise ValueError(f'区間の長さと重なる長さの差が1サンプル未満です: {chunk_seconds - overlap_seconds}秒')
+        index = 0
+        start = 0
+        while True:
+            audio.seek(start)
+            frames = audio.read(min(size, audio.frames - start), dtype='int32', always_2d=True)
+            buffer = io.BytesIO()
+            soundfile.write(buffer, frames, rate, format='FLAC', subtype=audio.subtype)
+            yield AudioChunk(index, start / rate, (start + len(frames)) / rate, buffer.getvalue())
+            if start + size >= audio.frames:
+                return
+            start += step
+            index += 1
+
+
+def stitch(chunk_words: List[Tuple[AudioChunk, List[Dict]]], overlap_seconds: float) -> Dict:
+    """区間ごとの文字起こし結果を1つの時系列につなげる
+
+    単語の時間を元の音声ファイルでの時間に変換し、重なる区間はその中間で切り替える。
+
+    Args:
+        chunk_words (List[Tuple[AudioChunk, List[Dict]]]): 区間と区間の単語（区間の番号順）
+        overlap_seconds (float): 前後の区間と重なる長さ（秒）
+
+    Returns:
+        Dict: 文字起こしファイルと同じ形式の文字起こし結果（resultは1件）
+    """
+    words = []
+    last_start = 0.0
+    for i, (chunk, chunk_items) in enumerate(chunk_words):
+        lower = chunk.start + overlap_seconds / 2 if i > 0 else 0.0
+        upper = (chunk_words[i + 1][0].start + overlap_seconds / 2
+                 if i + 1 < len(chunk_words) else float('inf'))
+        for item in chunk_items:
+            word = dict(item)
+            # 時間がない単語は直前の単語の時間で判定する
+            start = last_start
+            if 'startTime' in item:
+                start = max(chunk.start + parse_seconds(item['startTime']), last_start)
+                word['startTime'] = format_seconds(start)
+            if 'endTime' in item:
+                word['endTime'] = format_seconds(
+                    max(chunk.start + parse_seconds(item['endTime']), start))
+            if not lower <= start < upper:
+                continue
+            last_start = start
+            words.append(word)
+
+    transcript = ''.join(word['word'].split('|')[0] for word in words)
+    return {'results': [{'alternatives': [{'transcript': transcript, 'words': words}]}]}
+
+
+def format_seconds(seconds: float) -> str:
+    """秒を文字起こしファイルの時間の形式にする
+
+    Args:
+        seconds (float): 秒
+
+    Returns:
+        str: 時間（例: '12.300s'）
+    """
+    return f'{seconds:.3f}s'
+
+
+def wait_operation(operation_name: str, on_poll: Callable[[], None] = lambda: None) -> None:
+    """文字起こしのオペレーションの完了を待つ（確認間隔は倍々に延ばす）
+
+    確認間隔はTRANSCRIBE_CHUNK_POLL_MAX_INTERVALまでとし、確認のたびにon_pollを呼び出す。
+
+    Args:
+        operation_name (str): オペレーション名
+        on_poll (Callable[[], None]): 確認のたびに呼び出す関数
+
+    Raises:
+        RuntimeError: 文字起こしに失敗した場合
+    """
+    interval = settings.TRANSCRIBE_CHUNK_POLL_INTERVAL
+    while True:
+        on_poll()
+        state = get_recognizer().get_operations([operation_name])[operation_name]
+        if state.done:
+            if state.error:
+                raise RuntimeError(f'文字起こしに失敗しました: {state.error}')
+            return
+        time.sleep(interval)
+        interval = min(interval * 2, settings.TRANSCRIBE_CHUNK_POLL_MAX_INTERVAL)
+
+
+def transcribe_chunk(chunk: AudioChunk, prefix: str,
+                     on_poll: Callable[[], None] = lambda: None) -> Tuple[AudioChunk, List[Dict]]:
+    """区間をストレージに保存して文字起こしし、完了まで待って単語を取得する
+
+    Args:
+        chunk (AudioChunk): 区間
+        prefix (str): 区間の音声ファイル・文字起こしファイルを保存するストレージのパス
+        on_poll (Callable[[], None]): 文字起こしの完了を確認するたびに呼び出す関数
+
+    Returns:
+        Tuple[AudioChunk, List[Dict]]: 区間（FLACデータなし）と区間の単語
+    """
+    storage = get_storage()
+    audio_path = f'{prefix}/chunk_{chunk.index:03}.flac'
+    output_path = f'{prefix}/chunk_{chunk.index:03}.json'
+    try:
+        storage.upload(audio_path, io.BytesIO(chunk.data))
+        operation_name = get_recognizer().start(storage.get_uri(audio_path), output_path)
+        wait_operation(operation_name, on_poll)
+
+        words = []
+        with storage.open(output_path) as file:
+            for _, _, items in iter_alternatives(file):
+                words.extend(items)
+        return chunk._replace(data=None), words
+    finally:
+        # on_pollでDBを更新した場合のスレッドごとのDB接続を閉じる
+        connection.close()
+
+
+def transcribe_chunked(episode: Episode,
+                       on_progress: Callable[[int], None] = lambda progress: None) -> None:
+    """エピソードの音声ファイルを区間に分けて並列に文字起こしし、つなげた結果を保存する
+
+    つなげた文字起こし結果はエピソードのジョブ名のパスに保存するため、
+    以降は通常の単語保存で扱える。同時に文字起こしする区間はTRANSCRIBE_CHUNK_CONCURRENCY件まで。
+    文字起こしの完了を待つ間も、確認のたびにon_progressを進捗率0で呼び出す
+    （単語保存ジョブの更新日時を更新し、停止したジョブとみなされないようにする）。
+
+    Args:
+        episode (Episode): ジョブ名を保存済みのEpisodeモデル
+        on_progress (Callable[[int], None]): 進捗率（%）を受け取る関数
+    """
+    storage = get_storage()
+    prefix = episode.job_name.rsplit('.', 1)[0]
+    overlap = settings.TRANSCRIBE_CHUNK_OVERLAP_SECONDS
+    concurrency = settings.TRANSCRIBE_CHUNK_CONCURRENCY
+    # 分割済みで未処理の区間を同時実行数までに抑える
+    slots = threading.BoundedSemaphore(concurrency)
+
+    with tempfile.NamedTemporaryFile() as audio_file:
+        with storage.open(str(episode.audio_file)) as file:
+            shutil.copyfileobj(file, audio_file)
+        audio_file.flush()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = []
+            for chunk in split_audio(audio_file.name, settings.TRANSCRIBE_CHUNK_SECONDS, overlap):
+                slots.acquire()
+                future = executor.submit(transcribe_chunk, chunk, prefix, lambda: on_progress(0))
+                future.add_done_callback(lambda _: slots.release())
+                futures.append(future)
+            chunk_words = [future.result() for future in futures]
+
+    transcript_json = stitch(chunk_words, overlap)
+    storage.upload(episode.job_name,
+                   io.BytesIO(json.dumps(transcript_json, ensure_ascii=False).encode()))
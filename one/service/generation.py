@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, QuerySet
+from django.utils import timezone
+from ..models import Episode, Word
+from .stats import add_term_stats, clear_term_stats
+from .cache import invalidate_search_cache
+
+from typing import List, Optional
+
+
+def active_words() -> QuerySet:
+    """回の有効な世代の単語を取得する
+
+    再保存中の新しい世代や、削除前の古い世代の単語は含まない。
+
+    Returns:
+        QuerySet: Wordモデルのクエリセット
+    """
+    return Word.objects.filter(generation=F('episode_id__active_generation'))
+
+
+def next_generation(episode_id: int) -> int:
+    """単語を再保存するための新しい世代を発行する
+
+    同じ回を同時に再保存しても世代は重複しない。
+
+    Args:
+        episode_id (int): エピソードID
+
+    Returns:
+        int: 世代
+    """
+    with transaction.atomic():
+        Episode.objects.filter(id=episode_id).update(last_generation=F('last_generation') + 1)
+        return Episode.objects.values_list('last_generation', flat=True).get(id=episode_id)
+
+
+def activate_generation(episode_id: int, generation: int, words: List[Word]) -> bool:
+    """新しい世代の単語を有効にする
+
+    1トランザクションで単語統計を作り直し、有効な世代を切り替えて「単語保存済み」にするため、
+    検索から回が消えたり、新旧の単語が混ざって見えたりすることはない。
+    後から始めた再保存が先に有効になっていた場合は切り替えない。
+
+    Args:
+        episode_id (int): エピソードID
+        generation (int): 有効にする世代
+        words (List[Word]): 有効にする世代の保存済みの全ての単語
+
+    Returns:
+        bool: 切り替えた: True, より新しい世代が有効なため切り替えなかった: False
+    """
+    with transaction.atomic():
+        episode = Episode.objects.select_for_update().get(id=episode_id)
+        if episode.active_generation > generation:
+            return False
+        clear_term_stats(episode_id)
+        add_term_stats(words)
+        Episode.objects.filter(id=episode_id).update(
+            active_generation=generation, word_stored=True, updated_at=timezone.now())
+        transaction.on_commit(invalidate_search_cache)
+    return True
+
+
+def collect_garbage(episode_id: int, chunk_size: Optional[int] = None) -> int:
+    """回の有効でない世代の単語を削除する
+
+    有効な世代より古い世代に加え、途中で失敗した再保存や有効にならなかった再保存が残した
+    新しい世代の単語も削除する（同じ回の再保存は単語保存ジョブで1件ずつ実行される）。
+    一定件数ごとに別のトランザクションで削除し、テーブルを長時間ロックしない。
+
+    Args:
+        episode_id (int): エピソードID
+        chunk_size (Optional[int]): 1回に削除する件数（省略時は設定値）
+
+    Returns:
+        int: 削除した単語数
+    """
+    chunk_size = chunk_size or settings.WORD_GC_CHUNK_SIZE
+    active = Episode.objects.values_list('active_generation', flat=True).get(id=episode_id)
+    old_words = Word.objects.filter(~Q(generation=active), episode_id=episode_id)
+    deleted = 0
+    while True:
+        ids = list(old_words.values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        deleted += Word.objects.filter(id__in=ids).delete()[0]
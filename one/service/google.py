@@ -1,7 +1,11 @@
-import json
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from google.api_core.exceptions import NotFound
 from google.cloud import speech, storage
+from .backends import ObjectNotFoundError, ObjectStorage, OperationState, SpeechRecognizer
 
-from typing import Dict
+from typing import BinaryIO, Dict, Iterator, List
 
 import environ
 env = environ.Env()
@@ -21,50 +25,88 @@ def get_gcs_uri(file_path: str) -> str:
     return f'{prefix}{bucket_name}/{file_path}'
 
 
-def transcribe_gcs(gcs_uri: str, output_file_path: str):
-    """GCSにある音声ファイルを非同期で文字起こしする
-
-    Args:
-        gcs_uri (str): GCSにある音声ファイルのURI
-        output_file_path (str): 文字起こしファイルを保存するGCSのパス
-    """
-    # Instantiates a client
-    client = speech.SpeechClient()
-
-    audio = speech.RecognitionAudio(uri=gcs_uri)
-
-    config = speech.RecognitionConfig(
-        encoding=speech.RecognitionConfig.AudioEncoding.FLAC,
-        language_code="ja-JP",
-        audio_channel_count= 2,
-        # 単語の時間を取得
-        enable_word_time_offsets=True,
-    )
-
-    output_config = speech.TranscriptOutputConfig(
-        gcs_uri=get_gcs_uri(output_file_path)
-    )
-
-    request = speech.LongRunningRecognizeRequest(
-        config=config,
-        audio=audio,
-        output_config=output_config
-    )
-
-    # Detects speech in the audio file
-    client.long_running_recognize(request=request)
-
-
-def get_transcript_result(file_path: str) -> Dict:
-    """GCSから文字起こし結果を取得する
-
-    Args:
-        file_name (str): GCSバケットのルートからのファイルパス
-
-    Returns:
-        Dict: 文字起こしファイルの内容
-    """
-    bucket = storage.Client().get_bucket(env.str('GS_BUCKET_NAME'))
-    blob = storage.Blob(file_path, bucket)
-    content = blob.download_as_string()
-    return json.loads(content)
+class GoogleCloudStorage(ObjectStorage):
+    """Google Cloud Storage（クライアントはスレッドごとに使い回す）"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def bucket(self) -> storage.Bucket:
+        bucket = getattr(self._local, 'bucket', None)
+        if bucket is None:
+            bucket = storage.Client().bucket(env.str('GS_BUCKET_NAME'))
+            self._local.bucket = bucket
+        return bucket
+
+    def get_uri(self, file_path: str) -> str:
+        return get_gcs_uri(file_path)
+
+    @contextmanager
+    def open(self, file_path: str) -> Iterator[BinaryIO]:
+        # 読み込むごとにchunk_size単位でダウンロードする
+        blob = self.bucket.blob(file_path)
+        try:
+            with blob.open('rb', chunk_size=settings.TRANSCRIPT_CHUNK_SIZE) as file:
+                yield file
+        except NotFound as e:
+            raise ObjectNotFoundError(file_path) from e
+
+    def checksum(self, file_path: str) -> str:
+        # メタデータのみ取得する（複合オブジェクトはMD5がないためCRC32Cを使う）
+        blob = self.bucket.get_blob(file_path)
+        if blob is None:
+            raise ObjectNotFoundError(file_path)
+        return blob.md5_hash or f'crc32c:{blob.crc32c}'
+
+    def upload(self, file_path: str, file: BinaryIO) -> None:
+        self.bucket.blob(file_path).upload_from_file(file)
+
+
+class GoogleSpeechRecognizer(SpeechRecognizer):
+    """Google Speech-to-Text（クライアントはプロセス内で使い回す）"""
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> speech.SpeechClient:
+        with self._lock:
+            if self._client is None:
+                self._client = speech.SpeechClient()
+        return self._client
+
+    def start(self, audio_uri: str, output_file_path: str) -> str:
+        audio = speech.RecognitionAudio(uri=audio_uri)
+
+        config = speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding.FLAC,
+            language_code="ja-JP",
+            audio_channel_count= 2,
+            # 単語の時間を取得
+            enable_word_time_offsets=True,
+        )
+
+        output_config = speech.TranscriptOutputConfig(
+            gcs_uri=get_gcs_uri(output_file_path)
+        )
+
+        request = speech.LongRunningRecognizeRequest(
+            config=config,
+            audio=audio,
+            output_config=output_config
+        )
+
+        # Detects speech in the audio file
+        operation = self.client.long_running_recognize(request=request)
+        return operation.operation.name
+
+    def get_operations(self, operation_names: List[str]) -> Dict[str, OperationState]:
+        operations_client = self.client.transport.operations_client
+        states = {}
+        for name in operation_names:
+            operation = operations_client.get_operation(name)
+            error = operation.error.message if operation.HasField('error') else None
+            states[name] = OperationState(done=operation.done, error=error)
+        return states
@@ -0,0 +1,135 @@
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Count, F, Min, Q, QuerySet, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from ..models import Episode, Word, format_start_time
+from .generation import active_words
+
+from typing import Dict, List, NamedTuple, Optional
+
+# 検索結果に表示する回ごとの一致箇所の数（残りは一致箇所APIで取得する）
+HITS_PREVIEW = 10
+
+
+class Hit(NamedTuple):
+    """単語が一致した箇所"""
+    original_form: str
+    # 開始時間（ミリ秒、未設定の場合はNone）
+    start_ms: Optional[int]
+
+    @property
+    def start_seconds(self) -> Optional[float]:
+        """秒単位の開始時間（Spotifyプレイヤーの再生位置に使用する）"""
+        return None if self.start_ms is None else self.start_ms / 1000
+
+    @property
+    def start_time_minutes(self) -> Optional[str]:
+        """分単位の開始時間（00:00形式）"""
+        return format_start_time(self.start_ms)
+
+    def to_dict(self) -> Dict:
+        """JSONで返す形式にする
+
+        Returns:
+            Dict: 原形、開始時間（ミリ秒・秒・00:00形式）
+        """
+        return {
+            'original_form': self.original_form,
+            'start_ms': self.start_ms,
+            'start_seconds': self.start_seconds,
+            'start_time_minutes': self.start_time_minutes,
+        }
+
+
+class TermCount(NamedTuple):
+    """回の中で一致した語彙と出現回数"""
+    original_form: str
+    count: int
+
+
+class HitSummary(NamedTuple):
+    """回の一致箇所の要約"""
+    # 一致した箇所の数
+    total: int
+    # 一致した語彙（最初に話された順）
+    terms: List[TermCount]
+    # 最初のHITS_PREVIEW件の一致箇所（開始時間順）
+    hits: List[Hit]
+
+    @property
+    def rest(self) -> int:
+        """表示していない一致箇所の数"""
+        return self.total - len(self.hits)
+
+
+def summarize_hits(episodes: List[Episode], word_filter: Q, limit: int = HITS_PREVIEW) -> None:
+    """ページの回ごとに一致箇所を集計し、hit_summaryに設定する
+
+    語彙ごとの出現回数はDBで集計し、開始時間は回ごとに最初のlimit件のみ取得する。
+    いずれもページの全ての回をまとめて1回のクエリで取得する。
+
+    Args:
+        episodes (List[Episode]): ページの回
+        word_filter (Q): 一致した単語の条件（語彙IDまたは単語ID）
+        limit (int): 回ごとに取得する一致箇所の数
+    """
+    words = active_words().filter(word_filter)
+    terms: Dict[int, List[TermCount]] = {episode.id: [] for episode in episodes}
+    for row in words.filter(episode_id__in=terms.keys()).values(
+            'episode_id', 'term_id', 'term_id__original_form').annotate(
+                count=Count('id'), first_start_ms=Min('start_ms')).order_by(
+                    'episode_id', F('first_start_ms').asc(nulls_last=True)):
+        terms[row['episode_id']].append(TermCount(row['term_id__original_form'], row['count']))
+
+    hits: Dict[int, List[Hit]] = {episode.id: [] for episode in episodes}
+    for episode_id, original_form, start_ms in preview_words(
+            words.filter(episode_id__in=hits.keys()), limit).values_list(
+                'episode_id', 'term_id__original_form', 'start_ms'):
+        hits[episode_id].append(Hit(original_form, start_ms))
+
+    for episode in episodes:
+        episode.hit_summary = HitSummary(
+            sum(term.count for term in terms[episode.id]), terms[episode.id], hits[episode.id])
+
+
+def preview_words(words: QuerySet, limit: int) -> QuerySet:
+    """回ごとに開始時間順で最初のlimit件の単語に絞り込む
+
+    回ごとの順位をウィンドウ関数で求め、順位での絞り込みはサブクエリで行う
+    （Django 4.1ではウィンドウ関数の結果で直接絞り込めないため）。
+
+    Args:
+        words (QuerySet): 一致した単語のクエリセット
+        limit (int): 回ごとに取得する件数
+
+    Returns:
+        QuerySet: 回・開始時間順の単語のクエリセット
+    """
+    order_by = [F('start_ms').asc(nulls_last=True), F('position').asc()]
+    ranked = words.annotate(preview_rank=Window(
+        RowNumber(), partition_by=[F('episode_id')], order_by=order_by)).values('id', 'preview_rank')
+    try:
+        sql, params = ranked.query.sql_with_params()
+    except EmptyResultSet:
+        # 一致する単語がない条件（空のIDのリストなど）はSQLにできない
+        return Word.objects.none()
+    return Word.objects.filter(
+        id__in=RawSQL(f'SELECT id FROM ({sql}) ranked WHERE preview_rank <= %s', (*params, limit))
+    ).order_by('episode_id', *order_by)
+
+
+def list_hits(words: QuerySet, offset: int, limit: Optional[int]) -> List[Hit]:
+    """一致した単語を開始時間順に取得する
+
+    Args:
+        words (QuerySet): 回の一致した単語のクエリセット
+        offset (int): 読み飛ばす件数
+        limit (Optional[int]): 取得する件数（Noneの場合は全て）
+
+    Returns:
+        List[Hit]: 一致箇所
+    """
+    words = words.order_by(F('start_ms').asc(nulls_last=True), 'position').values_list(
+        'term_id__original_form', 'start_ms')
+    end = None if limit is None else offset + limit
+    return [Hit(*row) for row in words[offset:end]]
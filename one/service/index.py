@@ -0,0 +1,77 @@
+from django.db.models import Count
+from ..models import Term, TermNgram
+from .normalize import KEY_SEPARATOR
+
+from typing import Iterable, List, Optional, Set
+
+# 転置インデックスに登録するN-gramの文字数
+NGRAM_SIZE = 2
+
+
+def ngrams(text: str, n: int = NGRAM_SIZE) -> Set[str]:
+    """文字列をN-gramに分割する
+
+    Args:
+        text (str): 文字列
+        n (int): N-gramの文字数
+
+    Returns:
+        Set[str]: N-gramの集合（文字列がn文字未満の場合は空）
+    """
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def key_ngrams(search_key: str, n: int = NGRAM_SIZE) -> Set[str]:
+    """検索キーの原形・読みそれぞれのN-gramを取得する（区切り文字をまたぐN-gramは含めない）
+
+    Args:
+        search_key (str): 検索キー（normalize.build_search_key）
+        n (int): N-gramの文字数
+
+    Returns:
+        Set[str]: N-gramの集合
+    """
+    grams = set()
+    for part in search_key.split(KEY_SEPARATOR):
+        grams |= ngrams(part, n)
+    return grams
+
+
+def index_terms(terms: Iterable[Term], batch_size: Optional[int] = None) -> None:
+    """語彙の検索キー（正規化した原形と読み）のN-gramを転置インデックスに登録する
+
+    登録済みのN-gramは無視するため、同じ語彙を複数回登録してもよい。
+
+    Args:
+        terms (Iterable[Term]): 保存済みのTermモデル
+        batch_size (Optional[int]): 1回のINSERTで登録する件数
+    """
+    term_ngrams = []
+    for term in terms:
+        for gram in key_ngrams(term.search_key):
+            term_ngrams.append(TermNgram(term_id=term, gram=gram))
+    TermNgram.objects.bulk_create(term_ngrams, batch_size=batch_size, ignore_conflicts=True)
+
+
+def search_term_ids(search_word: str) -> List[int]:
+    """キーワードに部分一致する語彙IDを転置インデックスから取得する
+
+    キーワードの全N-gramを含む語彙を候補とし、検索キーへの部分一致で絞り込む。
+    キーワードがN-gramより短い場合は語彙テーブルを直接検索する。
+    語彙は単語より桁違いに少ないため、IDを一度だけ取得して単語の絞り込みに使う。
+
+    Args:
+        search_word (str): 正規化済みの検索キーワード（normalize.normalize）
+
+    Returns:
+        List[int]: 語彙IDのリスト
+    """
+    terms = Term.objects.filter(search_key__contains=search_word)
+
+    grams = ngrams(search_word)
+    if grams:
+        candidate_ids = TermNgram.objects.filter(gram__in=grams).values(
+            'term_id').annotate(gram_count=Count('gram')).filter(
+                gram_count=len(grams)).values('term_id')
+        terms = terms.filter(id__in=candidate_ids)
+    return list(terms.values_list('id', flat=True))
@@ -0,0 +1,295 @@
+import datetime
+import hashlib
+from bisect import bisect_left
+from itertools import chain, groupby
+from operator import attrgetter
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from ..models import Episode, Term, Word
+from .util import get_tagger, now_datetime, parse_tokens, parser_version
+from .backends import get_recognizer, get_storage
+from .transcript import TranscriptRecord, iter_records
+from .vocabulary import resolve_terms
+from .stats import add_term_stats, reset_first_start
+from .generation import activate_generation, active_words, collect_garbage, next_generation
+from .cache import invalidate_search_cache
+from .alignment import align, alignment_version, get_strategy
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def set_word_stored(episode: Episode, stored: bool) -> None:
+    """エピソードの単語保存ステータスを変更する
+
+    Args:
+        episode (Episode): Episodeモデル
+        stored (bool): 保存済み: True, 未保存: False
+    """
+    episode.word_stored = stored
+    # 単語数など単語保存中に更新される項目を上書きしないよう、ステータスのみ保存する
+    episode.save(update_fields=['word_stored', 'updated_at'])
+
+
+def start_transcript_job(episode: Episode) -> None:
+    """非同期で文字起こし処理を開始する
+
+    Args:
+        episode (Episode): Episodeモデル
+    """
+    audio_uri = get_storage().get_uri(str(episode.audio_file))
+    file_path = get_transcript_file_path(episode)
+    operation_name = get_recognizer().start(audio_uri, file_path)
+    # ジョブ名を保存
+    store_job_name(episode.id, file_path, operation_name)
+
+
+def get_transcript_file_path(episode: Episode) -> str:
+    """GCSバケットルートからの文字起こしファイルパスを取得する
+
+    Args:
+        episode (Episode): Episodeモデル
+
+    Returns:
+        str: 文字起こしファイルパス
+    """
+    file_name = str(episode.number) + '_' + now_datetime() + '.json'
+    sub_folder_name = episode.radio_id.english_title
+    transcript_folder_name = 'transcript_file/' + sub_folder_name
+    file_path = transcript_folder_name + '/' + file_name
+    return file_path
+
+
+def store_job_name(episodeId: int, job_name: str, operation_name: Optional[str] = None) -> None:
+    """対象エピソードに文字起こしジョブ名を保存する
+
+    オペレーション名を保存したエピソードは、文字起こしの完了を自動で確認する。
+
+    Args:
+        episodeId (int): エピソードID
+        job_name (str): transcribeジョブ名
+        operation_name (Optional[str]): 文字起こしのオペレーション名
+    """
+    episode = Episode.objects.get(id=episodeId)
+    episode.job_name = job_name
+    episode.operation_name = operation_name
+    episode.operation_poll_count = 0
+    episode.operation_next_poll_at = None
+    if operation_name:
+        episode.operation_next_poll_at = timezone.now() + datetime.timedelta(
+            seconds=settings.OPERATION_POLL_INTERVAL)
+    episode.save()
+
+
+def transcribe(episode: Episode, reset_words: bool = False,
+               on_progress: Callable[[int], None] = lambda progress: None) -> None:
+    """音声認識で文字起こししたファイルをmecabで解析し単語として保存する
+
+    単語保存済みの回は、文字起こしファイルのハッシュ値と形態素解析・対応付けのバージョンを
+    前回の保存時と比較し、変わった処理のみやり直す（対応付けのみ変わった場合は形態素解析しない）。
+    単語を保存し直す場合は新しい世代に保存して切り替え、
+    単語未保存の回は有効な世代に追加する（保存済みかどうかはDBから取得し直して判定する）。
+
+    Args:
+        episode (Episode): Episodeモデル
+        reset_words (bool): 前回の保存から変更がなくても解析し直し、新しい世代の単語に置き換えるかどうか
+        on_progress (Callable[[int], None]): 進捗率（%）を受け取る関数
+
+    Raises:
+        ObjectNotFoundError: 文字起こしが未完了の場合
+        ValueError: 文字起こし結果が空の場合
+    """
+    episode = Episode.objects.get(id=episode.id)
+    storage = get_storage()
+
+    # 文字起こしファイル・形態素解析・開始時間の対応付けが前回の保存から変わっていなければ何もしない
+    # （文字起こしファイルはダウンロードせずにハッシュ値を比較する）
+    fingerprint = {
+        'transcript_hash': storage.checksum(episode.job_name),
+        'parser_version': parser_version(),
+        'alignment_version': alignment_version(),
+    }
+    same_words = not reset_words and episode.word_stored and all(
+        getattr(episode, field) == fingerprint[field] for field in ('transcript_hash', 'parser_version'))
+    if same_words and episode.alignment_version == fingerprint['alignment_version']:
+        on_progress(100)
+        return
+
+    if same_words and episode.block_offsets:
+        # 対応付けのみ変わった場合は、保存済みの単語を文字起こし結果に対応付け直し、開始時間だけを更新する
+        with storage.open(episode.job_name) as file:
+            on_progress(20)
+            words = store_aligned_times(episode.id, iter_records(file), episode.block_offsets)
+        fingerprint['word_hash'] = hash_words(words)
+        Episode.objects.filter(id=episode.id).update(**fingerprint)
+        on_progress(100)
+        return
+
+    # ストレージの文字起こしファイルを分割ダウンロードしながら読み込む
+    with storage.open(episode.job_name) as file:
+        on_progress(20)
+        # 全resultの文字起こし本文を形態素解析し、開始時間を対応付ける
+        words, block_offsets = parse_records(iter_records(file), episode)
+    if not words:
+        raise ValueError('文字起こし結果がありません')
+    fingerprint['word_hash'] = hash_words(words)
+    fingerprint['block_offsets'] = block_offsets
+    on_progress(70)
+
+    changed = reset_words or not episode.word_stored
+    if not changed and episode.word_hash == fingerprint['word_hash']:
+        # 辞書の更新などで解析し直しても単語と開始時間が変わらない場合は、バージョンの記録のみ行う
+        pass
+    elif episode.word_stored or not append_words(episode.id, words):
+        # 新しい世代に単語を保存してから有効な世代を切り替え、古い世代を削除する
+        # 保存中も検索には古い世代の単語が表示される
+        generation = next_generation(episode.id)
+        activate_generation(episode.id, generation, store_words(words, generation))
+        collect_garbage(episode.id)
+    # 次回の再保存で変更の有無を判定するため、保存した内容のハッシュ値とバージョンを記録する
+    Episode.objects.filter(id=episode.id).update(**fingerprint)
+    on_progress(100)
+
+
+def append_words(episode_id: int, words: List[Word]) -> bool:
+    """単語未保存の回の有効な世代に単語を追加し、「単語保存済み」にする
+
+    回の行をロックして保存済みかどうかを確認し直すため、同じ回を同時に保存しても単語は重複しない。
+
+    Args:
+        episode_id (int): エピソードID
+        words (List[Word]): 未保存のWordモデルのリスト
+
+    Returns:
+        bool: 追加した: True, 他の処理で保存済みになっていたため追加しなかった: False
+    """
+    with transaction.atomic():
+        episode = Episode.objects.select_for_update().get(id=episode_id)
+        if episode.word_stored:
+            return False
+        store_words(words, episode.active_generation)
+        # 検索順位付け用の単語統計を更新
+        add_term_stats(words)
+        transaction.on_commit(invalidate_search_cache)
+
+        # エピソードを「単語保存済み」にする
+        set_word_stored(episode, True)
+    return True
+
+
+def hash_words(words: List[Word]) -> str:
+    """単語の並び（位置・原形・読み・開始時間・終了時間）のハッシュ値を求める
+
+    Args:
+        words (List[Word]): 発話順のWordモデルのリスト
+
+    Returns:
+        str: ハッシュ値
+    """
+    digest = hashlib.md5()
+    for word in words:
+        digest.update(
+            f'{word.position}\t{word.original_form}\t{word.pronunciation}\t'
+            f'{word.start_ms}\t{word.end_ms}\n'.encode())
+    return digest.hexdigest()
+
+
+def parse_records(records: Iterable[TranscriptRecord], episode: Episode) -> Tuple[List[Word], List[int]]:
+    """文字起こし結果をresultごとに形態素解析し、開始時間を対応付けた単語を作る
+
+    文字起こし結果は1回だけ先頭から読み、resultごとに解析と対応付けを行う。
+    単語には回の中での位置（保存しない助詞・動詞なども数えた、全形態素での発話順の番号）を設定するため、
+    フレーズ検索では間に他の語を挟む単語は連続しない。
+    同じ原形・読みの単語は同じ未保存の語彙（Term）を共有する。
+
+    Args:
+        records (Iterable[TranscriptRecord]): 文字起こし結果の単語（発話順）
+        episode (Episode): Episodeモデル
+
+    Returns:
+        Tuple[List[Word], List[int]]: 未保存のWordモデルのリスト（発話順）と、resultごとの最初の位置
+    """
+    strategy = get_strategy()
+    tagger = get_tagger()
+    words = []
+    block_offsets = []
+    terms: Dict[Tuple[str, str], Term] = {}
+    # 前のresultまでの形態素の数
+    offset = 0
+    for _, block_records in groupby(records, key=attrgetter('block')):
+        first = next(block_records)
+        block_offsets.append(offset)
+        block_words = []
+        tokens, token_count = parse_tokens(tagger, first.text)
+        for position, word in tokens:
+            key = (word['original_form'], word['pronunciation'])
+            term = terms.get(key)
+            if term is None:
+                term = terms[key] = Term(original_form=key[0], pronunciation=key[1])
+            block_words.append(Word(episode_id=episode, term_id=term, position=offset + position))
+        align(block_words, chain([first], block_records), strategy)
+        words.extend(block_words)
+        offset += token_count
+    return words, block_offsets
+
+
+def store_words(words: List[Word], generation: int) -> List[Word]:
+    """エピソードの単語を指定した世代に保存する
+
+    単語の語彙を解決し（新しい語彙と転置インデックスは一括登録）、単語を一括登録する。
+    途中で失敗した場合は何も保存されない。単語統計は更新しない。
+
+    Args:
+        words (List[Word]): 未保存の語彙（Term）を持つ未保存のWordモデルのリスト
+        generation (int): 単語の世代（有効な世代以外の単語は検索に表示されない）
+
+    Returns:
+        List[Word]: 保存したWordモデルのリスト
+    """
+    batch_size = settings.WORD_BULK_BATCH_SIZE
+    for word in words:
+        word.generation = generation
+    with transaction.atomic():
+        # 語彙をIDに置き換える（検索用の転置インデックスは語彙に登録する）
+        resolve_terms(words, batch_size=batch_size)
+        return Word.objects.bulk_create(words, batch_size=batch_size)
+
+
+def store_aligned_times(episode_id: int, records: Iterable[TranscriptRecord],
+                        block_offsets: List[int]) -> List[Word]:
+    """保存済みの単語を文字起こし結果に対応付け直し、開始・終了時間を保存する
+
+    形態素解析はせず、保存済みの単語と語彙を保存時のresultの区切り（最初の位置）で分けて対応付ける。
+    単語・語彙は作り直さず、開始時間が変わった単語と単語統計の最初の開始時間のみ更新する。
+
+    Args:
+        episode_id (int): エピソードID
+        records (Iterable[TranscriptRecord]): 保存時と同じ文字起こし結果の単語（発話順）
+        block_offsets (List[int]): 保存時のresultごとの最初の位置（parse_records）
+
+    Returns:
+        List[Word]: 開始・終了時間を対応付け直した、回の全ての単語（発話順）
+    """
+    stored_words = list(active_words().filter(episode_id=episode_id).select_related(
+        'term_id').only('id', 'episode_id', 'position', 'term_id__original_form',
+                        'term_id__pronunciation', 'start_ms', 'end_ms').order_by('position'))
+    previous = {word.id: (word.start_ms, word.end_ms) for word in stored_words}
+    for word in stored_words:
+        word.start_ms = word.end_ms = None
+
+    # resultごとに、そのresultの位置の範囲にある単語だけを対応付ける（parse_recordsと同じ区切り）
+    positions = [word.position for word in stored_words]
+    bounds = [bisect_left(positions, offset) for offset in block_offsets] + [len(stored_words)]
+    strategy = get_strategy()
+    blocks = groupby(records, key=attrgetter('block'))
+    for i, (_, block_records) in zip(range(len(block_offsets)), blocks):
+        align(stored_words[bounds[i]:bounds[i + 1]], block_records, strategy)
+
+    changed = [word for word in stored_words if (word.start_ms, word.end_ms) != previous[word.id]]
+    with transaction.atomic():
+        Word.objects.bulk_update(changed, ['start_ms', 'end_ms'],
+                                 batch_size=settings.WORD_BULK_BATCH_SIZE)
+        reset_first_start(episode_id, stored_words)
+        Episode.objects.filter(id=episode_id).update(updated_at=timezone.now())
+        transaction.on_commit(invalidate_search_cache)
+    return stored_words
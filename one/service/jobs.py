@@ -0,0 +1,164 @@
+import datetime
+import threading
+import traceback
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F, Q
+from django.utils import timezone
+from ..models import Episode, IngestionJob
+from .ingestion import (transcribe, start_transcript_job, store_job_name,
+                        get_transcript_file_path)
+from .chunking import transcribe_chunked
+from .backends import ObjectNotFoundError
+
+from typing import Optional
+
+# 未完了のジョブのステータス
+ACTIVE_STATUSES = [IngestionJob.Status.PENDING, IngestionJob.Status.RUNNING]
+
+
+def enqueue_ingestion(episode: Episode, reset_words: bool = False,
+                      transcribe_audio: bool = False) -> IngestionJob:
+    """エピソードの単語保存ジョブを登録する
+
+    同じエピソードの待機中・実行中のジョブがあれば新たに登録しない。
+    待機中のジョブには、指定された再保存・文字起こしの指定を追加する。
+
+    Args:
+        episode (Episode): Episodeモデル
+        reset_words (bool): 変更がなくても単語を解析し直して置き換えるかどうか
+        transcribe_audio (bool): 単語保存の前に音声ファイルを分割して文字起こしするかどうか
+
+    Returns:
+        IngestionJob: 登録済みのジョブ
+    """
+    job = IngestionJob.objects.filter(
+        episode_id=episode, status__in=ACTIVE_STATUSES).first()
+    if job is None:
+        return IngestionJob.objects.create(
+            episode_id=episode, reset_words=reset_words, transcribe_audio=transcribe_audio)
+
+    flags = {}
+    if reset_words and not job.reset_words:
+        flags['reset_words'] = True
+    if transcribe_audio and not job.transcribe_audio:
+        flags['transcribe_audio'] = True
+    # 取得済み（実行中）のジョブは変更しない
+    if flags and IngestionJob.objects.filter(
+            id=job.id, status=IngestionJob.Status.PENDING).update(**flags):
+        for name, value in flags.items():
+            setattr(job, name, value)
+    return job
+
+
+def start_transcription(episode: Episode) -> None:
+    """エピソードの文字起こしを開始する
+
+    TRANSCRIBE_CHUNK_SECONDSが設定されている場合は、分割して文字起こしするジョブを登録する。
+    それ以外は音声ファイル全体の文字起こしを開始し、完了はpoll_transcriptsで確認する。
+
+    Args:
+        episode (Episode): Episodeモデル
+    """
+    if not settings.TRANSCRIBE_CHUNK_SECONDS:
+        start_transcript_job(episode)
+        return
+    store_job_name(episode.id, get_transcript_file_path(episode))
+    enqueue_ingestion(episode, transcribe_audio=True)
+
+
+def claim_job() -> Optional[IngestionJob]:
+    """待機中のジョブ（または停止したジョブ）を1件取得し、実行中にする
+
+    ステータスと更新日時を条件に更新することで、複数のワーカーが同じジョブを取得しないようにする。
+    実行中のままINGESTION_JOB_TIMEOUT秒以上進捗が更新されないジョブは、ワーカーが停止したとみなして
+    再実行する。実行回数がINGESTION_JOB_MAX_ATTEMPTSに達したジョブは失敗にする。
+
+    Returns:
+        Optional[IngestionJob]: 取得したジョブ（待機中のジョブがない場合はNone）
+    """
+    now = timezone.now()
+    stale = Q(status=IngestionJob.Status.RUNNING,
+              updated_at__lt=now - datetime.timedelta(seconds=settings.INGESTION_JOB_TIMEOUT))
+    IngestionJob.objects.filter(
+        stale, attempts__gte=settings.INGESTION_JOB_MAX_ATTEMPTS
+    ).update(status=IngestionJob.Status.FAILED, finished_at=now, updated_at=now,
+             error='ワーカーが停止したため、実行回数の上限で失敗にしました')
+
+    while True:
+        job = IngestionJob.objects.filter(
+            Q(status=IngestionJob.Status.PENDING) | stale).order_by('id').first()
+        if job is None:
+            return None
+        claimed = IngestionJob.objects.filter(
+            id=job.id, status=job.status, updated_at=job.updated_at
+        ).update(status=IngestionJob.Status.RUNNING, progress=0, error='',
+                 attempts=F('attempts') + 1, started_at=now, finished_at=None, updated_at=now)
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def run_job(job: IngestionJob) -> None:
+    """ジョブを実行し、結果をジョブに記録する
+
+    Args:
+        job (IngestionJob): 実行中のジョブ
+    """
+    def on_progress(progress: int) -> None:
+        # 更新日時は停止したジョブの判定に使う
+        IngestionJob.objects.filter(id=job.id).update(progress=progress, updated_at=timezone.now())
+
+    try:
+        if job.transcribe_audio:
+            transcribe_chunked(job.episode_id, on_progress=on_progress)
+        transcribe(job.episode_id, reset_words=job.reset_words, on_progress=on_progress)
+    except ObjectNotFoundError:
+        finish_job(job, IngestionJob.Status.FAILED,
+                   '文字起こしが未完了です。時間を置いてから再度実行してください')
+    except Exception:
+        finish_job(job, IngestionJob.Status.FAILED, traceback.format_exc())
+    else:
+        finish_job(job, IngestionJob.Status.SUCCEEDED)
+
+
+def finish_job(job: IngestionJob, status: str, error: str = '') -> None:
+    """ジョブを終了する
+
+    Args:
+        job (IngestionJob): 実行中のジョブ
+        status (str): 終了ステータス
+        error (str): エラー内容
+    """
+    job.status = status
+    job.error = error
+    job.finished_at = timezone.now()
+    if status == IngestionJob.Status.SUCCEEDED:
+        job.progress = 100
+    job.save(update_fields=['status', 'error', 'finished_at', 'progress', 'updated_at'])
+
+
+def work(once: bool = False, poll_interval: float = 5.0,
+         stop: Optional[threading.Event] = None) -> None:
+    """ジョブを取得して実行し続ける（ワーカースレッドの処理）
+
+    Args:
+        once (bool): 待機中のジョブがなくなったら終了するかどうか
+        poll_interval (float): 待機中のジョブがないときに待つ秒数
+        stop (Optional[threading.Event]): 終了を指示するイベント
+    """
+    if stop is None:
+        stop = threading.Event()
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            job = claim_job()
+            if job is None:
+                if once:
+                    return
+                stop.wait(poll_interval)
+                continue
+            run_job(job)
+    finally:
+        # スレッドごとのDB接続を閉じる
+        connection.close()
@@ -0,0 +1,67 @@
+import hashlib
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from django.conf import settings
+from .backends import (ObjectNotFoundError, ObjectStorage, OperationState,
+                       SpeechRecognizer, get_storage)
+
+from typing import BinaryIO, Dict, Iterator, List
+
+# 文字起こしのオペレーション名の接頭辞
+FAKE_OPERATION_PREFIX = 'fake/'
+
+
+class LocalObjectStorage(ObjectStorage):
+    """ローカルのディレクトリ（LOCAL_STORAGE_ROOT）をオブジェクトストレージとして使う"""
+
+    def __init__(self):
+        self.root = Path(settings.LOCAL_STORAGE_ROOT)
+
+    def get_uri(self, file_path: str) -> str:
+        return (self.root / file_path).resolve().as_uri()
+
+    @contextmanager
+    def open(self, file_path: str) -> Iterator[BinaryIO]:
+        try:
+            file = open(self.root / file_path, 'rb')
+        except FileNotFoundError as e:
+            raise ObjectNotFoundError(file_path) from e
+        with file:
+            yield file
+
+    def checksum(self, file_path: str) -> str:
+        digest = hashlib.md5()
+        with self.open(file_path) as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def upload(self, file_path: str, file: BinaryIO) -> None:
+        path = self.root / file_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(file, f)
+
+
+class FakeSpeechRecognizer(SpeechRecognizer):
+    """文字起こしファイルのフィクスチャを再生する音声認識（GCPなしでの負荷試験用）
+
+    音声ファイル名と同名のフィクスチャ（例: one-10s.flac -> one-10s.json）、
+    なければdefault.jsonを文字起こし結果としてストレージに保存する。
+    """
+
+    def __init__(self):
+        self.fixtures = Path(settings.LOCAL_TRANSCRIPT_FIXTURES)
+
+    def start(self, audio_uri: str, output_file_path: str) -> str:
+        fixture = self.fixtures / f'{Path(audio_uri).stem}.json'
+        if not fixture.exists():
+            fixture = self.fixtures / 'default.json'
+        with open(fixture, 'rb') as f:
+            get_storage().upload(output_file_path, f)
+        return f'{FAKE_OPERATION_PREFIX}{output_file_path}'
+
+    def get_operations(self, operation_names: List[str]) -> Dict[str, OperationState]:
+        # 文字起こし結果は開始時に保存済み
+        return {name: OperationState(done=True) for name in operation_names}
@@ -0,0 +1,92 @@
+import re
+import unicodedata
+
+# ひらがな（ぁ〜ゖ、ゝゞ）をカタカナに変換する表
+HIRAGANA_TO_KATAKANA = str.maketrans(
+    {chr(code): chr(code + 0x60) for code in [*range(0x3041, 0x3097), 0x309D, 0x309E]})
+# 全てひらがなの文字列
+HIRAGANA_PATTERN = re.compile('[ぁ-ゟ]+')
+# カナの後ろの長音の表記ゆれ（ハイフン・ダッシュ・波ダッシュなど）
+LONG_VOWEL_PATTERN = re.compile('(?<=[ァ-ヺー])[‐-―−〜～~-]')
+# 連続する長音
+LONG_VOWEL_REPEAT_PATTERN = re.compile('ー{2,}')
+# 連続する空白
+SPACE_PATTERN = re.compile(r'\s+')
+# 検索キーで原形と読みを区切る文字（正規化した文字列には含まれない）
+KEY_SEPARATOR = '\t'
+
+
+def normalize(text: str) -> str:
+    """検索用に文字列を正規化する
+
+    単語の登録時と検索時に同じ正規化を行い、表記ゆれを吸収する。
+    1. NFKC（半角カナ→全角、全角英数→半角など）
+    2. 英字を小文字にする
+    3. ひらがなをカタカナにする
+    4. カナの後ろの長音の表記ゆれを「ー」にし、連続する長音を1つにする
+    5. 空白を除去する
+
+    Args:
+        text (str): 文字列
+
+    Returns:
+        str: 正規化した文字列
+    """
+    text = unicodedata.normalize('NFKC', text).lower().translate(HIRAGANA_TO_KATAKANA)
+    text = LONG_VOWEL_PATTERN.sub('ー', text)
+    text = LONG_VOWEL_REPEAT_PATTERN.sub('ー', text)
+    return SPACE_PATTERN.sub('', text)
+
+
+def normalize_query(query: str) -> str:
+    """検索式を正規化する（NFKCと空白の整理のみ）
+
+    検索式の演算子（OR・NEARなど）を残すため、キーワードごとの正規化はquery.make_termで行う。
+
+    Args:
+        query (str): 検索式
+
+    Returns:
+        str: 正規化した検索式
+    """
+    return SPACE_PATTERN.sub(' ', unicodedata.normalize('NFKC', query)).strip()
+
+
+def build_search_key(original_form: str, pronunciation: str) -> str:
+    """単語の原形と読みから検索キーを作る
+
+    正規化した原形と読みを区切り文字でつなげた1つの文字列にし、
+    キーワードとの部分一致はこの1列だけで判定する。
+
+    Args:
+        original_form (str): 原形
+        pronunciation (str): 読み
+
+    Returns:
+        str: 検索キー（例: '内山\\tウチヤマ'）
+    """
+    return f'{normalize(original_form)}{KEY_SEPARATOR}{normalize(pronunciation)}'
+
+
+def is_hiragana(text: str) -> bool:
+    """対象の文字列が全て「ひらがな」か判定する
+
+    Args:
+        text (str): 文字列
+
+    Returns:
+        bool: ひらがな: True, ひらがな以外: False
+    """
+    return HIRAGANA_PATTERN.fullmatch(text) is not None
+
+
+def hira_to_kata(text: str) -> str:
+    """ひらがなをカタカナに変換する（ひらがな以外はそのまま）
+
+    Args:
+        text (str): 文字列
+
+    Returns:
+        str: カタカナに変換した文字列
+    """
+    return text.translate(HIRAGANA_TO_KATAKANA)
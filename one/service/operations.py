@@ -0,0 +1,109 @@
+import datetime
+import logging
+from django.conf import settings
+from django.utils import timezone
+from ..models import Episode, IngestionJob
+from .backends import get_recognizer
+from .jobs import enqueue_ingestion
+
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def next_poll_at(poll_count: int, now: Optional[datetime.datetime] = None) -> datetime.datetime:
+    """次にオペレーションを確認する日時を計算する（指数バックオフ）
+
+    Args:
+        poll_count (int): これまでの確認回数
+        now (Optional[datetime.datetime]): 現在日時
+
+    Returns:
+        datetime.datetime: 次回確認日時
+    """
+    if now is None:
+        now = timezone.now()
+    interval = min(settings.OPERATION_POLL_INTERVAL * 2 ** poll_count,
+                   settings.OPERATION_POLL_MAX_INTERVAL)
+    return now + datetime.timedelta(seconds=interval)
+
+
+def poll_operations(limit: int = 100) -> Dict[str, int]:
+    """確認日時を過ぎた文字起こしのオペレーションをまとめて確認する
+
+    完了したエピソードは単語保存ジョブを登録し、未完了のエピソードは次回確認日時を延ばす。
+    確認中にエラーが発生したエピソードも次回確認日時を延ばし、
+    確認回数がOPERATION_POLL_MAX_COUNTに達したら失敗として確認をやめる。
+
+    Args:
+        limit (int): 一度に確認するエピソードの最大数
+
+    Returns:
+        Dict[str, int]: 完了（done）、失敗（failed）、未完了（pending）の件数
+    """
+    now = timezone.now()
+    episodes = list(Episode.objects.filter(
+        operation_name__isnull=False,
+        operation_next_poll_at__lte=now,
+    ).order_by('operation_next_poll_at')[:limit])
+    summary = {'done': 0, 'failed': 0, 'pending': 0}
+    if not episodes:
+        return summary
+
+    recognizer = get_recognizer()
+    try:
+        operations = recognizer.get_operations(
+            [episode.operation_name for episode in episodes])
+    except Exception:
+        # まとめて取得できない場合はエピソードごとに取得し、エラーのエピソードだけ延期する
+        logger.exception('オペレーションをまとめて取得できませんでした')
+        operations = {}
+
+    for episode in episodes:
+        try:
+            operation = operations.get(episode.operation_name)
+            if operation is None:
+                operation = recognizer.get_operations(
+                    [episode.operation_name])[episode.operation_name]
+            if operation.done:
+                finish_operation(episode, operation.error, now)
+                summary['failed' if operation.error else 'done'] += 1
+                continue
+            error = None
+        except Exception as e:
+            logger.exception('オペレーション %s を確認できませんでした', episode.operation_name)
+            error = str(e) or e.__class__.__name__
+
+        episode.operation_poll_count += 1
+        if error is not None and episode.operation_poll_count >= settings.OPERATION_POLL_MAX_COUNT:
+            finish_operation(episode, f'オペレーションを確認できません: {error}', now)
+            summary['failed'] += 1
+            continue
+        episode.operation_next_poll_at = next_poll_at(episode.operation_poll_count, now)
+        summary['pending'] += 1
+
+    Episode.objects.bulk_update(
+        episodes, ['operation_name', 'operation_poll_count', 'operation_next_poll_at'])
+    return summary
+
+
+def finish_operation(episode: Episode, error: Optional[str], now: datetime.datetime) -> None:
+    """完了したオペレーションの単語保存ジョブを登録し、確認対象から外す
+
+    変更したエピソードは呼び出し元でまとめて保存する。
+
+    Args:
+        episode (Episode): Episodeモデル
+        error (Optional[str]): 失敗した場合のエラー内容
+        now (datetime.datetime): 現在日時
+    """
+    if error:
+        # 失敗内容はジョブ一覧で確認できるようにする
+        IngestionJob.objects.create(
+            episode_id=episode, status=IngestionJob.Status.FAILED,
+            error=f'文字起こしに失敗しました: {error}',
+            finished_at=now)
+    else:
+        enqueue_ingestion(episode)
+    episode.operation_name = None
+    episode.operation_next_poll_at = None
@@ -0,0 +1,102 @@
+import multiprocessing
+import signal
+import threading
+from django import db
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ..models import IngestionJob
+
+
+def init_worker() -> None:
+    """ワーカープロセスを初期化する
+
+    spawnで起動したプロセスではDjangoの設定を読み込み、mecabの辞書を事前に読み込む。
+    """
+    import django
+    django.setup()
+    from .util import warm_up
+    warm_up()
+
+
+def work_in_process(concurrency: int, once: bool, poll_interval: float) -> None:
+    """ワーカープロセスで単語保存ジョブを取得して実行し続ける
+
+    形態素解析はCPUを使うため、プロセスごとにジョブを実行する。
+    SIGINT・SIGTERMを受け取ったら、実行中のジョブを終えてから終了する。
+
+    Args:
+        concurrency (int): プロセス内で同時に実行するジョブの数（スレッド数）
+        once (bool): 待機中のジョブがなくなったら終了するかどうか
+        poll_interval (float): 待機中のジョブがないときに待つ秒数
+    """
+    init_worker()
+    from .jobs import work
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: stop.set())
+    threads = [
+        threading.Thread(target=work, kwargs={
+            'once': once, 'poll_interval': poll_interval, 'stop': stop,
+        }, name=f'ingestion-worker-{i}')
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_worker_processes(processes: int, concurrency: int = 1, once: bool = False,
+                         poll_interval: float = 5.0) -> None:
+    """単語保存ジョブのワーカープロセスを起動し、全て終了するまで待つ
+
+    ジョブはclaim_jobで1件ずつ取得するため、複数のプロセスやホストで起動しても同じ回を重複して保存しない。
+
+    Args:
+        processes (int): プロセス数
+        concurrency (int): プロセスごとに同時に実行するジョブの数
+        once (bool): 待機中のジョブがなくなったら終了するかどうか
+        poll_interval (float): 待機中のジョブがないときに待つ秒数
+    """
+    # 子プロセスに親プロセスのDB接続を持ち込まない
+    db.connections.close_all()
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=work_in_process, args=(concurrency, once, poll_interval),
+                               name=f'ingestion-worker-process-{i}')
+               for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # 子プロセスにもSIGINTが届くため、実行中のジョブの終了を待つ
+        for worker in workers:
+            worker.join()
+        raise
+
+
+def format_result(job: 'IngestionJob') -> str:
+    """エピソードごとの結果を表示用の文字列にする
+
+    Args:
+        job (IngestionJob): 単語保存ジョブ
+
+    Returns:
+        str: 表示用の文字列
+    """
+    if job.status == job.Status.SUCCEEDED:
+        status = 'OK'
+    elif job.status == job.Status.FAILED:
+        status = 'NG'
+    else:
+        # 他のワーカーが実行中のジョブなど
+        status = job.get_status_display()
+    if job.started_at and job.finished_at:
+        total = f'total={(job.finished_at - job.started_at).total_seconds():.2f}s'
+    else:
+        total = 'total=-'
+    return f'episode={job.episode_id_id} {status} {total}'
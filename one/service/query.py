@@ -0,0 +1,408 @@
+import heapq
+import operator
+import re
+from functools import reduce
+from itertools import groupby
+from operator import attrgetter
+from django.db.models import Exists, OuterRef, Q
+from ..models import TermStat
+from .index import search_term_ids
+from .generation import active_words
+from .normalize import normalize
+
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+
+# 検索式の字句（"フレーズ"、括弧、それ以外の空白区切りの語）
+TOKEN_PATTERN = re.compile(r'"[^"]*"|[()]|[^\s()"]+')
+# 近接検索の演算子（例: NEAR/10 は10秒以内）
+NEAR_PATTERN = re.compile(r'NEAR/(\d+)')
+
+
+class QuerySyntaxError(ValueError):
+    """検索式の構文が正しくない"""
+
+
+class Posting(NamedTuple):
+    """転置リストの要素（回・位置の順に並べて扱う）"""
+    episode_id: int
+    position: int
+    start_ms: Optional[int]
+    word_id: int
+
+
+class Term:
+    """キーワードに部分一致する単語"""
+
+    # 単語統計の候補の回がそのまま一致する回になる
+    exact = True
+
+    def __init__(self, text: str):
+        self.text = text
+        self._term_ids: Optional[List[int]] = None
+
+    def term_ids(self) -> List[int]:
+        """キーワードに部分一致する語彙IDを取得する（転置インデックスは1度だけ検索する）
+
+        Returns:
+            List[int]: 語彙IDのリスト
+        """
+        if self._term_ids is None:
+            self._term_ids = search_term_ids(self.text)
+        return self._term_ids
+
+    def candidates(self) -> Q:
+        """キーワードに一致する単語を含む回の条件を単語統計から作る
+
+        Returns:
+            Q: Episodeの絞り込み条件
+        """
+        return Q(Exists(TermStat.objects.filter(
+            episode_id=OuterRef('pk'), term_id__in=self.term_ids())))
+
+    def evaluate(self, episodes: Optional[Iterable[int]] = None) -> List[Posting]:
+        """キーワードに一致する単語の転置リストを取得する
+
+        Args:
+            episodes (Optional[Iterable[int]]): 対象の回のIDまたはIDのクエリセット（Noneの場合は全ての回）
+
+        Returns:
+            List[Posting]: 回・位置の順の転置リスト
+        """
+        words = active_words().filter(term_id__in=self.term_ids())
+        if episodes is not None:
+            words = words.filter(episode_id__in=episodes)
+        return [Posting(*row) for row in words.order_by('episode_id', 'position').values_list(
+            'episode_id', 'position', 'start_ms', 'id').iterator()]
+
+
+class Phrase:
+    """連続して話された単語の並び"""
+
+    # 位置を比べるまで一致する回は決まらない
+    exact = False
+
+    def __init__(self, terms: List[Term]):
+        self.terms = terms
+
+    def term_ids(self) -> Set[int]:
+        """条件に含まれるキーワードの語彙IDを取得する"""
+        return {term_id for term in self.terms for term_id in term.term_ids()}
+
+    def candidates(self) -> Q:
+        """全てのキーワードを含む回の条件を作る"""
+        return combine_and(term.candidates() for term in self.terms)
+
+    def evaluate(self, episodes: Optional[Iterable[int]] = None) -> List[Posting]:
+        """各キーワードの転置リストを位置をずらしてマージし、連続する箇所を取得する
+
+        Args:
+            episodes (Optional[Iterable[int]]): 対象の回のIDまたはIDのクエリセット（Noneの場合は全ての回）
+
+        Returns:
+            List[Posting]: フレーズを構成する単語の転置リスト
+        """
+        # i番目の語の位置をi個前にずらすと、フレーズの先頭位置で揃う
+        lists = [[((p.episode_id, p.position - i), p) for p in term.evaluate(episodes)]
+                 for i, term in enumerate(self.terms)]
+        # 同じ語が続くフレーズでは一致箇所が重なるため、重複を除いて並べ直す
+        return sorted({p for matched in intersect(lists) for p in matched})
+
+
+class And:
+    """全ての条件に一致する単語を含む回"""
+
+    def __init__(self, children: List['Node']):
+        self.children = children
+
+    @property
+    def exact(self) -> bool:
+        """単語統計の候補の回がそのまま一致する回になるか"""
+        return all(child.exact for child in self.children)
+
+    def term_ids(self) -> Set[int]:
+        """条件に含まれるキーワードの語彙IDを取得する"""
+        return {term_id for child in self.children for term_id in child.term_ids()}
+
+    def candidates(self) -> Q:
+        """全ての条件に一致する回の条件を作る"""
+        return combine_and(child.candidates() for child in self.children)
+
+    def evaluate(self, episodes: Optional[Iterable[int]] = None) -> List[Posting]:
+        """各条件の転置リストを回でマージし、全条件に一致した回の単語を取得する
+
+        Args:
+            episodes (Optional[Iterable[int]]): 対象の回のIDまたはIDのクエリセット（Noneの場合は全ての回）
+
+        Returns:
+            List[Posting]: 回・位置の順の転置リスト
+        """
+        lists = [[(episode_id, postings) for episode_id, postings in by_episode(child.evaluate(episodes))]
+                 for child in self.children]
+        return merge(postings for matched in intersect(lists) for postings in matched)
+
+
+class Or:
+    """いずれかの条件に一致する単語を含む回"""
+
+    def __init__(self, children: List['Node']):
+        self.children = children
+
+    @property
+    def exact(self) -> bool:
+        """単語統計の候補の回がそのまま一致する回になるか"""
+        return all(child.exact for child in self.children)
+
+    def term_ids(self) -> Set[int]:
+        """条件に含まれるキーワードの語彙IDを取得する"""
+        return {term_id for child in self.children for term_id in child.term_ids()}
+
+    def candidates(self) -> Q:
+        """いずれかの条件に一致する回の条件を作る"""
+        return combine_or(child.candidates() for child in self.children)
+
+    def evaluate(self, episodes: Optional[Iterable[int]] = None) -> List[Posting]:
+        """各条件の転置リストをマージする
+
+        Args:
+            episodes (Optional[Iterable[int]]): 対象の回のIDまたはIDのクエリセット（Noneの場合は全ての回）
+
+        Returns:
+            List[Posting]: 回・位置の順の転置リスト
+        """
+        return merge(child.evaluate(episodes) for child in self.children)
+
+
+class Near:
+    """指定した秒数以内に話された2つの条件"""
+
+    # 開始時間を比べるまで一致する回は決まらない
+    exact = False
+
+    def __init__(self, left: 'Node', right: 'Node', seconds: int):
+        self.left = left
+        self.right = right
+        self.seconds = seconds
+
+    def term_ids(self) -> Set[int]:
+        """条件に含まれるキーワードの語彙IDを取得する"""
+        return {term_id for child in (self.left, self.right) for term_id in child.term_ids()}
+
+    def candidates(self) -> Q:
+        """両方の条件に一致する回の条件を作る"""
+        return self.left.candidates() & self.right.candidates()
+
+    def evaluate(self, episodes: Optional[Iterable[int]] = None) -> List[Posting]:
+        """両方の条件に一致する回で、開始時間が指定した秒数以内の単語を取得する
+
+        開始時間が未設定の単語は一致しない。
+
+        Args:
+            episodes (Optional[Iterable[int]]): 対象の回のIDまたはIDのクエリセット（Noneの場合は全ての回）
+
+        Returns:
+            List[Posting]: 回・位置の順の転置リスト
+        """
+        window = self.seconds * 1000
+        lists = [list(by_episode(self.left.evaluate(episodes))),
+                 list(by_episode(self.right.evaluate(episodes)))]
+        postings = []
+        for left, right in intersect(lists):
+            left = sorted((p for p in left if p.start_ms is not None), key=attrgetter('start_ms'))
+            right = sorted((p for p in right if p.start_ms is not None), key=attrgetter('start_ms'))
+            postings.append(sorted(set(within(left, right, window) + within(right, left, window))))
+        return merge(postings)
+
+
+# 検索条件
+Node = Union[Term, Phrase, And, Or, Near]
+
+
+def combine_and(conditions: Iterable[Q]) -> Q:
+    """回の条件を全て満たす条件にまとめる
+
+    Args:
+        conditions (Iterable[Q]): 回の条件
+
+    Returns:
+        Q: まとめた条件
+    """
+    return reduce(operator.and_, conditions)
+
+
+def combine_or(conditions: Iterable[Q]) -> Q:
+    """回の条件をいずれかを満たす条件にまとめる
+
+    Args:
+        conditions (Iterable[Q]): 回の条件
+
+    Returns:
+        Q: まとめた条件
+    """
+    return reduce(operator.or_, conditions)
+
+
+def by_episode(postings: List[Posting]) -> Iterator[Tuple[int, List[Posting]]]:
+    """転置リストを回ごとにまとめる
+
+    Args:
+        postings (List[Posting]): 回・位置の順の転置リスト
+
+    Yields:
+        Tuple[int, List[Posting]]: 回IDと回の転置リスト
+    """
+    for episode_id, episode_postings in groupby(postings, key=attrgetter('episode_id')):
+        yield episode_id, list(episode_postings)
+
+
+def intersect(lists: List[list]) -> Iterator[tuple]:
+    """キーの順に並んだ複数のリストから、全てのリストにあるキーの値を取得する
+
+    各リストの先頭を比較し、最小のキーのリストを進める（マージ）。
+
+    Args:
+        lists (List[list]): (キー, 値)のリスト（キーの昇順、キーの重複なし）
+
+    Yields:
+        tuple: キーが一致した各リストの値
+    """
+    if not lists:
+        return
+    cursors = [0] * len(lists)
+    while all(cursor < len(items) for cursor, items in zip(cursors, lists)):
+        keys = [items[cursor][0] for cursor, items in zip(cursors, lists)]
+        largest = max(keys)
+        if all(key == largest for key in keys):
+            yield tuple(items[cursor][1] for cursor, items in zip(cursors, lists))
+            cursors = [cursor + 1 for cursor in cursors]
+            continue
+        for i, key in enumerate(keys):
+            if key < largest:
+                cursors[i] += 1
+
+
+def merge(lists: Iterable[List[Posting]]) -> List[Posting]:
+    """回・位置の順の転置リストを重複なくマージする
+
+    Args:
+        lists (Iterable[List[Posting]]): 回・位置の順の転置リスト
+
+    Returns:
+        List[Posting]: 回・位置の順の転置リスト
+    """
+    postings = []
+    for posting in heapq.merge(*lists):
+        if not postings or postings[-1] != posting:
+            postings.append(posting)
+    return postings
+
+
+def within(postings: List[Posting], others: List[Posting], window: int) -> List[Posting]:
+    """もう一方の単語とwindowミリ秒以内に話された単語を取得する
+
+    Args:
+        postings (List[Posting]): 開始時間の順の転置リスト
+        others (List[Posting]): 開始時間の順の転置リスト
+        window (int): 開始時間の差の上限（ミリ秒）
+
+    Returns:
+        List[Posting]: postingsのうち条件を満たす単語
+    """
+    matched = []
+    lower = 0
+    for posting in postings:
+        while lower < len(others) and others[lower].start_ms < posting.start_ms - window:
+            lower += 1
+        if lower < len(others) and others[lower].start_ms <= posting.start_ms + window:
+            matched.append(posting)
+    return matched
+
+
+def parse_query(query: str) -> Node:
+    """検索式を解析する
+
+    空白区切りの語はAND、ORはOR、"..."はフレーズ、A NEAR/N BはN秒以内の近接検索。
+    括弧でまとめられる。結合の強さは NEAR > AND > OR の順。
+
+    Args:
+        query (str): 検索式（例: '"文化放送 ラジオ" OR 内山 NEAR/30 メール'）
+
+    Returns:
+        Node: 検索条件
+
+    Raises:
+        QuerySyntaxError: 検索式の構文が正しくない場合
+    """
+    tokens = TOKEN_PATTERN.findall(query)
+    if not tokens:
+        return make_term(query)
+    node, rest = parse_or(tokens)
+    if rest:
+        raise QuerySyntaxError(f'検索式を解析できません: {" ".join(rest)}')
+    return node
+
+
+def parse_or(tokens: List[str]) -> Tuple[Node, List[str]]:
+    """ORで区切られた条件を解析する（以降の関数は解析した条件と残りの字句を返す）"""
+    children = []
+    node, tokens = parse_and(tokens)
+    children.append(node)
+    while tokens and tokens[0] == 'OR':
+        node, tokens = parse_and(tokens[1:])
+        children.append(node)
+    return (children[0] if len(children) == 1 else Or(children)), tokens
+
+
+def parse_and(tokens: List[str]) -> Tuple[Node, List[str]]:
+    """空白（またはAND）で区切られた条件を解析する"""
+    children = []
+    while tokens and tokens[0] not in ('OR', ')'):
+        if tokens[0] == 'AND':
+            tokens = tokens[1:]
+            continue
+        node, tokens = parse_near(tokens)
+        children.append(node)
+    if not children:
+        raise QuerySyntaxError('検索条件がありません')
+    return (children[0] if len(children) == 1 else And(children)), tokens
+
+
+def parse_near(tokens: List[str]) -> Tuple[Node, List[str]]:
+    """NEAR/Nで区切られた条件を解析する"""
+    node, tokens = parse_atom(tokens)
+    while tokens and NEAR_PATTERN.fullmatch(tokens[0]):
+        seconds = int(NEAR_PATTERN.fullmatch(tokens[0]).group(1))
+        right, tokens = parse_atom(tokens[1:])
+        node = Near(node, right, seconds)
+    return node, tokens
+
+
+def parse_atom(tokens: List[str]) -> Tuple[Node, List[str]]:
+    """キーワード・フレーズ・括弧でまとめた条件を解析する"""
+    if not tokens:
+        raise QuerySyntaxError('検索条件がありません')
+    token, tokens = tokens[0], tokens[1:]
+    if token == '(':
+        node, tokens = parse_or(tokens)
+        if not tokens or tokens[0] != ')':
+            raise QuerySyntaxError('括弧が閉じられていません')
+        return node, tokens[1:]
+    if token == ')' or token in ('OR', 'AND') or NEAR_PATTERN.fullmatch(token):
+        raise QuerySyntaxError(f'検索条件がありません: {token}')
+    if token.startswith('"'):
+        terms = [make_term(text) for text in token.strip('"').split()]
+        if not terms:
+            raise QuerySyntaxError('フレーズが空です')
+        return (terms[0] if len(terms) == 1 else Phrase(terms)), tokens
+    return make_term(token), tokens
+
+
+def make_term(text: str) -> Term:
+    """キーワードを正規化して検索条件を作る
+
+    Args:
+        text (str): キーワード
+
+    Returns:
+        Term: 検索条件
+    """
+    return Term(normalize(text))
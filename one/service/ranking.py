@@ -0,0 +1,76 @@
+import math
+from django.conf import settings
+from django.db.models import Avg, Count, QuerySet, Sum
+from django.utils import timezone
+from ..models import Episode, TermStat
+
+from typing import Dict, Iterable, List, Optional
+
+
+def term_frequencies(term_ids: Iterable[int], episodes: Optional[QuerySet] = None) -> Dict[int, int]:
+    """語彙の回ごとの出現回数を単語統計から取得する
+
+    Args:
+        term_ids (Iterable[int]): 語彙ID
+        episodes (Optional[QuerySet]): 対象の回（Noneの場合は全ての回）
+
+    Returns:
+        Dict[int, int]: エピソードIDと出現回数
+    """
+    rows = TermStat.objects.filter(term_id__in=term_ids)
+    if episodes is not None:
+        rows = rows.filter(episode_id__in=episodes.values('id'))
+    rows = rows.values('episode_id').annotate(frequency=Sum('count')).order_by()
+    return {row['episode_id']: row['frequency'] for row in rows}
+
+
+def score_episodes(frequencies: Dict[int, int]) -> Dict[int, float]:
+    """キーワードの出現回数から回の関連度（BM25）を計算する
+
+    回の単語数で出現回数を正規化し、出現する回が少ないキーワードほど高く評価する。
+    SEARCH_RECENCY_WEIGHTが0より大きい場合は、放送日が新しい回ほど関連度を上げる。
+
+    Args:
+        frequencies (Dict[int, int]): エピソードIDと出現回数
+
+    Returns:
+        Dict[int, float]: エピソードIDと関連度
+    """
+    k1 = settings.SEARCH_BM25_K1
+    b = settings.SEARCH_BM25_B
+    recency_weight = settings.SEARCH_RECENCY_WEIGHT
+    half_life = settings.SEARCH_RECENCY_HALF_LIFE_DAYS
+
+    # 単語保存済みの回の数と平均単語数
+    corpus = Episode.objects.filter(word_count__gt=0).aggregate(
+        episodes=Count('id'), average=Avg('word_count'))
+    episode_count = max(corpus['episodes'], len(frequencies))
+    average_length = corpus['average'] or 1
+    document_frequency = len(frequencies)
+    idf = math.log(1 + (episode_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    today = timezone.localdate()
+    scores = {}
+    for episode_id, word_count, air_date in Episode.objects.filter(
+            id__in=frequencies.keys()).values_list('id', 'word_count', 'air_date'):
+        frequency = frequencies[episode_id]
+        length = word_count / average_length
+        score = idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length))
+        if recency_weight > 0:
+            age = max((today - air_date).days, 0)
+            score *= 1 + recency_weight * 0.5 ** (age / half_life)
+        scores[episode_id] = score
+    return scores
+
+
+def rank_episodes(frequencies: Dict[int, int]) -> List[int]:
+    """回を関連度の高い順に並べる
+
+    Args:
+        frequencies (Dict[int, int]): エピソードIDと出現回数
+
+    Returns:
+        List[int]: 関連度の高い順のエピソードID（同じ関連度の場合はID順）
+    """
+    scores = score_episodes(frequencies)
+    return sorted(scores, key=lambda episode_id: (-scores[episode_id], episode_id))
@@ -0,0 +1,284 @@
+import base64
+import binascii
+from collections import Counter
+from datetime import datetime
+from django.db.models import Max, Prefetch, Q, QuerySet, prefetch_related_objects
+from django.core.paginator import Paginator, Page
+from ..models import Episode
+from .generation import active_words
+from .hits import Hit, list_hits, summarize_hits
+from .query import Node, Posting, QuerySyntaxError, make_term, parse_query
+from .ranking import rank_episodes, term_frequencies
+from .cache import get_search_result, make_search_key, normalize_page_num, set_search_result
+
+from typing import Any, Iterator, List, Optional, Tuple
+
+# 1ページあたりの回の数
+PER_PAGE = 5
+# 並び順（新しい回順・関連度順）
+SORT_NEW = 'new'
+SORT_RELEVANCE = 'relevance'
+SORTS = (SORT_NEW, SORT_RELEVANCE)
+
+
+class CachedPaginator(Paginator):
+    """キャッシュした件数からページを復元するページネーター"""
+
+    def __init__(self, count: int, per_page: int):
+        super().__init__([], per_page)
+        # 件数はキャッシュの値を使用する
+        self.count = count
+
+
+def search_episodes(search_word: str, page_num: Any, sort: str = SORT_NEW) -> Page:
+    """キーワードに一致する単語を含む回を検索する
+
+    件数の取得と対象ページの回・単語の取得のみDBで行い、
+    対象ページ以外の回は取得しない。キーワードは検索式として解析する（query.parse_query）。
+    一致する回は単語統計で絞り込み、単語の位置を比べる検索式のみ絞り込んだ回の転置リストを評価する。
+    関連度順の場合は、単語統計（または検索式の転置リスト）の出現回数から順位を付ける。
+
+    Args:
+        search_word (str): 正規化済みの検索式（normalize.normalize_query）
+        page_num (Any): ページ番号（不正な場合は1ページ目）
+        sort (str): 並び順（SORT_NEW: 新しい回順, SORT_RELEVANCE: 関連度順）
+
+    Returns:
+        Page: 一致箇所の要約（hits.HitSummary）をhit_summaryに持つ回のページ
+    """
+    query = parse_search_word(search_word)
+
+    # 単語統計で全てのキーワードを含む回（ORはいずれか）に絞り込む
+    episodes = Episode.objects.filter(query.candidates())
+    if query.exact:
+        # キーワードのAND・ORのみの検索式は、絞り込んだ回がそのまま一致する回になる
+        word_filter = Q(term_id__in=query.term_ids())
+        if sort == SORT_RELEVANCE:
+            frequencies = term_frequencies(query.term_ids(), episodes)
+    else:
+        # フレーズ・近接検索は絞り込んだ回の転置リストのみをマージして評価する
+        postings = query.evaluate(episodes.values('id'))
+        frequencies = Counter(posting.episode_id for posting in postings)
+        episodes = Episode.objects.filter(id__in=frequencies.keys())
+
+    if sort == SORT_RELEVANCE:
+        # 関連度順のエピソードIDをページ分割する
+        paginator = Paginator(rank_episodes(frequencies), PER_PAGE)
+    else:
+        paginator = Paginator(
+            episodes.select_related('radio_id').order_by('number').reverse(), PER_PAGE)
+    try:
+        page = paginator.page(page_num)
+    except Exception:
+        page = paginator.page(1)
+
+    # 表示するページの回の単語のみ取得する
+    if sort == SORT_RELEVANCE:
+        episodes_by_id = Episode.objects.select_related('radio_id').in_bulk(page.object_list)
+        page.object_list = [episodes_by_id[episode_id] for episode_id in page.object_list]
+    else:
+        page.object_list = list(page.object_list)
+    if not query.exact:
+        word_filter = Q(id__in=page_word_ids(postings, page.object_list))
+    # 一致した単語は回ごとに集計し、最初の数件の開始時間のみ取得する
+    summarize_hits(page.object_list, word_filter)
+    return page
+
+
+def search_episodes_after(search_word: str, cursor: Optional[Tuple[int, int]],
+                          limit: int) -> Tuple[List[Episode], Optional[Tuple[int, int]]]:
+    """キーワードに一致する単語を含む回を、カーソルの次から新しい回順に取得する
+
+    (回の番号, ID)の降順のキーセットで絞り込むため、件数の取得やOFFSETは行わない。
+
+    Args:
+        search_word (str): 正規化済みの検索式（normalize.normalize_query）
+        cursor (Optional[Tuple[int, int]]): 前のページの最後の回の(番号, ID)（1ページ目はNone）
+        limit (int): 取得する回の数
+
+    Returns:
+        Tuple[List[Episode], Optional[Tuple[int, int]]]:
+            一致した単語をword_setに持つ回と、次のページのカーソル（最後のページの場合はNone）
+    """
+    query = parse_search_word(search_word)
+    episodes = Episode.objects.filter(query.candidates())
+    if cursor is not None:
+        number, episode_id = cursor
+        episodes = episodes.filter(Q(number__lt=number) | Q(number=number, id__lt=episode_id))
+    episodes = episodes.select_related('radio_id').order_by('-number', '-id')
+
+    # 1件多く取得して次のページの有無を判定する
+    if query.exact:
+        word_filter = Q(term_id__in=query.term_ids())
+        page = list(episodes[:limit + 1])
+    else:
+        # 候補の回を順に評価し、ページの件数に達したら残りの回は評価しない
+        page, postings = [], []
+        for candidates in iter_batches(episodes, limit + 1):
+            matched = query.evaluate([episode.id for episode in candidates])
+            matched_ids = {posting.episode_id for posting in matched}
+            page += [episode for episode in candidates if episode.id in matched_ids][:limit + 1 - len(page)]
+            postings += matched
+            if len(page) > limit:
+                break
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = (page[-1].number, page[-1].id)
+
+    if not query.exact:
+        word_filter = Q(id__in=page_word_ids(postings, page))
+    prefetch_words(page, word_filter)
+    return page, next_cursor
+
+
+def episode_hits(search_word: str, episode_id: int, offset: int) -> List[Hit]:
+    """回の一致箇所のうち、検索結果に表示していない残りを取得する
+
+    Args:
+        search_word (str): 正規化済みの検索式（normalize.normalize_query）
+        episode_id (int): エピソードID
+        offset (int): 表示済みの一致箇所の数
+
+    Returns:
+        List[Hit]: 開始時間順の一致箇所
+    """
+    query = parse_search_word(search_word)
+    if query.exact:
+        word_filter = Q(term_id__in=query.term_ids())
+    else:
+        # 検索式はその回の単語だけで評価する
+        word_filter = Q(id__in=[posting.word_id for posting in query.evaluate([episode_id])])
+    return list_hits(active_words().filter(word_filter, episode_id=episode_id), offset, None)
+
+
+def parse_search_word(search_word: str) -> Node:
+    """検索式を解析する
+
+    Args:
+        search_word (str): 正規化済みの検索式
+
+    Returns:
+        Node: 検索式の構文木（解析できない場合はキーワード全体のTerm）
+    """
+    try:
+        return parse_query(search_word)
+    except QuerySyntaxError:
+        # 解析できない検索式はキーワード全体で部分一致検索する
+        return make_term(search_word)
+
+
+def iter_batches(episodes: QuerySet, size: int) -> Iterator[List[Episode]]:
+    """回を順に一定数ずつ取得する
+
+    Args:
+        episodes (QuerySet): 並び順を指定した回
+        size (int): 1度に取得する回の数
+
+    Yields:
+        List[Episode]: 取得した回
+    """
+    offset = 0
+    while True:
+        batch = list(episodes[offset:offset + size])
+        if not batch:
+            return
+        yield batch
+        offset += size
+
+
+def page_word_ids(postings: List[Posting], episodes: List[Episode]) -> List[int]:
+    """転置リストからページの回の単語のIDを取り出す
+
+    Args:
+        postings (List[Posting]): 検索式の評価結果
+        episodes (List[Episode]): ページの回
+
+    Returns:
+        List[int]: 単語のID
+    """
+    episode_ids = {episode.id for episode in episodes}
+    return [posting.word_id for posting in postings if posting.episode_id in episode_ids]
+
+
+def prefetch_words(episodes: List[Episode], word_filter: Q) -> None:
+    """回のword_setに一致した有効な世代の単語のみを語彙と合わせて開始時間順で取得しておく
+
+    Args:
+        episodes (List[Episode]): ページの回
+        word_filter (Q): 一致した単語の条件（語彙IDまたは単語ID）
+    """
+    prefetch_related_objects(episodes, Prefetch(
+        'word_set', queryset=active_words().select_related('term_id').order_by(
+            'start_ms').filter(word_filter)))
+
+
+def encode_cursor(cursor: Tuple[int, int]) -> str:
+    """カーソルを不透明な文字列にする
+
+    Args:
+        cursor (Tuple[int, int]): 回の(番号, ID)
+
+    Returns:
+        str: URLに使用できる文字列
+    """
+    return base64.urlsafe_b64encode(f'{cursor[0]}:{cursor[1]}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(value: str) -> Tuple[int, int]:
+    """文字列からカーソルを復元する
+
+    Args:
+        value (str): encode_cursorで作成した文字列
+
+    Raises:
+        ValueError: 不正なカーソルの場合
+
+    Returns:
+        Tuple[int, int]: 回の(番号, ID)
+    """
+    try:
+        decoded = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode()
+        number, episode_id = decoded.split(':')
+        return int(number), int(episode_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f'不正なカーソルです: {value}')
+
+
+def last_ingested_at() -> Optional[datetime]:
+    """最後に単語を保存した日時を取得する
+
+    単語の保存時（ingestion.set_word_stored）と音声の変更時に回の更新日時が更新される。
+
+    Returns:
+        Optional[datetime]: 回の更新日時の最大値（回がない場合はNone）
+    """
+    return Episode.objects.aggregate(last=Max('updated_at'))['last']
+
+
+def search_episodes_cached(search_word: str, page_num: Any, sort: str = SORT_NEW) -> Page:
+    """検索結果キャッシュを利用して回を検索する
+
+    Args:
+        search_word (str): 正規化済みの検索キーワード
+        page_num (Any): ページ番号（不正な場合は1ページ目）
+        sort (str): 並び順
+
+    Returns:
+        Page: 一致箇所の要約をhit_summaryに持つ回のページ
+    """
+    page_num = normalize_page_num(page_num)
+    # 検索中に世代番号が更新された場合、古い単語で作った結果は古い世代のキーに保存される
+    key = make_search_key(search_word, page_num, sort)
+    result = get_search_result(key)
+    if result is not None:
+        paginator = CachedPaginator(result['count'], PER_PAGE)
+        return Page(result['episodes'], result['number'], paginator)
+
+    page = search_episodes(search_word, page_num, sort)
+    set_search_result(key, {
+        'count': page.paginator.count,
+        'number': page.number,
+        'episodes': page.object_list,
+    })
+    return page
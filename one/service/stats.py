@@ -0,0 +1,170 @@
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Min, Sum
+from ..models import Episode, TermStat, Word
+from .index import search_term_ids
+
+from typing import Dict, Iterable, List, Tuple
+
+
+def add_term_stats(words: List[Word]) -> None:
+    """保存した単語を回ごとの単語統計と単語数に加算する
+
+    既存の統計は読み込んで加算し、新しい単語は一括登録、既存の単語は一括更新する。
+
+    Args:
+        words (List[Word]): 保存済みのWordモデルのリスト
+    """
+    counts = Counter(term_key(word) for word in words)
+    if not counts:
+        return
+
+    with transaction.atomic():
+        stats = load_term_stats(counts.keys())
+        for key, count in counts.items():
+            stat = stats.get(key)
+            if stat is None:
+                episode_id, term_id = key
+                stats[key] = stat = TermStat(episode_id_id=episode_id, term_id_id=term_id, count=0)
+            stat.count += count
+        merge_first_start(stats, words)
+        changed = [stats[key] for key in counts]
+        batch_size = settings.WORD_BULK_BATCH_SIZE
+        TermStat.objects.bulk_update([stat for stat in changed if stat.pk is not None],
+                                     ['count', 'first_start_ms'], batch_size=batch_size)
+        TermStat.objects.bulk_create([stat for stat in changed if stat.pk is None],
+                                     batch_size=batch_size)
+
+        episode_counts = Counter(word.episode_id_id for word in words)
+        for episode_id, count in episode_counts.items():
+            Episode.objects.filter(id=episode_id).update(word_count=F('word_count') + count)
+
+
+def update_first_start(words: List[Word]) -> None:
+    """開始時間を設定した単語で単語統計の最初の開始時間を更新する
+
+    Args:
+        words (List[Word]): 開始時間を保存済みのWordモデルのリスト
+    """
+    keys = {term_key(word) for word in words if word.start_ms is not None}
+    if not keys:
+        return
+
+    with transaction.atomic():
+        stats = load_term_stats(keys)
+        changed = merge_first_start(stats, words)
+        TermStat.objects.bulk_update(changed, ['first_start_ms'],
+                                     batch_size=settings.WORD_BULK_BATCH_SIZE)
+
+
+def reset_first_start(episode_id: int, words: List[Word]) -> None:
+    """回の単語統計の最初の開始時間を、単語の開始時間から求め直す（開始時間を対応付け直したときに呼び出す）
+
+    Args:
+        episode_id (int): エピソードID
+        words (List[Word]): 回の全ての単語
+    """
+    with transaction.atomic():
+        TermStat.objects.filter(episode_id=episode_id).update(first_start_ms=None)
+        update_first_start(words)
+
+
+def term_key(word: Word) -> Tuple[int, int]:
+    """単語統計のキー（エピソードID、語彙ID）を取得する
+
+    Args:
+        word (Word): 語彙を保存済みのWordモデル
+
+    Returns:
+        Tuple[int, int]: 単語統計のキー
+    """
+    return word.episode_id_id, word.term_id_id
+
+
+def load_term_stats(keys: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], TermStat]:
+    """キーに該当する回の単語統計を取得する
+
+    Args:
+        keys (Iterable[Tuple[int, int]]): 単語統計のキー
+
+    Returns:
+        Dict[Tuple[int, int], TermStat]: キーごとの単語統計（該当する回の全ての単語統計）
+    """
+    episode_ids = {episode_id for episode_id, _ in keys}
+    return {
+        (stat.episode_id_id, stat.term_id_id): stat
+        for stat in TermStat.objects.filter(episode_id__in=episode_ids)
+    }
+
+
+def merge_first_start(stats: Dict[Tuple[int, int], TermStat], words: List[Word]) -> List[TermStat]:
+    """単語の開始時間が単語統計の最初の開始時間より前であれば置き換える
+
+    Args:
+        stats (Dict[Tuple[int, int], TermStat]): キーごとの単語統計
+        words (List[Word]): Wordモデルのリスト
+
+    Returns:
+        List[TermStat]: 最初の開始時間を変更した単語統計
+    """
+    changed = {}
+    for word in words:
+        stat = stats.get(term_key(word))
+        if stat is None or word.start_ms is None:
+            continue
+        if stat.first_start_ms is None or word.start_ms < stat.first_start_ms:
+            stat.first_start_ms = word.start_ms
+            changed[id(stat)] = stat
+    return list(changed.values())
+
+
+def clear_term_stats(episode_id: int) -> None:
+    """回の単語統計と単語数をリセットする（単語を削除したときに呼び出す）
+
+    Args:
+        episode_id (int): エピソードID
+    """
+    TermStat.objects.filter(episode_id=episode_id).delete()
+    Episode.objects.filter(id=episode_id).update(word_count=0)
+
+
+def keyword_stats(search_word: str) -> Dict:
+    """キーワードに部分一致する単語の回ごと・年ごとの出現回数を単語統計から集計する
+
+    単語テーブルは参照しない。
+
+    Args:
+        search_word (str): 正規化済みの検索キーワード
+
+    Returns:
+        Dict: 総出現回数（total）、回ごとの集計（episodes、放送日順）、年ごとの集計（years、年順）
+    """
+    rows = TermStat.objects.filter(term_id__in=search_term_ids(search_word)).values(
+        'episode_id', 'episode_id__radio_id__title', 'episode_id__number', 'episode_id__air_date'
+    ).annotate(
+        count=Sum('count'), first_start_ms=Min('first_start_ms')
+    ).order_by('episode_id__air_date', 'episode_id__number')
+
+    episodes = []
+    years = {}
+    for row in rows:
+        air_date = row['episode_id__air_date']
+        episodes.append({
+            'episode_id': row['episode_id'],
+            'radio': row['episode_id__radio_id__title'],
+            'number': row['episode_id__number'],
+            'air_date': air_date.isoformat(),
+            'count': row['count'],
+            'first_start_ms': row['first_start_ms'],
+        })
+        year = years.setdefault(air_date.year, {'year': air_date.year, 'count': 0, 'episodes': 0})
+        year['count'] += row['count']
+        year['episodes'] += 1
+
+    return {
+        'keyword': search_word,
+        'total': sum(episode['count'] for episode in episodes),
+        'episodes': episodes,
+        'years': list(years.values()),
+    }
@@ -0,0 +1,197 @@
+import heapq
+import threading
+from bisect import bisect_left
+from django.conf import settings
+from django.db import connection
+from django.db.models import Sum
+from ..models import TermStat
+from .cache import get_generation
+from .normalize import KEY_SEPARATOR
+
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+# 前方一致の範囲の終端（どの文字よりも大きい文字）
+MAX_CHAR = '\U0010ffff'
+
+
+class Suggestion(NamedTuple):
+    """入力候補の単語"""
+    original_form: str
+    pronunciation: str
+    # 検索キー（正規化した原形と読み）
+    search_key: str
+    # 全ての回での出現回数
+    count: int
+
+
+class SuggestIndex:
+    """正規化した原形・読みの前方一致で出現回数の多い単語を返す索引
+
+    原形と読みを1つのソート済み配列にまとめ、前方一致の範囲を二分探索で求める。
+    範囲が広い接頭辞は構築時に上位の単語を求めておくため、検索時に調べる件数は一定以下になる。
+    """
+
+    def __init__(self, terms: Sequence[Suggestion], limit: int, precompute_threshold: int):
+        """
+        Args:
+            terms (Sequence[Suggestion]): 単語
+            limit (int): 返す候補の数
+            precompute_threshold (int): 上位の単語を事前に求める、前方一致の範囲の件数
+        """
+        self.terms = terms
+        self.limit = limit
+        keys = []
+        term_ids = []
+        for term_id, term in enumerate(terms):
+            # 正規化した原形と読み（同じ場合は1つ）を前方一致の対象にする
+            for key in set(term.search_key.split(KEY_SEPARATOR)):
+                keys.append(key)
+                term_ids.append(term_id)
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys = [keys[i] for i in order]
+        self.term_ids = [term_ids[i] for i in order]
+
+        # 範囲がprecompute_thresholdを超える接頭辞は、文字数を増やしながら上位の単語を求めておく
+        self.top: Dict[str, List[int]] = {}
+        ranges = [(0, len(self.keys))]
+        length = 1
+        while ranges:
+            wide_ranges = []
+            for lower, upper in ranges:
+                while lower < upper:
+                    prefix = self.keys[lower][:length]
+                    if len(prefix) < length:
+                        lower += 1
+                        continue
+                    end = bisect_left(self.keys, prefix + MAX_CHAR, lower, upper)
+                    if end - lower > precompute_threshold:
+                        self.top[prefix] = self.rank(lower, end)
+                        wide_ranges.append((lower, end))
+                    lower = end
+            ranges = wide_ranges
+            length += 1
+
+    def rank(self, lower: int, upper: int) -> List[int]:
+        """配列の範囲の単語を出現回数の多い順に並べる
+
+        Args:
+            lower (int): 範囲の開始位置
+            upper (int): 範囲の終了位置（含まない）
+
+        Returns:
+            List[int]: 上位limit件の単語の番号
+        """
+        term_ids = set(self.term_ids[lower:upper])
+        return heapq.nlargest(self.limit, term_ids,
+                              key=lambda term_id: (self.terms[term_id].count, -term_id))
+
+    def lookup(self, prefix: str) -> List[Suggestion]:
+        """接頭辞で始まる単語を出現回数の多い順に取得する
+
+        Args:
+            prefix (str): 接頭辞
+
+        Returns:
+            List[Suggestion]: 入力候補（最大limit件）
+        """
+        if not prefix:
+            return []
+        term_ids = self.top.get(prefix)
+        if term_ids is None:
+            lower = bisect_left(self.keys, prefix)
+            upper = bisect_left(self.keys, prefix + MAX_CHAR, lower)
+            term_ids = self.rank(lower, upper)
+        return [self.terms[term_id] for term_id in term_ids]
+
+
+# 現在の索引と、構築時の検索結果キャッシュの世代番号
+_index: Optional[SuggestIndex] = None
+_index_generation: Optional[int] = None
+_lock = threading.Lock()
+_refreshing = False
+
+
+def load_terms() -> List[Suggestion]:
+    """単語統計から全ての単語と出現回数を取得する
+
+    Returns:
+        List[Suggestion]: 単語
+    """
+    return [Suggestion(*row) for row in TermStat.objects.values('term_id').annotate(
+        total=Sum('count')).order_by().values_list(
+            'term_id__original_form', 'term_id__pronunciation', 'term_id__search_key',
+            'total').iterator()]
+
+
+def build_index() -> SuggestIndex:
+    """単語統計から索引を構築する
+
+    Returns:
+        SuggestIndex: 索引
+    """
+    return SuggestIndex(load_terms(), settings.SUGGEST_LIMIT,
+                        settings.SUGGEST_PRECOMPUTE_THRESHOLD)
+
+
+def refresh(generation: int) -> None:
+    """索引を構築し直して置き換える
+
+    Args:
+        generation (int): 構築を始めた時点の世代番号
+    """
+    global _index, _index_generation, _refreshing
+    try:
+        index = build_index()
+        with _lock:
+            _index, _index_generation = index, generation
+    finally:
+        _refreshing = False
+
+
+def refresh_in_background(generation: int) -> None:
+    """別スレッドで索引を構築し直す（構築中は古い索引を返す）
+
+    Args:
+        generation (int): 構築を始めた時点の世代番号
+    """
+    try:
+        refresh(generation)
+    finally:
+        connection.close()
+
+
+def get_index() -> SuggestIndex:
+    """索引を取得する
+
+    初回は構築してから返す。単語の保存で検索結果キャッシュの世代番号が変わっていれば、
+    別スレッドで構築し直し、それまでは古い索引を返す。世代番号はDBに保存されているため、
+    ワーカーのプロセスで単語を保存した場合も、各Webプロセスの索引が構築し直される。
+
+    Returns:
+        SuggestIndex: 索引
+    """
+    global _index, _index_generation, _refreshing
+    generation = get_generation()
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index, _index_generation = build_index(), generation
+    elif _index_generation != generation and not _refreshing:
+        with _lock:
+            start = not _refreshing
+            _refreshing = True
+        if start:
+            threading.Thread(target=refresh_in_background, args=(generation,), daemon=True).start()
+    return _index
+
+
+def suggest(prefix: str) -> List[Suggestion]:
+    """接頭辞で始まる単語の入力候補を取得する
+
+    Args:
+        prefix (str): 正規化済みの接頭辞（normalize.normalize）
+
+    Returns:
+        List[Suggestion]: 出現回数の多い順の入力候補
+    """
+    return get_index().lookup(prefix)
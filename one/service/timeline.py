@@ -0,0 +1,49 @@
+from django.db.models import QuerySet
+from ..models import Word
+from .generation import active_words
+
+from typing import List
+
+# 前後の文脈として取得する既定の時間（ミリ秒）
+CONTEXT_MS = 5000
+
+
+def words_between(episode_id: int, start_ms: int, end_ms: int) -> QuerySet:
+    """エピソードの指定した時間の範囲に話された単語を取得する
+
+    (episode_id, generation, start_ms)のインデックスで範囲を絞り込むため、エピソード全体は走査しない。
+
+    Args:
+        episode_id (int): エピソードID
+        start_ms (int): 範囲の開始時間（ミリ秒、この時間を含む）
+        end_ms (int): 範囲の終了時間（ミリ秒、この時間を含まない）
+
+    Returns:
+        QuerySet: 開始時間順のWordモデル（語彙を含む）のクエリセット
+    """
+    return active_words().select_related('term_id').filter(
+        episode_id=episode_id,
+        start_ms__gte=start_ms,
+        start_ms__lt=end_ms,
+    ).order_by('start_ms')
+
+
+def word_context(episode_id: int, start_ms: int, before_ms: int = CONTEXT_MS,
+                 after_ms: int = CONTEXT_MS) -> List[Word]:
+    """一致箇所の前後に話された単語を取得する（検索結果の文脈表示用）
+
+    Args:
+        episode_id (int): エピソードID
+        start_ms (int): 一致箇所の開始時間（ミリ秒）
+        before_ms (int): 一致箇所より前に遡る時間（ミリ秒）
+        after_ms (int): 一致箇所より後に含める時間（ミリ秒）
+
+    Returns:
+        List[Word]: 一致箇所の単語を含む前後の単語のリスト（開始時間順）
+    """
+    return list(words_between(
+        episode_id,
+        max(start_ms - before_ms, 0),
+        start_ms + after_ms + 1,
+    ))
+
@@ -0,0 +1,130 @@
+import ijson
+from ijson.common import ObjectBuilder
+
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional, Tuple
+
+# 文字起こしファイルの候補と単語のプレフィックス
+# {"results": [{"alternatives": [{"transcript": "...", "words": [{"word": "...", "startTime": "1.2s"}]}]}]}
+RESULT_PREFIX = 'results.item'
+ALTERNATIVE_PREFIX = 'results.item.alternatives.item'
+TRANSCRIPT_PREFIX = 'results.item.alternatives.item.transcript'
+WORDS_PREFIX = 'results.item.alternatives.item.words'
+WORD_PREFIX = 'results.item.alternatives.item.words.item'
+
+
+class TranscriptRecord(NamedTuple):
+    """文字起こし結果の単語（全resultを通して発話順に並べたもの）"""
+    # resultの番号
+    block: int
+    # resultの文字起こし本文（同じresultの単語では同じ文字列を参照する）
+    text: str
+    # 単語（例: '内山|ウチヤマ'、単語のないresultの場合はNone）
+    word: Optional[str]
+    # 開始時間・終了時間（例: '1.200s'）
+    start_time: Optional[str]
+    end_time: Optional[str]
+
+
+def iter_records(file: BinaryIO) -> Iterator[TranscriptRecord]:
+    """文字起こしファイルの全resultを1つの単語の並びにまとめる
+
+    各resultの最初の候補の単語を発話順に返す。単語のないresultは本文のみのレコードを返す。
+
+    Args:
+        file (BinaryIO): 文字起こしファイル
+
+    Yields:
+        TranscriptRecord: 文字起こし結果の単語
+    """
+    for block, text, items in iter_alternatives(file):
+        has_word = False
+        for item in items:
+            has_word = True
+            yield TranscriptRecord(block, text, item.get('word'),
+                                   item.get('startTime'), item.get('endTime'))
+        if not has_word:
+            yield TranscriptRecord(block, text, None, None, None)
+
+
+def iter_alternatives(file: BinaryIO) -> Iterator[Tuple[int, str, Iterator[Dict]]]:
+    """文字起こしファイルを少しずつ読み込み、各resultの最初の候補を順に返す
+
+    ファイル全体を読み込まずに、単語は1件ずつ組み立てて返す。
+    返した単語のイテレータは、次の候補を取得する前に読み切ること（読み残しは読み飛ばす）。
+
+    Args:
+        file (BinaryIO): 文字起こしファイル
+
+    Yields:
+        Tuple[int, str, Iterator[Dict]]: resultの番号、文字起こし本文、単語のイテレータ
+    """
+    events = ijson.parse(file)
+    result_index = -1
+    alternative_index = -1
+    transcript = None
+    buffered_words = None
+    words = None
+    yielded = False
+
+    for prefix, event, value in events:
+        if prefix == RESULT_PREFIX and event == 'start_map':
+            result_index += 1
+            alternative_index = -1
+        elif prefix == ALTERNATIVE_PREFIX and event == 'start_map':
+            alternative_index += 1
+            transcript = None
+            buffered_words = []
+            yielded = False
+        elif alternative_index != 0:
+            # 2番目以降の候補は使用しない
+            continue
+        elif prefix == TRANSCRIPT_PREFIX:
+            transcript = value
+        elif prefix == WORDS_PREFIX and event == 'start_array':
+            words = iter_words(events)
+            if transcript is None:
+                # 本文より先に単語がある場合は本文を読むまで単語を保持する
+                buffered_words = list(words)
+            else:
+                yielded = True
+                yield result_index, transcript, words
+                # 読み残した単語を読み飛ばす
+                for _ in words:
+                    pass
+        elif prefix == ALTERNATIVE_PREFIX and event == 'end_map' and not yielded:
+            yield result_index, transcript or '', iter(buffered_words)
+
+
+def iter_words(events: Iterator[Tuple[str, str, object]]) -> Iterator[Dict]:
+    """パースイベントから単語の配列の終わりまで読み込み、単語を1件ずつ返す
+
+    Args:
+        events (Iterator[Tuple[str, str, object]]): ijsonのパースイベント
+
+    Yields:
+        Dict: 単語（例: {'word': '内山|ウチヤマ', 'startTime': '1.2s'}）
+    """
+    word = None
+    key = None
+    builder = None
+    for prefix, event, value in events:
+        if builder is not None:
+            # 単語の値が入れ子の場合はObjectBuilderで組み立てる
+            builder.event(event, value)
+            if prefix == f'{WORD_PREFIX}.{key}' and event in ('end_map', 'end_array'):
+                word[key] = builder.value
+                builder = None
+        elif event == 'map_key':
+            key = value
+        elif prefix == WORD_PREFIX:
+            if event == 'start_map':
+                word = {}
+            elif event == 'end_map':
+                yield word
+        elif prefix == WORDS_PREFIX and event == 'end_array':
+            return
+        elif event in ('start_map', 'start_array'):
+            builder = ObjectBuilder()
+            builder.event(event, value)
+        else:
+            word[key] = value
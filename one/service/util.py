@@ -1,13 +1,57 @@
 import MeCab
 import datetime
-import re
+import os
+import threading
 import environ
+from .normalize import is_hiragana
 
-from typing import List, Dict
+from typing import Iterable, List, Dict, Tuple
 
 env = environ.Env()
 env.read_env('.env')
 
+# 単語の取り出し方（parse_with_tagger）のバージョン（変更したら上げる）
+# 2: 単語の位置に取り出さなかった形態素も数える
+PARSER_VERSION = 2
+
+# スレッドごとに使い回すTagger（辞書の読み込みはスレッドごとに1回のみ）
+_local = threading.local()
+
+
+def get_tagger() -> MeCab.Tagger:
+    """現在のスレッドのmecab Taggerを取得する
+
+    初回呼び出し時に辞書を読み込み、以降は同じTaggerを使い回す。
+    Taggerはスレッドセーフではないため、スレッドごとに生成する。
+
+    Returns:
+        MeCab.Tagger: mecab Tagger
+    """
+    tagger = getattr(_local, 'tagger', None)
+    if tagger is None:
+        tagger = MeCab.Tagger(env.str('MECAB_DIC_PATH'))
+        _local.tagger = tagger
+    return tagger
+
+
+def parser_version() -> str:
+    """形態素解析の処理と辞書のバージョンを取得する
+
+    辞書を更新した場合や、単語の取り出し方（parse_with_tagger）を変更した場合に値が変わる。
+
+    Returns:
+        str: バージョン（例: '1/mecab0.996/sys.dic:102:392126'）
+    """
+    info = get_tagger().dictionary_info()
+    return (f'{PARSER_VERSION}/mecab{MeCab.VERSION}/'
+            f'{os.path.basename(info.filename)}:{info.version}:{info.size}')
+
+
+def warm_up() -> None:
+    """現在のスレッドのTaggerを生成し、辞書を事前に読み込む"""
+    get_tagger()
+
+
 def parse(text: str) -> List[Dict[str, str]]:
     """mecabを用いて文章を形態素解析し、単語リストを取得する
 
@@ -17,13 +61,60 @@ def parse(text: str) -> List[Dict[str, str]]:
     Returns:
         List[Dict[str, str]]: 単語の原型と読みで構成された辞書のリスト
     """
+    return parse_with_tagger(get_tagger(), text)
+
+
+def parse_many(texts: Iterable[str]) -> List[List[Dict[str, str]]]:
+    """複数の文章を同じTaggerで形態素解析する
+
+    Args:
+        texts (Iterable[str]): 文章のリスト
+
+    Returns:
+        List[List[Dict[str, str]]]: 文章ごとの単語リスト
+    """
+    tagger = get_tagger()
+    return [parse_with_tagger(tagger, text) for text in texts]
+
+
+def parse_with_tagger(tagger: MeCab.Tagger, text: str) -> List[Dict[str, str]]:
+    """指定したTaggerで文章を形態素解析し、単語リストを取得する
+
+    Args:
+        tagger (MeCab.Tagger): mecab Tagger
+        text (str): 文章
+
+    Returns:
+        List[Dict[str, str]]: 単語の原型と読みで構成された辞書のリスト
+    """
+    return [word for _, word in parse_tokens(tagger, text)[0]]
+
+
+def parse_tokens(tagger: MeCab.Tagger, text: str) -> Tuple[List[Tuple[int, Dict[str, str]]], int]:
+    """指定したTaggerで文章を形態素解析し、単語と文章の中での位置を取得する
+
+    位置は取り出さなかった形態素（助詞・動詞など）も数えた、文章の全形態素での番号とする。
+
+    Args:
+        tagger (MeCab.Tagger): mecab Tagger
+        text (str): 文章
+
+    Returns:
+        Tuple[List[Tuple[int, Dict[str, str]]], int]:
+            位置と単語の原型・読みで構成された辞書のリスト、文章の形態素の数
+    """
     # split[]
     # 表層形\t品詞,品詞細分類1,品詞細分類2,品詞細分類3,活用型,活用形,原形,読み,発音
     # ['名詞', '固有名詞', '組織', '*', '*', '*', '文化放送', 'ブンカホウソウ', 'ブンカホーソー']
     words = []
-    t = MeCab.Tagger(env.str('MECAB_DIC_PATH'))
-    node = t.parseToNode(text)
+    position = 0
+    node = tagger.parseToNode(text)
     while node:
+        # 文頭・文末以外の形態素は、取り出さない場合も位置を数える
+        if node.stat in (MeCab.MECAB_BOS_NODE, MeCab.MECAB_EOS_NODE):
+            node = node.next
+            continue
+        position += 1
         f = node.feature
         splits = f.split(',')
         # 正しく解析できてないものはスキップ
@@ -49,9 +140,9 @@ def parse(text: str) -> List[Dict[str, str]]:
         if part_of_speech == '名詞' and part_of_speech_detail_1 in ['一般', '固有名詞']:
             word = {'original_form': original_form,
                     'pronunciation': pronunciation}
-            words.append(word)
+            words.append((position - 1, word))
         node = node.next
-    return words
+    return words, position
 
 
 def now_datetime() -> str:
@@ -61,29 +152,3 @@ def now_datetime() -> str:
         str: 現在日時（Y-m-d-H-M-S）
     """
     return datetime.datetime.now().strftime('%Y-%m-%d-%H-%M-%S')
-
-
-def is_hiragana(text: str) -> bool:
-    """対象の文字列が全て「ひらがな」か判定する
-
-    Args:
-        text (str): 文字列
-
-    Returns:
-        bool: ひらがな: True, ひらがな以外: False
-    """
-    p = re.compile('[\u3041-\u309F]+')
-    return p.fullmatch(text) is not None
-
-
-def hira_to_kata(str: str) -> str:
-    """ひらがなをカタカナに変換する
-
-    Args:
-        str (str): ひらがな
-
-    Returns:
-        str: カタカナ
-    """
-    unicode_point_diff = 96
-    return ''.join([chr(ord(s) + unicode_point_diff) for s in str])
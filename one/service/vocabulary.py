@@ -0,0 +1,58 @@
+from ..models import Term, Word
+from .index import index_terms
+from .normalize import build_search_key
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# 語彙のキー（原形, 読み）
+TermKey = Tuple[str, str]
+
+
+def load_terms(keys: Iterable[TermKey], batch_size: Optional[int] = None) -> Dict[TermKey, Term]:
+    """原形と読みから保存済みの語彙を取得する
+
+    Args:
+        keys (Iterable[TermKey]): 語彙のキー
+        batch_size (Optional[int]): 1回のSELECTで指定する原形の数
+
+    Returns:
+        Dict[TermKey, Term]: 語彙のキーとTermモデル（未保存の語彙は含まない）
+    """
+    keys = set(keys)
+    forms = sorted({original_form for original_form, _ in keys})
+    batch_size = batch_size or len(forms) or 1
+    terms = {}
+    for i in range(0, len(forms), batch_size):
+        # 原形で絞り込み、読みが異なる語彙はメモリ上で除く
+        for term in Term.objects.filter(original_form__in=forms[i:i + batch_size]):
+            key = (term.original_form, term.pronunciation)
+            if key in keys:
+                terms[key] = term
+    return terms
+
+
+def resolve_terms(words: List[Word], batch_size: Optional[int] = None) -> None:
+    """単語の未保存の語彙を保存済みの語彙に置き換える
+
+    語彙をまとめて取得し、未登録の語彙は一括登録して転置インデックスに登録する。
+    並列の単語保存で先に登録された語彙は、登録を無視して取得し直す。
+
+    Args:
+        words (List[Word]): 未保存の語彙（Term）を持つ未保存のWordモデルのリスト
+        batch_size (Optional[int]): 1回のINSERT・SELECTで扱う件数
+    """
+    keys: Set[TermKey] = {(word.original_form, word.pronunciation) for word in words}
+    terms = load_terms(keys, batch_size)
+    missing = keys - terms.keys()
+    if missing:
+        Term.objects.bulk_create([
+            Term(original_form=original_form, pronunciation=pronunciation,
+                 search_key=build_search_key(original_form, pronunciation))
+            for original_form, pronunciation in missing
+        ], batch_size=batch_size, ignore_conflicts=True)
+        created = load_terms(missing, batch_size)
+        index_terms(created.values(), batch_size=batch_size)
+        terms.update(created)
+
+    for word in words:
+        word.term_id = terms[(word.original_form, word.pronunciation)]
@@ -1,3 +1,876 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import shutil
+import tempfile
+import soundfile
+from pathlib import Path
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Q
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from .admin import EstimatedCountPaginator
+from .models import Episode, IngestionJob, Radio, Term, TermNgram, Word, format_start_time
+from .service.alignment import SubstringMatchStrategy, align, alignment_version
+from .service.cache import (get_generation, get_stats, invalidate_search_cache, make_search_key,
+                            reset_stats)
+from .service import search, suggest
+from .service.hits import summarize_hits
+from .service.backends import OperationState, load_backend
+from .service.chunking import AudioChunk, split_audio, stitch, wait_operation
+from .service.generation import activate_generation, active_words, collect_garbage, next_generation
+from .service.index import search_term_ids
+from .service import ingestion
+from .service.ingestion import append_words, store_words, transcribe
+from .service.jobs import claim_job, enqueue_ingestion
+from .service.normalize import build_search_key, is_hiragana, normalize, normalize_query
+from .service.operations import next_poll_at, poll_operations
+from .service.query import intersect, parse_query
+from .service.ranking import rank_episodes, score_episodes
+from .service.timeline import word_context
+from .service.transcript import TranscriptRecord, iter_alternatives, iter_records
+from .service.vocabulary import load_terms, resolve_terms
 
-# Create your tests here.
+
+def create_episode(number: int, air_date: datetime.date = datetime.date(2022, 1, 1)) -> Episode:
+    """テスト用の回を作成する"""
+    radio, _ = Radio.objects.get_or_create(
+        title='テスト', english_title='test', defaults={'image': 'test.png'})
+    return Episode.objects.create(radio_id=radio, number=number, audio_file='test.flac',
+                                  air_date=air_date, job_name=f'transcript/{number}.json')
+
+
+def make_transcript(*results: list) -> dict:
+    """文字起こし結果の単語と開始時間（秒）のタプルのリストから、resultごとの文字起こしファイルを作る
+
+    本文は単語の表記をつなげたものにする。
+
+    Args:
+        results (list): resultごとの単語（例: '内山|ウチヤマ'）と開始時間のタプルのリスト
+
+    Returns:
+        dict: 文字起こしファイルの内容
+    """
+    return {'results': [{'alternatives': [{
+        'transcript': ''.join(word.split('|')[0] for word, _ in words),
+        'words': [{'word': word, 'startTime': f'{start:.3f}s', 'endTime': f'{start + 0.4:.3f}s'}
+                  for word, start in words],
+    }]} for words in results]}
+
+
+class StorageTestCase(TestCase):
+    """一時ディレクトリをオブジェクトストレージとして、文字起こしファイルから単語を保存するテスト"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(
+            OBJECT_STORAGE_BACKEND='one.service.local.LocalObjectStorage',
+            LOCAL_STORAGE_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # ストレージは設定値ごとに使い回されるため、テストごとに作り直す
+        load_backend.cache_clear()
+        self.addCleanup(load_backend.cache_clear)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def write_transcript(self, episode: Episode, *results: list) -> None:
+        """回の文字起こしファイルをストレージに保存する"""
+        path = Path(self.root) / episode.job_name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(make_transcript(*results), ensure_ascii=False))
+
+    def ingest(self, number: int, *results: list, **kwargs) -> Episode:
+        """回を作成し、文字起こしファイルから単語を保存する"""
+        episode = create_episode(number, **kwargs)
+        self.write_transcript(episode, *results)
+        # コミット後の検索結果キャッシュの無効化も行う
+        with self.captureOnCommitCallbacks(execute=True):
+            transcribe(episode)
+        episode.refresh_from_db()
+        return episode
+
+
+class CacheTests(TestCase):
+    def setUp(self):
+        # 世代番号はテストごとにロールバックされるため、キャッシュも空にしておく
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_generation_is_stored_in_db(self):
+        """世代番号はキャッシュのバックエンドが空になっても変わらず、無効化で増える"""
+        self.assertEqual(get_generation(), 0)
+        invalidate_search_cache()
+        invalidate_search_cache()
+        cache.clear()
+        self.assertEqual(get_generation(), 2)
+
+    def test_key_changes_with_generation(self):
+        """キーは世代番号ごとに変わり、ページ番号の表記の違いでは変わらない"""
+        key = make_search_key('内山', '01', 'new')
+        self.assertEqual(make_search_key('内山', 1, 'new'), key)
+        self.assertEqual(make_search_key('内山', None, 'new'), key)
+        self.assertNotEqual(make_search_key('内山', 2, 'new'), key)
+        invalidate_search_cache()
+        self.assertNotEqual(make_search_key('内山', 1, 'new'), key)
+
+    def test_cached_search_is_invalidated(self):
+        """同じ世代では検索結果を再利用し、無効化した後は検索し直す"""
+        create_episode(1)
+        reset_stats()
+        with mock.patch.object(search, 'search_episodes', wraps=search.search_episodes) as search_episodes:
+            search.search_episodes_cached('内山', 1)
+            search.search_episodes_cached('内山', '1')
+            self.assertEqual(search_episodes.call_count, 1)
+            invalidate_search_cache()
+            search.search_episodes_cached('内山', 1)
+            self.assertEqual(search_episodes.call_count, 2)
+        self.assertEqual(get_stats(), {'hits': 1, 'misses': 2, 'generation': 1})
+
+
+def make_words(terms: list) -> list:
+    """原形と読みのタプルのリストから未保存の単語を作る"""
+    return [Word(term_id=Term(original_form=original_form, pronunciation=pronunciation), position=position)
+            for position, (original_form, pronunciation) in enumerate(terms)]
+
+
+def make_records(words: list) -> list:
+    """文字起こし結果の単語と開始時間（秒）のタプルのリストからレコードを作る"""
+    text = ''.join(word.split('|')[0] for word, _ in words)
+    return [TranscriptRecord(0, text, word, f'{start:.3f}s', f'{start + 0.4:.3f}s')
+            for word, start in words]
+
+
+class AlignmentTests(SimpleTestCase):
+    def test_aligns_in_order(self):
+        """発話順に一致した単語へ開始・終了時間を設定し、一致しない結果は読み飛ばす"""
+        words = make_words([('内山', 'ウチヤマ'), ('昂輝', 'コウキ'), ('の', 'ノ'), ('ラジオ', 'ラジオ')])
+        records = make_records([('内山|ウチヤマ', 0), ('えー', 0.4), ('昂輝|コウキ', 0.8),
+                                ('の', 1.2), ('ラジオ', 1.6)])
+        aligned = align(words, records, SubstringMatchStrategy(), window=10)
+        self.assertEqual([word.term_id.original_form for word in aligned], ['内山', '昂輝', 'ラジオ'])
+        self.assertEqual([(word.start_ms, word.end_ms) for word in words],
+                         [(0, 400), (800, 1200), (None, None), (1600, 2000)])
+
+    def test_skips_short_hiragana(self):
+        """2文字以下のひらがなは照合しない"""
+        words = make_words([('ので', 'ノデ'), ('のでした', 'ノデシタ')])
+        aligned = align(words, make_records([('ので', 0), ('のでした', 0.4)]),
+                        SubstringMatchStrategy(), window=10)
+        self.assertEqual(aligned, [words[1]])
+        self.assertEqual(words[1].start_ms, 400)
+
+    def test_window_limits_search(self):
+        """前回一致した単語からwindow件より先の単語には対応付けない"""
+        words = make_words([('内山', 'ウチヤマ'), ('昂輝', 'コウキ'), ('ラジオ', 'ラジオ')])
+        records = make_records([('ラジオ', 0), ('内山|ウチヤマ', 0.4)])
+        aligned = align(words, records, SubstringMatchStrategy(), window=2)
+        self.assertEqual(aligned, [words[0]])
+
+    def test_version_changes_with_window(self):
+        """探索する単語数を変えると対応付けのバージョンが変わる"""
+        with override_settings(WORD_ALIGNMENT_WINDOW=50):
+            version = alignment_version(SubstringMatchStrategy())
+        with override_settings(WORD_ALIGNMENT_WINDOW=10):
+            self.assertNotEqual(alignment_version(SubstringMatchStrategy()), version)
+
+
+# 文字起こし結果の例（「内山昂輝の1クール！文化放送でお送りしているラジオ番組です」）
+OPENING = [('内山|ウチヤマ', 0), ('昂輝|コウキ', 0.4), ('の', 0.8), ('1', 1.2), ('クール|クール', 1.6),
+           ('文化|ブンカ', 2.0), ('放送|ホウソウ', 2.4), ('で', 2.8), ('お', 3.2), ('送り|オクリ', 3.6),
+           ('し', 4.0), ('て', 4.4), ('いる', 4.8), ('ラジオ|ラジオ', 5.2), ('番組|バングミ', 5.6),
+           ('です|デス', 6.0)]
+
+
+class TranscribeStoreTests(StorageTestCase):
+    def word_ids(self, episode: Episode) -> list:
+        return list(active_words().filter(episode_id=episode).values_list('id', flat=True))
+
+    def test_changed_transcript_replaces_stored_words(self):
+        """単語保存済みの回は、再保存を指定しなくても新しい世代に置き換え、単語を重複させない"""
+        episode = self.ingest(1, OPENING)
+        old_ids = self.word_ids(episode)
+        self.write_transcript(episode, OPENING[:5])
+
+        transcribe(episode)
+        episode.refresh_from_db()
+        new_ids = self.word_ids(episode)
+        self.assertEqual(episode.active_generation, 1)
+        self.assertFalse(set(new_ids) & set(old_ids))
+        self.assertEqual(episode.word_count, len(new_ids))
+        self.assertFalse(Word.objects.filter(episode_id=episode, generation=0).exists())
+
+    def test_unchanged_episode_is_skipped(self):
+        """文字起こしファイルとバージョンが前回から変わっていなければ、読み込みも解析もしない"""
+        episode = self.ingest(1, OPENING)
+        with mock.patch.object(ingestion, 'parse_records') as parse_records, \
+                mock.patch.object(ingestion, 'store_aligned_times') as store_aligned_times:
+            transcribe(episode)
+        parse_records.assert_not_called()
+        store_aligned_times.assert_not_called()
+
+    def test_alignment_only_change_keeps_stored_words(self):
+        """対応付けのみ変わった場合は形態素解析せず、保存済みの単語の開始時間をresultごとに対応付け直す"""
+        episode = self.ingest(1, OPENING[:8], OPENING[8:])
+        self.assertEqual(len(episode.block_offsets), 2)
+        times = dict(active_words().filter(episode_id=episode).values_list('id', 'start_ms'))
+        Word.objects.filter(episode_id=episode).update(start_ms=None, end_ms=None)
+
+        with override_settings(WORD_ALIGNMENT_WINDOW=10), \
+                mock.patch.object(ingestion, 'parse_records') as parse_records, \
+                self.captureOnCommitCallbacks(execute=True):
+            transcribe(episode)
+            version = alignment_version()
+        parse_records.assert_not_called()
+        self.assertEqual(dict(active_words().filter(episode_id=episode).values_list('id', 'start_ms')), times)
+        updated = Episode.objects.get(id=episode.id)
+        self.assertEqual(updated.alignment_version, version)
+        self.assertEqual(updated.active_generation, episode.active_generation)
+        # 解析し直した場合と同じ単語と開始時間になる
+        self.assertEqual(updated.word_hash, episode.word_hash)
+
+    def test_stale_episode_is_not_appended(self):
+        """読み込んだ後に他の処理で保存済みになった回には、単語を追加しない"""
+        episode = self.ingest(1, OPENING)
+        count = Word.objects.filter(episode_id=episode).count()
+        self.assertFalse(append_words(episode.id, [Word(episode_id=episode, term_id=Term(
+            original_form='内山', pronunciation='ウチヤマ'), position=0)]))
+        self.assertEqual(Word.objects.filter(episode_id=episode).count(), count)
+
+    def test_stale_flag_uses_new_generation(self):
+        """呼び出し元の回が保存前の状態でも、DBの保存状態で新しい世代に保存する"""
+        episode = self.ingest(1, OPENING)
+        stale = Episode.objects.get(id=episode.id)
+        stale.word_stored = False
+        self.write_transcript(episode, OPENING[:5])
+
+        transcribe(stale)
+        episode.refresh_from_db()
+        self.assertEqual(episode.active_generation, 1)
+        self.assertEqual(Word.objects.filter(episode_id=episode).count(), episode.word_count)
+
+
+class GenerationTests(StorageTestCase):
+    def store_generation(self, episode: Episode) -> list:
+        """回の新しい世代に単語を保存する（有効にはしない）"""
+        return store_words([Word(episode_id=episode, term_id=Term(original_form=original_form,
+                                                                   pronunciation=pronunciation), position=position)
+                            for position, (original_form, pronunciation) in enumerate(
+                                [('内山', 'ウチヤマ'), ('番組', 'バングミ')])],
+                           next_generation(episode.id))
+
+    def test_collect_garbage_deletes_inactive_generations(self):
+        """有効な世代より古い世代も、途中で失敗して残った新しい世代も削除する"""
+        episode = self.ingest(1, OPENING)
+        words = self.store_generation(episode)
+        activate_generation(episode.id, words[0].generation, words)
+        # 有効な世代より新しい世代を、失敗した再保存の残りとして残す
+        self.store_generation(episode)
+        self.assertEqual(collect_garbage(episode.id, chunk_size=1), episode.word_count + 2)
+        self.assertEqual(set(Word.objects.filter(episode_id=episode).values_list('id', flat=True)),
+                         {word.id for word in words})
+
+    def test_older_generation_is_not_activated(self):
+        """後から始めた再保存が先に有効になっていた場合は、古い再保存の世代に切り替えない"""
+        episode = self.ingest(1, OPENING)
+        older = self.store_generation(episode)
+        newer = self.store_generation(episode)
+        self.assertTrue(activate_generation(episode.id, newer[0].generation, newer))
+        self.assertFalse(activate_generation(episode.id, older[0].generation, older))
+        episode.refresh_from_db()
+        self.assertEqual(episode.active_generation, newer[0].generation)
+        self.assertEqual(episode.word_count, 2)
+
+    def test_collect_command(self):
+        """有効でない世代の単語が残っている回だけを後片付けする"""
+        episode = self.ingest(1, OPENING)
+        self.ingest(2, OPENING)
+        self.store_generation(episode)
+        out = io.StringIO()
+        call_command('collect_word_generations', stdout=out)
+        self.assertIn(f'#{episode.id}: deleted=2', out.getvalue())
+        self.assertNotIn('deleted=0', out.getvalue())
+        self.assertEqual(Word.objects.filter(episode_id=episode).count(), episode.word_count)
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        self.episode = create_episode(1)
+
+    def test_enqueue_upgrades_pending_job(self):
+        """未完了のジョブがあれば新たに登録せず、待機中のジョブに指定を追加する"""
+        job = enqueue_ingestion(self.episode)
+        self.assertEqual(enqueue_ingestion(self.episode, reset_words=True).id, job.id)
+        job.refresh_from_db()
+        self.assertTrue(job.reset_words)
+        self.assertEqual(IngestionJob.objects.count(), 1)
+
+    def test_claim_once(self):
+        """待機中のジョブは1度だけ取得される"""
+        job = enqueue_ingestion(self.episode)
+        claimed = claim_job()
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.status, IngestionJob.Status.RUNNING)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNone(claim_job())
+
+    @override_settings(INGESTION_JOB_TIMEOUT=60, INGESTION_JOB_MAX_ATTEMPTS=2)
+    def test_reclaim_stale_job(self):
+        """進捗が更新されない実行中のジョブは再取得し、上限に達したら失敗にする"""
+        job = enqueue_ingestion(self.episode)
+        claim_job()
+        stale = timezone.now() - datetime.timedelta(seconds=120)
+        IngestionJob.objects.filter(id=job.id).update(updated_at=stale)
+        reclaimed = claim_job()
+        self.assertEqual((reclaimed.id, reclaimed.attempts), (job.id, 2))
+
+        IngestionJob.objects.filter(id=job.id).update(updated_at=stale)
+        self.assertIsNone(claim_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestionJob.Status.FAILED)
+
+
+@override_settings(OPERATION_POLL_INTERVAL=60, OPERATION_POLL_MAX_INTERVAL=600, OPERATION_POLL_MAX_COUNT=3)
+class PollOperationsTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.episodes = []
+        for number in (1, 2):
+            episode = create_episode(number)
+            episode.operation_name = f'operation/{number}'
+            episode.operation_next_poll_at = self.now
+            episode.save()
+            self.episodes.append(episode)
+        patcher = mock.patch('one.service.operations.get_recognizer')
+        self.recognizer = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_backoff(self):
+        """確認の間隔は回数ごとに倍になり、上限を超えない"""
+        self.assertEqual(next_poll_at(0, self.now) - self.now, datetime.timedelta(seconds=60))
+        self.assertEqual(next_poll_at(2, self.now) - self.now, datetime.timedelta(seconds=240))
+        self.assertEqual(next_poll_at(10, self.now) - self.now, datetime.timedelta(seconds=600))
+
+    def test_done_and_pending(self):
+        """完了したオペレーションはジョブを登録し、未完了のものは次回確認日時を延ばす"""
+        self.recognizer.get_operations.return_value = {
+            'operation/1': OperationState(done=True), 'operation/2': OperationState(done=False)}
+        self.assertEqual(poll_operations(), {'done': 1, 'failed': 0, 'pending': 1})
+        self.recognizer.get_operations.assert_called_once_with(['operation/1', 'operation/2'])
+
+        done, pending = [Episode.objects.get(id=episode.id) for episode in self.episodes]
+        self.assertIsNone(done.operation_name)
+        self.assertTrue(IngestionJob.objects.filter(
+            episode_id=done, status=IngestionJob.Status.PENDING).exists())
+        self.assertEqual(pending.operation_poll_count, 1)
+        self.assertGreater(pending.operation_next_poll_at, self.now)
+        self.assertFalse(IngestionJob.objects.filter(episode_id=pending).exists())
+
+    def test_error_is_isolated(self):
+        """確認できないオペレーションは延期し、上限に達したら失敗として確認をやめる"""
+        def get_operations(names):
+            if len(names) > 1 or names == ['operation/1']:
+                raise RuntimeError('unavailable')
+            return {name: OperationState(done=True) for name in names}
+        self.recognizer.get_operations.side_effect = get_operations
+
+        with self.assertLogs('one.service.operations', 'ERROR'):
+            self.assertEqual(poll_operations(), {'done': 1, 'failed': 0, 'pending': 1})
+        failing = Episode.objects.get(id=self.episodes[0].id)
+        self.assertEqual(failing.operation_poll_count, 1)
+
+        for _ in range(2):
+            Episode.objects.filter(id=failing.id).update(operation_next_poll_at=self.now)
+            with self.assertLogs('one.service.operations', 'ERROR'):
+                summary = poll_operations()
+        self.assertEqual(summary, {'done': 0, 'failed': 1, 'pending': 0})
+        failing.refresh_from_db()
+        self.assertIsNone(failing.operation_name)
+        self.assertIn('unavailable', IngestionJob.objects.get(
+            episode_id=failing, status=IngestionJob.Status.FAILED).error)
+
+
+class TranscriptTests(SimpleTestCase):
+    def read(self, data: dict) -> list:
+        file = io.BytesIO(json.dumps(data, ensure_ascii=False).encode())
+        return [(block, text, list(words)) for block, text, words in iter_alternatives(file)]
+
+    def test_words_before_transcript(self):
+        """本文より先に単語がある候補も本文と組み合わせて返し、2番目以降の候補は使わない"""
+        self.assertEqual(self.read({'results': [
+            {'alternatives': [
+                {'words': [{'word': '内山|ウチヤマ', 'startTime': '0s'}], 'transcript': '内山'},
+                {'transcript': '打ち山', 'words': [{'word': '打ち山'}]},
+            ]},
+            {'alternatives': [{'transcript': '本文のみ'}]},
+            {'alternatives': [
+                {'transcript': 'ラジオ', 'words': [{'word': 'ラジオ|ラジオ', 'startTime': '1.5s'}]},
+            ]},
+        ]}), [
+            (0, '内山', [{'word': '内山|ウチヤマ', 'startTime': '0s'}]),
+            (1, '本文のみ', []),
+            (2, 'ラジオ', [{'word': 'ラジオ|ラジオ', 'startTime': '1.5s'}]),
+        ])
+
+    def test_nested_word_values(self):
+        """単語の値が入れ子の場合も組み立てて返す"""
+        word = {'word': 'a', 'speaker': {'tag': 1, 'labels': ['x', 'y']}, 'startTime': '0s'}
+        self.assertEqual(self.read({'results': [{'alternatives': [{'transcript': 'a', 'words': [word]}]}]}),
+                         [(0, 'a', [word])])
+
+    def test_skip_unread_words(self):
+        """単語を読み残しても次のresultを正しく返す"""
+        file = io.BytesIO(json.dumps({'results': [
+            {'alternatives': [{'transcript': 'a', 'words': [{'word': 'a'}, {'word': 'b'}]}]},
+            {'alternatives': [{'transcript': 'c', 'words': [{'word': 'c'}]}]},
+        ]}).encode())
+        self.assertEqual([text for _, text, _ in iter_alternatives(file)], ['a', 'c'])
+
+
+class RecordTests(SimpleTestCase):
+    def test_records_span_results(self):
+        """全resultの単語を発話順に1つの並びにまとめ、単語のないresultは本文のみのレコードにする"""
+        file = io.BytesIO(json.dumps({'results': [
+            {'alternatives': [{'transcript': 'ab', 'words': [
+                {'word': 'a', 'startTime': '0s', 'endTime': '1s'}, {'word': 'b', 'startTime': '1s'}]}]},
+            {'alternatives': [{'transcript': '本文のみ'}]},
+            {'alternatives': [{'transcript': 'c', 'words': [{'word': 'c'}]}]},
+        ]}, ensure_ascii=False).encode())
+        self.assertEqual(list(iter_records(file)), [
+            TranscriptRecord(0, 'ab', 'a', '0s', '1s'),
+            TranscriptRecord(0, 'ab', 'b', '1s', None),
+            TranscriptRecord(1, '本文のみ', None, None, None),
+            TranscriptRecord(2, 'c', 'c', None, None),
+        ])
+
+
+class ChunkingTests(SimpleTestCase):
+    def test_split_overlapping_chunks(self):
+        """区間は重なる長さだけ戻りながら、音声ファイルの終わりまで分割する"""
+        with tempfile.NamedTemporaryFile(suffix='.flac') as file:
+            soundfile.write(file.name, [0.0] * 25 * 100, 100, format='FLAC', subtype='PCM_16')
+            chunks = list(split_audio(file.name, 10, 2))
+        self.assertEqual([(chunk.start, chunk.end) for chunk in chunks],
+                         [(0.0, 10.0), (8.0, 18.0), (16.0, 25.0)])
+
+    def test_overlap_must_be_shorter_than_chunk(self):
+        """重なる長さが区間の長さ以上の場合は分割しない"""
+        for overlap in (10, 12):
+            with self.assertRaises(ValueError):
+                next(split_audio('unused.flac', 10, overlap))
+
+    def test_switches_chunks_at_middle_of_overlap(self):
+        """区間の時間を元の音声の時間に変換し、重なりの中間で次の区間の単語に切り替える"""
+        first = AudioChunk(0, 0.0, 12.0)
+        second = AudioChunk(1, 10.0, 20.0)
+        result = stitch([
+            (first, [
+                {'word': 'a', 'startTime': '1s', 'endTime': '2s'},
+                {'word': 'b', 'startTime': '10.5s', 'endTime': '11s'},
+                {'word': 'c', 'startTime': '11.5s', 'endTime': '12s'},
+            ]),
+            (second, [
+                {'word': 'b', 'startTime': '0.5s', 'endTime': '1s'},
+                {'word': 'c', 'startTime': '1.5s', 'endTime': '2s'},
+                {'word': 'd'},
+                {'word': 'e', 'startTime': '3s', 'endTime': '4s'},
+            ]),
+        ], overlap_seconds=2.0)
+        alternative = result['results'][0]['alternatives'][0]
+        self.assertEqual(alternative['transcript'], 'abcde')
+        self.assertEqual([(word['word'], word.get('startTime')) for word in alternative['words']], [
+            ('a', '1.000s'), ('b', '10.500s'), ('c', '11.500s'), ('d', None), ('e', '13.000s')])
+
+    @override_settings(TRANSCRIBE_CHUNK_POLL_INTERVAL=5, TRANSCRIBE_CHUNK_POLL_MAX_INTERVAL=12)
+    def test_wait_operation_heartbeat(self):
+        """完了を確認するたびにon_pollを呼び出し、確認間隔は上限を超えない"""
+        states = [OperationState(done=False)] * 3 + [OperationState(done=True)]
+        on_poll = mock.Mock()
+        with mock.patch('one.service.chunking.get_recognizer') as get_recognizer, \
+                mock.patch('one.service.chunking.time.sleep') as sleep:
+            get_recognizer.return_value.get_operations.side_effect = [
+                {'operation': state} for state in states]
+            wait_operation('operation', on_poll)
+        self.assertEqual(on_poll.call_count, 4)
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [5, 10, 12])
+
+
+# テストクライアントからのリクエストを受け付け、デバッグツールバーは表示しない
+client_settings = override_settings(
+    ALLOWED_HOSTS=['*'], DEBUG_TOOLBAR_CONFIG={'SHOW_TOOLBAR_CALLBACK': lambda request: False})
+
+
+@client_settings
+class ContextTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.episode = self.ingest(1, OPENING)
+
+    def test_format_start_time(self):
+        """開始時間は分・秒の00:00形式にする"""
+        self.assertEqual(format_start_time(754321), '12:34')
+        self.assertIsNone(format_start_time(None))
+        word = Word(start_ms=61000)
+        self.assertEqual(word.start_time_minutes, '01:01')
+
+    def test_words_around_hit(self):
+        """一致箇所の前後の指定した時間に話された単語を開始時間順に返す"""
+        words = word_context(self.episode.id, 5200, before_ms=3200, after_ms=400)
+        self.assertEqual([(word.original_form, word.start_ms) for word in words],
+                         [('文化', 2000), ('ラジオ', 5200), ('番組', 5600)])
+
+    def test_context_api(self):
+        """文脈APIは前後の単語を返し、不正なパラメーターは400にする"""
+        response = self.client.get('/api/context', {'episode': self.episode.id, 'start_ms': 0})
+        self.assertEqual(response.status_code, 200)
+        words = response.json()['words']
+        self.assertEqual(words[0], {'original_form': '内山', 'start_ms': 0, 'start_seconds': 0.0,
+                                    'start_time_minutes': '00:00'})
+        self.assertTrue(all(word['start_ms'] <= 5000 for word in words))
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.client.get('/api/context', {'episode': 'x'}).status_code, 400)
+
+
+class IntersectTests(SimpleTestCase):
+    def test_yields_values_of_common_keys(self):
+        """全てのリストにあるキーの値だけを、キーの順に返す"""
+        lists = [
+            [(1, 'a1'), (3, 'a3'), (5, 'a5'), (7, 'a7')],
+            [(3, 'b3'), (4, 'b4'), (5, 'b5')],
+            [(0, 'c0'), (3, 'c3'), (5, 'c5'), (9, 'c9')],
+        ]
+        self.assertEqual(list(intersect(lists)), [('a3', 'b3', 'c3'), ('a5', 'b5', 'c5')])
+
+    def test_empty(self):
+        """リストがない場合・空のリストがある場合は何も返さない"""
+        self.assertEqual(list(intersect([])), [])
+        self.assertEqual(list(intersect([[(1, 'a')], []])), [])
+
+
+class PhrasePositionTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        # 「文化」と「ラジオ」の間には保存しない語（でお送りしている）がある
+        self.episode = self.ingest(1, OPENING)
+
+    def test_positions_count_all_tokens(self):
+        """単語の位置は保存しない形態素も数える"""
+        positions = dict(active_words().filter(episode_id=self.episode).values_list(
+            'term_id__original_form', 'position'))
+        self.assertEqual(positions['番組'] - positions['ラジオ'], 1)
+        self.assertGreater(positions['ラジオ'] - positions['文化'], 1)
+
+    def test_phrase_does_not_skip_particles(self):
+        """間に他の語を挟む単語はフレーズに一致せず、連続する単語のみ一致する"""
+        self.assertEqual(parse_query('"文化 ラジオ"').evaluate(), [])
+        self.assertEqual(len(parse_query('"ラジオ 番組"').evaluate()), 2)
+
+    def test_positions_continue_across_results(self):
+        """resultをまたいでも位置は続き、前のresultの最後の単語とは連続しない語を数える"""
+        episode = self.ingest(2, OPENING[:5], OPENING[13:])
+        positions = list(active_words().filter(episode_id=episode).order_by('position').values_list(
+            'term_id__original_form', 'position'))
+        self.assertEqual([form for form, _ in positions], ['内山', 'ラジオ', '番組'])
+        self.assertEqual(len(parse_query('"内山 ラジオ"').evaluate()), 0)
+        self.assertEqual(len(parse_query('"ラジオ 番組"').evaluate(
+            Episode.objects.filter(id=episode.id).values('id'))), 2)
+
+    def test_evaluate_within_episodes(self):
+        """回を指定した場合はその回の単語だけで評価する"""
+        other = self.ingest(2, repeat('ラジオ|ラジオ', 2))
+        query = parse_query('内山 OR ラジオ')
+        self.assertEqual(query.evaluate([other.id]),
+                         [posting for posting in query.evaluate() if posting.episode_id == other.id])
+        self.assertEqual({posting.episode_id for posting in query.evaluate()}, {self.episode.id, other.id})
+
+
+def repeat(word: str, count: int, start: float = 0) -> list:
+    """同じ単語を読点で区切って0.4秒ごとに繰り返した文字起こし結果の単語を作る"""
+    return [item for i in range(count) for item in ((word, start + i * 0.4), ('、', start + i * 0.4 + 0.2))]
+
+
+class RankingTests(StorageTestCase):
+    def test_bm25_ordering(self):
+        """出現回数が多い回、同じ出現回数なら単語数が少ない回を上位にする"""
+        short = self.ingest(1, repeat('内山|ウチヤマ', 1), repeat('ラジオ|ラジオ', 9, 1))
+        long = self.ingest(2, repeat('内山|ウチヤマ', 1), repeat('ラジオ|ラジオ', 99, 1))
+        frequent = self.ingest(3, repeat('内山|ウチヤマ', 5), repeat('ラジオ|ラジオ', 95, 3))
+        self.assertEqual((short.word_count, long.word_count, frequent.word_count), (10, 100, 100))
+
+        frequencies = {short.id: 1, long.id: 1, frequent.id: 5}
+        scores = score_episodes(frequencies)
+        self.assertGreater(scores[short.id], scores[long.id])
+        self.assertEqual(rank_episodes(frequencies), [frequent.id, short.id, long.id])
+        page = search.search_episodes('内山', 1, search.SORT_RELEVANCE)
+        self.assertEqual([episode.id for episode in page.object_list], [frequent.id, short.id, long.id])
+
+    @override_settings(SEARCH_RECENCY_WEIGHT=1, SEARCH_RECENCY_HALF_LIFE_DAYS=30)
+    def test_recent_episode_ranks_higher(self):
+        """関連度が同じ場合は、放送日が新しい回を上位にする"""
+        today = timezone.localdate()
+        old = self.ingest(1, OPENING, air_date=today - datetime.timedelta(days=365))
+        new = self.ingest(2, OPENING, air_date=today)
+        self.assertEqual(rank_episodes({old.id: 1, new.id: 1}), [new.id, old.id])
+
+    @override_settings(SEARCH_RECENCY_WEIGHT=0)
+    def test_ties_are_ordered_by_id(self):
+        """関連度が同じ回はID順に並べる"""
+        first = self.ingest(1, OPENING)
+        second = self.ingest(2, OPENING)
+        self.assertEqual(rank_episodes({second.id: 1, first.id: 1}), [first.id, second.id])
+
+
+class SearchQueryTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        # 1: 内山…ラジオ番組（冒頭のみ）、2: 内山…テレビ（ラジオなし）、3: ラジオのみ
+        self.opening = self.ingest(1, OPENING)
+        self.tv = self.ingest(2, repeat('内山|ウチヤマ', 1), repeat('テレビ|テレビ', 1, 70))
+        self.radio = self.ingest(3, repeat('ラジオ|ラジオ', 2))
+
+    def ids(self, search_word: str, sort: str = search.SORT_NEW) -> list:
+        return [episode.id for episode in search.search_episodes(search_word, 1, sort).object_list]
+
+    def test_boolean_queries_use_term_stats(self):
+        """AND・ORの検索式は単語統計で一致する回を求め、一致した単語だけを要約する"""
+        self.assertEqual(self.ids('内山 ラジオ'), [self.opening.id])
+        self.assertEqual(self.ids('内山 OR ラジオ'), [self.radio.id, self.tv.id, self.opening.id])
+        self.assertEqual(set(self.ids('テレビ OR ラジオ', search.SORT_RELEVANCE)),
+                         {self.tv.id, self.radio.id, self.opening.id})
+        summary = search.search_episodes('内山 ラジオ', 1).object_list[0].hit_summary
+        self.assertEqual({term.original_form for term in summary.terms}, {'内山', 'ラジオ'})
+        self.assertEqual(self.ids('内山 存在しない語'), [])
+
+    def test_positional_queries_evaluate_candidates(self):
+        """フレーズ・近接検索は候補の回の単語の位置・開始時間で絞り込む"""
+        self.assertEqual(self.ids('"ラジオ 番組"'), [self.opening.id])
+        self.assertEqual(self.ids('内山 NEAR/10 ラジオ'), [self.opening.id])
+        self.assertEqual(self.ids('内山 NEAR/10 テレビ'), [])
+        self.assertEqual(self.ids('内山 NEAR/100 テレビ'), [self.tv.id])
+
+    def test_cursor_pages_positional_query(self):
+        """カーソルで取得する場合も、候補の回を順に評価してページの件数だけ返す"""
+        radio_again = self.ingest(4, OPENING)
+        page, cursor = search.search_episodes_after('"ラジオ 番組"', None, 1)
+        self.assertEqual([episode.id for episode in page], [radio_again.id])
+        page, cursor = search.search_episodes_after('"ラジオ 番組"', cursor, 1)
+        self.assertEqual([episode.id for episode in page], [self.opening.id])
+        self.assertIsNone(cursor)
+        self.assertEqual({word.original_form for word in page[0].word_set.all()}, {'ラジオ', '番組'})
+
+    def test_episode_hits(self):
+        """回の一致箇所は検索式をその回だけで評価して返す"""
+        hits = search.episode_hits('"ラジオ 番組"', self.opening.id, 0)
+        self.assertEqual([(hit.original_form, hit.start_ms) for hit in hits],
+                         [('ラジオ', 5200), ('番組', 5600)])
+        self.assertEqual(search.episode_hits('"ラジオ 番組"', self.radio.id, 0), [])
+
+
+class HitsTests(StorageTestCase):
+    def test_summarize_hits_in_one_query(self):
+        """ページの全ての回の一致箇所を、回ごとに開始時間順の最初のlimit件だけまとめて取得する"""
+        radio = self.ingest(1, repeat('ラジオ|ラジオ', 5))
+        opening = self.ingest(2, OPENING)
+        tv = self.ingest(3, repeat('テレビ|テレビ', 1))
+        # 開始時間のない単語は最後に並べる
+        first = active_words().filter(episode_id=radio).order_by('position').first()
+        Word.objects.filter(id=first.id).update(start_ms=None)
+        episodes = [radio, opening, tv]
+        term_ids = Term.objects.filter(original_form__in=['ラジオ', '番組']).values('id')
+
+        with self.assertNumQueries(2):
+            summarize_hits(episodes, Q(term_id__in=term_ids), limit=3)
+        self.assertEqual([hit.start_ms for hit in radio.hit_summary.hits], [400, 800, 1200])
+        self.assertEqual((radio.hit_summary.total, radio.hit_summary.rest), (5, 2))
+        self.assertEqual([(hit.original_form, hit.start_ms) for hit in opening.hit_summary.hits],
+                         [('ラジオ', 5200), ('番組', 5600)])
+        self.assertEqual(opening.hit_summary.rest, 0)
+        self.assertEqual((tv.hit_summary.total, tv.hit_summary.hits), (0, []))
+        # 一致する語彙がない条件でも失敗しない
+        summarize_hits([tv], Q(term_id__in=[]))
+        self.assertEqual(tv.hit_summary.hits, [])
+
+
+@client_settings
+@override_settings(SUGGEST_LIMIT=2, SUGGEST_PRECOMPUTE_THRESHOLD=1)
+class SuggestTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        for name, value in (('_index', None), ('_index_generation', None), ('_refreshing', False)):
+            patcher = mock.patch.object(suggest, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # 構築し直す処理は同じスレッド・DB接続で行う
+        patcher = mock.patch.object(suggest, 'refresh_in_background', suggest.refresh)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        thread = mock.patch.object(suggest.threading, 'Thread')
+        thread.start().side_effect = lambda target, args, daemon: mock.Mock(start=lambda: target(*args))
+        self.addCleanup(thread.stop)
+
+    def test_prefix_ranked_by_count(self):
+        """原形・読みの前方一致で、出現回数の多い順に返す"""
+        self.ingest(1, repeat('ラジオ|ラジオ', 3), repeat('ラジカセ|ラジカセ', 1, 10), repeat('内山|ウチヤマ', 2, 20))
+        self.assertEqual([(term.original_form, term.count) for term in suggest.suggest('ラジ')],
+                         [('ラジオ', 3), ('ラジカセ', 1)])
+        self.assertEqual([term.original_form for term in suggest.suggest('ウチ')], ['内山'])
+        self.assertEqual(suggest.suggest(''), [])
+
+    def test_index_is_rebuilt_after_ingestion(self):
+        """単語の保存で世代番号が変わると、次の取得で索引を構築し直す"""
+        self.ingest(1, repeat('ラジオ|ラジオ', 1))
+        self.assertEqual([term.original_form for term in suggest.suggest('ラジ')], ['ラジオ'])
+        self.ingest(2, repeat('ラジカセ|ラジカセ', 2))
+        # 構築中は古い索引を返し、構築後は新しい単語を返す
+        suggest.suggest('ラジ')
+        self.assertEqual([term.original_form for term in suggest.suggest('ラジ')], ['ラジカセ', 'ラジオ'])
+
+    def test_suggest_api(self):
+        """入力候補APIは正規化した接頭辞と候補を返す"""
+        self.ingest(1, repeat('ラジオ|ラジオ', 1))
+        response = self.client.get('/suggest', {'q': 'ラジ'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['suggestions'][0]['original_form'], 'ラジオ')
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_normalize(self):
+        """全角・半角、大文字・小文字、ひらがな・カタカナ、長音の表記ゆれと空白を揃える"""
+        self.assertEqual(normalize('ｳﾁﾔﾏ'), 'ウチヤマ')
+        self.assertEqual(normalize('うちやま'), 'ウチヤマ')
+        self.assertEqual(normalize('ＯＮＥ ｃｏｏｌ'), 'onecool')
+        self.assertEqual(normalize('クール'), normalize('ク〜ル'))
+        self.assertEqual(normalize('クーール'), 'クール')
+        # カナ以外の後ろのハイフンは長音にしない
+        self.assertEqual(normalize('1-2'), '1-2')
+
+    def test_normalize_query(self):
+        """検索式は演算子を残し、空白だけを整理する"""
+        self.assertEqual(normalize_query('　内山  OR\tＲａｄｉｏ '), '内山 OR Radio')
+
+    def test_search_key(self):
+        """検索キーは正規化した原形と読みを区切り文字でつなげる"""
+        self.assertEqual(build_search_key('内山', 'うちやま'), '内山\tウチヤマ')
+
+    def test_is_hiragana(self):
+        self.assertTrue(is_hiragana('ので'))
+        self.assertFalse(is_hiragana('ノで'))
+        self.assertFalse(is_hiragana(''))
+
+
+class VocabularyTests(TestCase):
+    def test_resolve_new_terms(self):
+        """未登録の語彙は検索キーと転置インデックスを付けて登録し、同じ語彙は1件にまとめる"""
+        words = make_words([('内山', 'ウチヤマ'), ('番組', 'バングミ'), ('内山', 'ウチヤマ')])
+        resolve_terms(words, batch_size=1)
+        self.assertEqual(Term.objects.count(), 2)
+        self.assertIsNotNone(words[0].term_id.pk)
+        self.assertEqual(words[0].term_id.pk, words[2].term_id.pk)
+        self.assertEqual(words[0].term_id.search_key, build_search_key('内山', 'ウチヤマ'))
+        self.assertEqual(set(TermNgram.objects.filter(term_id=words[1].term_id).values_list(
+            'gram', flat=True)), {'番組', 'バン', 'ング', 'グミ'})
+        self.assertEqual(search_term_ids('ウチヤ'), [words[0].term_id.pk])
+
+    def test_resolve_existing_terms(self):
+        """登録済みの語彙は再利用し、原形が同じでも読みが異なる語彙は別に登録する"""
+        existing = Term.objects.create(original_form='内山', pronunciation='ウチヤマ',
+                                       search_key=build_search_key('内山', 'ウチヤマ'))
+        words = make_words([('内山', 'ウチヤマ'), ('内山', 'ウチヤム')])
+        resolve_terms(words)
+        self.assertEqual(words[0].term_id.pk, existing.pk)
+        self.assertNotEqual(words[1].term_id.pk, existing.pk)
+        self.assertEqual(Term.objects.count(), 2)
+
+    def test_load_terms(self):
+        """キーに含まれる語彙だけを取得し、未登録のキーは含めない"""
+        for original_form, pronunciation in [('内山', 'ウチヤマ'), ('内山', 'ウチヤム'), ('番組', 'バングミ')]:
+            Term.objects.create(original_form=original_form, pronunciation=pronunciation,
+                                search_key=build_search_key(original_form, pronunciation))
+        terms = load_terms([('内山', 'ウチヤマ'), ('番組', 'バングミ'), ('文化', 'ブンカ')], batch_size=1)
+        self.assertEqual(set(terms), {('内山', 'ウチヤマ'), ('番組', 'バングミ')})
+        self.assertEqual(terms[('番組', 'バングミ')].original_form, '番組')
+
+
+@client_settings
+class SearchApiTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.episodes = [self.ingest(number, OPENING) for number in (1, 2, 3)]
+
+    def get(self, if_none_match: str = None, **params):
+        headers = {'HTTP_IF_NONE_MATCH': if_none_match} if if_none_match else {}
+        return self.client.get('/api/search', {'keyword': 'ラジオ', **params}, **headers)
+
+    def test_cursor_pagination(self):
+        """カーソルから続きを新しい回順に取得し、最後のページではカーソルを返さない"""
+        ids = []
+        cursor = None
+        for _ in range(3):
+            data = self.get(limit=2, fields='id,number,words', **({'cursor': cursor} if cursor else {})).json()
+            ids += [episode['id'] for episode in data['episodes']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(ids, [episode.id for episode in reversed(self.episodes)])
+        self.assertEqual(set(data['episodes'][0]), {'id', 'number', 'words'})
+        self.assertEqual(data['episodes'][0]['words'][0]['original_form'], 'ラジオ')
+
+    def test_etag(self):
+        """単語を保存するまで同じETagを返し、If-None-Matchが一致すれば304を返す"""
+        response = self.get()
+        etag = response['ETag']
+        self.assertEqual(self.get(if_none_match=etag).status_code, 304)
+        self.ingest(4, OPENING)
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_invalid_params(self):
+        """不正なパラメーターは固定のメッセージで400を返し、ETagを付けない"""
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.get(limit='x')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'limitは整数で指定してください'})
+        self.assertFalse(response.has_header('ETag'))
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.get(limit='x', if_none_match='*').status_code, 400)
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.get(cursor='!!').status_code, 400)
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.get(fields='id,unknown').json(), {'error': '不正なfieldsです: unknown'})
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self):
+        for number in range(1, 4):
+            create_episode(number)
+
+    def count(self, queryset) -> int:
+        # 管理画面の一覧と同じ順に並べる
+        return EstimatedCountPaginator(queryset.order_by('-number', '-id'), 100).count
+
+    def mock_postgresql(self, reltuples: float):
+        """PostgreSQLの統計情報の推定行数を返す接続に差し替える"""
+        connection = mock.MagicMock(vendor='postgresql')
+        connection.cursor.return_value.__enter__.return_value.fetchone.return_value = (reltuples,)
+        return mock.patch('one.admin.connections', {'default': connection})
+
+    def test_unfiltered_list_uses_estimate(self):
+        """絞り込みのない一覧はCOUNT(*)を実行せずに推定行数を使う"""
+        with self.mock_postgresql(12345678.0), self.assertNumQueries(0):
+            self.assertEqual(self.count(Episode.objects.all()), 12345678)
+
+    def test_filtered_list_counts_rows(self):
+        """絞り込みがある一覧と、ANALYZEされていないテーブルは正確な件数を数える"""
+        with self.mock_postgresql(12345678.0):
+            self.assertEqual(self.count(Episode.objects.filter(number__gte=2)), 2)
+        with self.mock_postgresql(-1.0):
+            self.assertEqual(self.count(Episode.objects.all()), 3)
+
+    def test_other_database_counts_rows(self):
+        """PostgreSQL以外のDBでは正確な件数を数える"""
+        with self.assertNumQueries(1):
+            self.assertEqual(self.count(Episode.objects.all()), 3)
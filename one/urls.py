@@ -1,7 +1,13 @@
 from django.urls import path
-from .views import top, search
+from .views import top, search, search_api, hits_api, context_api, stats, stats_api, suggest
 
 urlpatterns = [
     path('', top, name='top'),
     path('search', search, name='search'),
+    path('stats', stats, name='stats'),
+    path('api/search', search_api, name='search_api'),
+    path('api/hits', hits_api, name='hits_api'),
+    path('api/context', context_api, name='context_api'),
+    path('api/stats', stats_api, name='stats_api'),
+    path('suggest', suggest, name='suggest'),
 ]
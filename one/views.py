@@ -1,14 +1,25 @@
+import hashlib
+from django.conf import settings
 from django.shortcuts import render
-from django.db.models import Q, Prefetch
-from django.core.paginator import Paginator
-from .models import Episode, Word
-import math
-from .service.util import is_hiragana , hira_to_kata
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from .models import Episode
+from .service.normalize import normalize, normalize_query
+from .service.search import (PER_PAGE, SORT_NEW, SORTS, decode_cursor, encode_cursor, episode_hits,
+                             last_ingested_at, search_episodes_after, search_episodes_cached)
+from .service.stats import keyword_stats
+from .service.hits import Hit
+from .service.timeline import word_context
+from .service.suggest import suggest as suggest_terms
 
-from django.db.models.query import QuerySet
 from django.core.handlers.wsgi import WSGIRequest
-from django.http.response import HttpResponse
-from typing import Union
+from django.http.response import HttpResponse, JsonResponse
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+# 検索APIで選択できる回の項目（wordsは一致した単語）
+API_FIELDS = ('id', 'radio', 'number', 'air_date', 'spotify_id', 'words')
+# 検索APIで1回に取得できる回の最大数
+API_MAX_LIMIT = 50
 
 def top(request: WSGIRequest) -> HttpResponse:
     """トップページを表示する
@@ -33,55 +44,240 @@ def search(request: WSGIRequest) -> HttpResponse:
     Returns:
         HttpResponse: Djangoレスポンス
     """
-    keyword: Union[str, None] = request.GET.get('keyword')
-    # Noneチェック
-    if not keyword:
-        keyword = ''
+    keyword = get_keyword(request)
+    # 検索式の演算子を残すため、キーワードごとの正規化は検索式の解析時に行う
+    search_word = normalize_query(keyword)
+
+    # 並び順（不正な場合は新しい回順）
+    sort = request.GET.get('sort', SORT_NEW)
+    if sort not in SORTS:
+        sort = SORT_NEW
 
-    # ひらがなをカタカナに変換
-    search_word = keyword
-    if is_hiragana(keyword):
-        search_word = hira_to_kata(keyword)
-
-    episodes = Episode.objects.order_by('number').reverse().prefetch_related(
-        Prefetch('word_set', queryset=Word.objects.order_by('start_time').filter(
-            Q(original_form__contains=search_word) |
-            Q(pronunciation__contains=search_word)
-        ))).filter(
-            Q(word__original_form__contains=search_word) |
-            Q(word__pronunciation__contains=search_word)
-        ).distinct()
-    episodes = __add_start_time_minutes(episodes)
-
-    # ページネーション
-    per_page = 5
-    paginator = Paginator(episodes, per_page)
     page_num = request.GET.get('page', 1)
+    episodes = search_episodes_cached(search_word, page_num, sort)
+
+    return render(request, 'search.html', {'episodes': episodes, 'keyword': keyword, 'sort': sort})
+
+
+
+def stats(request: WSGIRequest) -> HttpResponse:
+    """キーワードの回ごと・年ごとの出現回数を表示する
+
+    Args:
+        request (WSGIRequest): Djangoリクエスト
+
+    Returns:
+        HttpResponse: Djangoレスポンス
+    """
+    keyword = get_keyword(request)
+    search_word = normalize(keyword)
+    result = keyword_stats(search_word) if search_word else None
+    return render(request, 'stats.html', {'stats': result, 'keyword': keyword})
+
+
+def stats_api(request: WSGIRequest) -> JsonResponse:
+    """キーワードの回ごと・年ごとの出現回数をJSONで返す
+
+    Args:
+        request (WSGIRequest): Djangoリクエスト
+
+    Returns:
+        JsonResponse: 集計結果（キーワードがない場合は400）
+    """
+    search_word = normalize(get_keyword(request))
+    if not search_word:
+        return JsonResponse({'error': 'keywordを指定してください'}, status=400)
+    return JsonResponse(keyword_stats(search_word), json_dumps_params={'ensure_ascii': False})
+
+
+class SearchApiParams(NamedTuple):
+    """検索APIのパラメーター"""
+    search_word: str
+    fields: List[str]
+    limit: int
+    cursor: Optional[Tuple[int, int]]
+
+
+def parse_search_api_params(request: WSGIRequest) -> SearchApiParams:
+    """検索APIのパラメーターを検証して取り出す
+
+    Args:
+        request (WSGIRequest): Djangoリクエスト
+
+    Raises:
+        ValueError: パラメーターが不正な場合（メッセージはそのままレスポンスに使える）
+
+    Returns:
+        SearchApiParams: 検索APIのパラメーター
+    """
+    search_word = normalize_query(get_keyword(request))
+    if not search_word:
+        raise ValueError('keywordを指定してください')
+
+    fields = request.GET.get('fields')
+    fields = fields.split(',') if fields else list(API_FIELDS)
+    unknown = [field for field in fields if field not in API_FIELDS]
+    if unknown:
+        raise ValueError(f'不正なfieldsです: {",".join(unknown)}')
+
     try:
-        episodes = paginator.page(page_num)
-    except Exception:
-        episodes = paginator.page(1)
+        limit = min(max(int(request.GET.get('limit', PER_PAGE)), 1), API_MAX_LIMIT)
+    except ValueError:
+        raise ValueError('limitは整数で指定してください')
+    cursor = request.GET.get('cursor')
+    cursor = decode_cursor(cursor) if cursor else None
+    return SearchApiParams(search_word, fields, limit, cursor)
 
-    return render(request, 'search.html', {'episodes': episodes, 'keyword': keyword})
 
+def search_api_etag(request: WSGIRequest) -> Optional[str]:
+    """検索APIのETagを作成する
 
-def __add_start_time_minutes(episodes: QuerySet) -> QuerySet:
-    """分単位の開始時間（00:00形式）を単語に追加する
+    最後に単語を保存した日時とクエリ文字列から作るため、取り込みがあるまで同じ値になる。
+    パラメーターが不正な場合は作成しない（エラーのレスポンスを304にしない）。
 
     Args:
-        episodes (QuerySet): Word情報を含んだEpisodeモデルのリスト
+        request (WSGIRequest): Djangoリクエスト
+
+    Returns:
+        Optional[str]: ETag（パラメーターが不正な場合はNone）
+    """
+    try:
+        parse_search_api_params(request)
+    except ValueError:
+        return None
+    last = last_ingested_at()
+    version = last.isoformat() if last else ''
+    return hashlib.md5(f'{version}\t{request.GET.urlencode()}'.encode()).hexdigest()
+
+
+@condition(etag_func=search_api_etag)
+def search_api(request: WSGIRequest) -> JsonResponse:
+    """キーワードに一致する単語を含む回をJSONで返す
+
+    新しい回順で、前のページの最後の回を指すカーソル（cursor）から続きを取得する。
+    fieldsで返す項目を選択できる（カンマ区切り、省略時は全て）。
+    If-None-Matchが一致する場合は304を返す（condition）。
+
+    Args:
+        request (WSGIRequest): Djangoリクエスト
+
+    Returns:
+        JsonResponse: 回と次のページのカーソル（パラメーターが不正な場合は400）
+    """
+    try:
+        params = parse_search_api_params(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    episodes, next_cursor = search_episodes_after(params.search_word, params.cursor, params.limit)
+    response = JsonResponse({
+        'keyword': params.search_word,
+        'episodes': [serialize_episode(episode, params.fields) for episode in episodes],
+        'next_cursor': encode_cursor(next_cursor) if next_cursor else None,
+    }, json_dumps_params={'ensure_ascii': False})
+    patch_cache_control(response, public=True, max_age=settings.SEARCH_API_MAX_AGE)
+    return response
+
+
+def hits_api(request: WSGIRequest) -> JsonResponse:
+    """回の一致箇所のうち、検索結果に表示していない残りをJSONで返す
+
+    Args:
+        request (WSGIRequest): Djangoリクエスト
+
+    Returns:
+        JsonResponse: 開始時間順の一致箇所（パラメーターが不正な場合は400）
+    """
+    search_word = normalize_query(get_keyword(request))
+    if not search_word:
+        return JsonResponse({'error': 'keywordを指定してください'}, status=400)
+    try:
+        episode_id = int(request.GET.get('episode', ''))
+        offset = max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        return JsonResponse({'error': 'episode・offsetは整数で指定してください'}, status=400)
+
+    hits = episode_hits(search_word, episode_id, offset)
+    return JsonResponse({'hits': [hit.to_dict() for hit in hits]},
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def context_api(request: WSGIRequest) -> JsonResponse:
+    """一致箇所の前後に話された単語をJSONで返す
+
+    Args:
+        request (WSGIRequest): Djangoリクエスト
+
+    Returns:
+        JsonResponse: 開始時間順の前後の単語（パラメーターが不正な場合は400）
+    """
+    try:
+        episode_id = int(request.GET.get('episode', ''))
+        start_ms = max(int(request.GET.get('start_ms', '')), 0)
+    except ValueError:
+        return JsonResponse({'error': 'episode・start_msは整数で指定してください'}, status=400)
+
+    words = word_context(episode_id, start_ms)
+    return JsonResponse({'words': [Hit(word.original_form, word.start_ms).to_dict() for word in words]},
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def suggest(request: WSGIRequest) -> JsonResponse:
+    """入力中のキーワードに前方一致する単語の候補をJSONで返す
+
+    Args:
+        request (WSGIRequest): Djangoリクエスト
+
+    Returns:
+        JsonResponse: 出現回数の多い順の入力候補
+    """
+    prefix = normalize(request.GET.get('q', ''))
+    suggestions = [{
+        'original_form': suggestion.original_form,
+        'pronunciation': suggestion.pronunciation,
+        'count': suggestion.count,
+    } for suggestion in suggest_terms(prefix)]
+    return JsonResponse({'q': prefix, 'suggestions': suggestions},
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def get_keyword(request: WSGIRequest) -> str:
+    """リクエストから入力されたキーワードを取得する
+
+    Args:
+        request (WSGIRequest): Djangoリクエスト
+
+    Returns:
+        str: キーワード（未入力の場合は空文字）
+    """
+    keyword: Union[str, None] = request.GET.get('keyword')
+    # Noneチェック
+    if not keyword:
+        keyword = ''
+    return keyword
+
+
+def serialize_episode(episode: Episode, fields: List[str]) -> Dict[str, Any]:
+    """検索APIで返す回の項目を辞書にする
+
+    Args:
+        episode (Episode): 一致した単語をword_setに持つ回
+        fields (List[str]): 返す項目（API_FIELDS）
+
     Returns:
-        QuerySet: Episodeモデルのリスト
+        Dict[str, Any]: 回の項目
     """
-    for episode in episodes:
-        for word in episode.word_set.all():
-            time_float = word.start_time
-            if time_float is None:
-                continue
-            elif time_float < 60:
-                word.start_time_minutes = f'00:{str(int(time_float)).zfill(2)}'
-            else:
-                minutes = math.floor(time_float / 60)
-                second = int(time_float % 60)
-                word.start_time_minutes = f'{str(minutes).zfill(2)}:{str(second).zfill(2)}'
-    return episodes
+    values = {
+        'id': lambda: episode.id,
+        'radio': lambda: episode.radio_id.title,
+        'number': lambda: episode.number,
+        'air_date': lambda: episode.air_date.isoformat(),
+        'spotify_id': lambda: episode.spotify_id,
+        'words': lambda: [{
+            'original_form': word.original_form,
+            'pronunciation': word.pronunciation,
+            'start_ms': word.start_ms,
+            'end_ms': word.end_ms,
+        } for word in episode.word_set.all()],
+    }
+    return {field: values[field]() for field in fields}
@@ -91,6 +91,33 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# 例: locmemcache://?max_entries=1000, filecache:///var/tmp/one_cache?timeout=3600,
+#     rediscache://127.0.0.1:6379/1（django-redisが必要）
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# 検索結果キャッシュの有効期間（秒）
+SEARCH_CACHE_TIMEOUT = env.int('SEARCH_CACHE_TIMEOUT', default=60 * 60)
+
+# 関連度順の検索のBM25のパラメータ
+SEARCH_BM25_K1 = env.float('SEARCH_BM25_K1', default=1.2)
+SEARCH_BM25_B = env.float('SEARCH_BM25_B', default=0.75)
+# 放送日が新しい回の関連度を上げる強さ（0の場合は上げない）と、効果が半減する日数
+SEARCH_RECENCY_WEIGHT = env.float('SEARCH_RECENCY_WEIGHT', default=0.0)
+SEARCH_RECENCY_HALF_LIFE_DAYS = env.float('SEARCH_RECENCY_HALF_LIFE_DAYS', default=365)
+
+# 検索APIのレスポンスをキャッシュしてよい期間（秒、Cache-Controlのmax-age）
+SEARCH_API_MAX_AGE = env.int('SEARCH_API_MAX_AGE', default=60)
+
+# 入力候補の数と、候補を事前に求めておく前方一致の範囲の件数（これを超える接頭辞は事前に求める）
+SUGGEST_LIMIT = env.int('SUGGEST_LIMIT', default=10)
+SUGGEST_PRECOMPUTE_THRESHOLD = env.int('SUGGEST_PRECOMPUTE_THRESHOLD', default=1000)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -148,6 +175,59 @@ INTERNAL_IPS = [
 # Google認証
 os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = env.str('G_CREDENTIALS_FILE_PATH')
 # GoogleCloudStorage settings
-DEFAULT_FILE_STORAGE = 'storages.backends.gcloud.GoogleCloudStorage'
+DEFAULT_FILE_STORAGE = env.str(
+    'DEFAULT_FILE_STORAGE', default='storages.backends.gcloud.GoogleCloudStorage')
 GS_BUCKET_NAME = env.str('GS_BUCKET_NAME')
 GS_PROJECT_ID = env.str('GS_PROJECT_ID')
+
+# 単語を一括登録するときの1回のINSERTあたりの件数
+WORD_BULK_BATCH_SIZE = env.int('WORD_BULK_BATCH_SIZE', default=1000)
+
+# 古い世代の単語を削除するときの1回のDELETEあたりの件数（件数ごとにコミットする）
+WORD_GC_CHUNK_SIZE = env.int('WORD_GC_CHUNK_SIZE', default=5000)
+
+# 単語保存ジョブのワーカー（run_ingestion_worker・ingest_episodesコマンド）のプロセス数
+INGESTION_PROCESSES = env.int('INGESTION_PROCESSES', default=os.cpu_count())
+
+# 実行中のまま進捗が更新されないジョブを停止したとみなす秒数と、停止したジョブを再実行する上限回数
+INGESTION_JOB_TIMEOUT = env.int('INGESTION_JOB_TIMEOUT', default=60 * 60)
+INGESTION_JOB_MAX_ATTEMPTS = env.int('INGESTION_JOB_MAX_ATTEMPTS', default=3)
+
+# 文字起こしに使うオブジェクトストレージと音声認識
+# GCPなしで動かす場合は one.service.local.LocalObjectStorage と one.service.local.FakeSpeechRecognizer
+OBJECT_STORAGE_BACKEND = env.str(
+    'OBJECT_STORAGE_BACKEND', default='one.service.google.GoogleCloudStorage')
+SPEECH_RECOGNIZER_BACKEND = env.str(
+    'SPEECH_RECOGNIZER_BACKEND', default='one.service.google.GoogleSpeechRecognizer')
+# ローカルのオブジェクトストレージのルートと、再生する文字起こしファイルのフィクスチャ
+LOCAL_STORAGE_ROOT = env.str('LOCAL_STORAGE_ROOT', default=str(BASE_DIR / 'local_storage'))
+LOCAL_TRANSCRIPT_FIXTURES = env.str(
+    'LOCAL_TRANSCRIPT_FIXTURES', default=str(BASE_DIR / 'one' / 'fixtures' / 'transcripts'))
+
+# 音声ファイルを分割して文字起こしする場合の区間の長さ（秒、0の場合は分割しない）、
+# 前後の区間と重ねる長さ（秒、区間の長さ未満）、同時に文字起こしする区間の数、
+# 完了を確認する間隔と最大の間隔（秒、確認のたびに単語保存ジョブの更新日時を更新するため
+# INGESTION_JOB_TIMEOUTより十分短くする）
+TRANSCRIBE_CHUNK_SECONDS = env.int('TRANSCRIBE_CHUNK_SECONDS', default=0)
+TRANSCRIBE_CHUNK_OVERLAP_SECONDS = env.int('TRANSCRIBE_CHUNK_OVERLAP_SECONDS', default=10)
+TRANSCRIBE_CHUNK_CONCURRENCY = env.int('TRANSCRIBE_CHUNK_CONCURRENCY', default=4)
+TRANSCRIBE_CHUNK_POLL_INTERVAL = env.int('TRANSCRIBE_CHUNK_POLL_INTERVAL', default=5)
+TRANSCRIBE_CHUNK_POLL_MAX_INTERVAL = env.int('TRANSCRIBE_CHUNK_POLL_MAX_INTERVAL', default=60)
+
+# 文字起こしファイルを分割ダウンロードするときの1回あたりのバイト数
+TRANSCRIPT_CHUNK_SIZE = env.int('TRANSCRIPT_CHUNK_SIZE', default=1024 * 1024)
+
+# 単語に開始時間を対応付ける照合方式
+WORD_ALIGNMENT_STRATEGY = env.str(
+    'WORD_ALIGNMENT_STRATEGY', default='one.service.alignment.SubstringMatchStrategy')
+# 前回対応付けた単語から探索する単語数
+WORD_ALIGNMENT_WINDOW = env.int('WORD_ALIGNMENT_WINDOW', default=50)
+
+# 文字起こしのオペレーションを確認する間隔（秒）。確認ごとに倍にし、最大値で打ち止める
+OPERATION_POLL_INTERVAL = env.int('OPERATION_POLL_INTERVAL', default=60)
+OPERATION_POLL_MAX_INTERVAL = env.int('OPERATION_POLL_MAX_INTERVAL', default=30 * 60)
+# オペレーションの確認でエラーが続いたときに、失敗として確認をやめる確認回数
+OPERATION_POLL_MAX_COUNT = env.int('OPERATION_POLL_MAX_COUNT', default=50)
+
+# 起動時にmecabの辞書を読み込むかどうか
+MECAB_WARM_UP = env.bool('MECAB_WARM_UP', default=False)